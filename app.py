@@ -3,6 +3,27 @@ from config import Config
 from routes.coin_routes import coin_routes
 from routes.wallet_routes import wallet_routes
 from routes.staking_routes import staking_routes
+from routes.job_routes import job_routes
+from routes.portfolio_routes import portfolio_routes
+from routes.exposure_routes import exposure_routes
+from routes.lending_routes import lending_routes
+from routes.alert_routes import alert_routes
+from routes.farming_routes import farming_routes
+from routes.ledger_routes import ledger_routes
+from services.database import DatabaseService
+from services.refresh_scheduler import RefreshScheduler
+from services.coin_price_service import CoinPriceService
+from services.wallet_service import WalletService
+from services.price_tier_service import PriceTierService
+from services.price_history_service import PriceHistoryService
+from services.portfolio_snapshot_service import PortfolioSnapshotService
+from services.repricing_service import RepricingService
+from services.exposure_service import ExposureService
+from services.lending_health_service import LendingHealthService
+from services.alert_service import AlertService
+from services.farming_analytics_service import FarmingAnalyticsService
+from services.fx_service import FxService
+from services.price_aggregation_service import PriceAggregationService
 from utils.logging_config import setup_logger, log_function_call
 
 logger = setup_logger(__name__)
@@ -12,6 +33,36 @@ app.config.from_object(Config)
 app.register_blueprint(coin_routes)
 app.register_blueprint(wallet_routes)
 app.register_blueprint(staking_routes)
+app.register_blueprint(job_routes)
+app.register_blueprint(portfolio_routes)
+app.register_blueprint(exposure_routes)
+app.register_blueprint(lending_routes)
+app.register_blueprint(alert_routes)
+app.register_blueprint(farming_routes)
+app.register_blueprint(ledger_routes)
+DatabaseService.init_app(app)
+RefreshScheduler.init_app(app)
+
+RefreshScheduler.register('coin_prices', CoinPriceService.update_coin_prices, Config.COIN_PRICE_REFRESH_INTERVAL)
+RefreshScheduler.register('tiered_prices', PriceTierService.refresh_due_prices, Config.TIERED_PRICE_REFRESH_INTERVAL)
+RefreshScheduler.register('wallet', WalletService.update_wallet_and_prices, Config.WALLET_REFRESH_INTERVAL)
+RefreshScheduler.register('price_history', PriceHistoryService.maintain, Config.PRICE_HISTORY_ROLLUP_INTERVAL)
+RefreshScheduler.register('fix_alternate_names', CoinPriceService.fix_alternate_names_in_db)
+RefreshScheduler.register('exposure', lambda: ExposureService.update_exposure('manual', rebuild=True))
+RefreshScheduler.register('fx_rates', lambda: FxService.refresh_rates('manual', force=True))
+
+# Tasks that change prices or holdings, and what runs after each of them
+REFRESH_TASKS = ['coin_prices', 'tiered_prices', 'wallet']
+# Consolidated prices must be written before anything reads CoinPrices
+RefreshScheduler.after_refresh(PriceAggregationService.consolidate_prices, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(RepricingService.reprice_positions, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(LendingHealthService.update_health, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(AlertService.check_alerts, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(FarmingAnalyticsService.update_analytics, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(PortfolioSnapshotService.take_snapshot, tasks=REFRESH_TASKS)
+RefreshScheduler.after_refresh(ExposureService.update_exposure, tasks=REFRESH_TASKS)
+# Exchange rates are fetched with prices, at most every Config.FX_REFRESH_MIN_AGE seconds
+RefreshScheduler.after_refresh(FxService.refresh_rates, tasks=['coin_prices', 'tiered_prices'])
 
 #def insert_farming_data(pool, token_a, token_b, holdings_a, holdings_b, protocol, chain, deposited_amount_a, deposited_amount_b):
 #    db = get_db()
@@ -13,6 +13,62 @@ class Config:
     SPAM_TOKENS = ['Lizardo Pepez', 'MINKY', 'toby', 'MikeAI', 'BoysClub', 'WOLFO', 'Peepo', 'Based USA', 'Oh no',
                     'Oomer', 'Wild Goat Coin', 'OX Coin', 'Boysclub', 'BASED USA', 'Oh No']
     DATABASE = 'crypto_portfolio.db'
+    # Serve read-only pages from an in-memory copy of the database
+    DATABASE_REPLICA = False
+    # SQLite tuning profile: 'dashboard', 'bulk_ingest', 'durable' or None for SQLite defaults
+    DATABASE_PROFILE = 'dashboard'
+    # Background refresh intervals in seconds (None for on-demand only)
+    # Full top-500 refresh; held and volatile coins refresh more often through the tiered refresh
+    COIN_PRICE_REFRESH_INTERVAL = 6 * 60 * 60
+    TIERED_PRICE_REFRESH_INTERVAL = 5 * 60
+    WALLET_REFRESH_INTERVAL = 60 * 60
+    # Refreshes triggered less than this many seconds after a run of the same task started join that run
+    REFRESH_COALESCE_WINDOW = 60
+    # Maximum random delay before the first scheduled refresh
+    REFRESH_JITTER = 30
+    # Coins refreshed less than this many seconds ago are not re-fetched by manual or scheduled refreshes
+    PRICE_REFRESH_MIN_AGE = 60
+    # Prices older than this many seconds are flagged as stale on the coin page
+    PRICE_STALE_AFTER = 60 * 60
+    # Seconds a coin's price may age before it is due, per tier (1 = held, 2 = volatile, 3 = rest)
+    PRICE_TIER_INTERVALS = {1: 5 * 60, 2: 15 * 60, 3: 60 * 60}
+    # Absolute 1h price change in percent that puts an unheld coin in tier 2
+    PRICE_TIER_VOLATILE_PCT = 2.0
+    # Maximum coins refreshed per tiered run (CoinGecko returns up to 250 per call)
+    PRICE_TIER_BUDGET = 250
+    # Seconds between price history rollup and retention runs
+    PRICE_HISTORY_ROLLUP_INTERVAL = 60 * 60
+    # Seconds to keep price history per resolution (0 = raw samples, 3600 = hourly, 86400 = daily; None keeps forever)
+    PRICE_HISTORY_RETENTION = {0: 90 * 86400, 3600: 2 * 365 * 86400, 86400: None}
+    # Seconds between progress writes for running jobs
+    JOB_PERSIST_INTERVAL = 1.0
+    # Queued or running jobs older than this (seconds) are treated as abandoned
+    JOB_STALE_AFTER = 60 * 60
     # List of Chains for API Query
     CHAINS_TO_QUERY = ['eth', 'polygon', 'avalanche', 'arbitrum', 'optimism', 'base']
     WALLET_ADDRESS = '0xbF133C1763c0751494CE440300fCd6b8c4e80D83'
+    # Fired price alerts are posted here as JSON when set; otherwise they are only logged
+    ALERT_WEBHOOK_URL = None
+    ALERT_WEBHOOK_TIMEOUT = 10
+    # Failed webhook deliveries are retried on later checks up to this many times
+    ALERT_WEBHOOK_MAX_ATTEMPTS = 5
+    # Historical VaR confidence levels in percent for the risk analytics
+    RISK_VAR_CONFIDENCE = [95, 99]
+    # Fewest common returns for a correlation or VaR to be reported
+    RISK_MIN_OBSERVATIONS = 10
+    # Cost basis methods the lot engine maintains; the first is the default for PnL reports
+    COST_BASIS_METHODS = ['fifo', 'lifo', 'average']
+    # Ledger rows inserted per batch while streaming an import, and import errors reported back
+    LEDGER_IMPORT_BATCH = 5000
+    LEDGER_IMPORT_MAX_ERRORS = 20
+    # Currencies valuations can be reported in; values are converted from USD with CoinGecko exchange rates
+    FX_CURRENCIES = ['usd', 'eur', 'chf', 'btc', 'eth']
+    # Exchange rates fetched less than this many seconds ago are not re-fetched after a price refresh
+    FX_REFRESH_MIN_AGE = 15 * 60
+    # Weight of each price source when consolidating quotes; a source's per-chain quotes ('moralis:<chain>') share it
+    PRICE_SOURCE_WEIGHTS = {'coingecko': 1.0, 'moralis': 0.8}
+    # Seconds over which a quote's weight halves, and age after which it is ignored
+    PRICE_QUOTE_HALF_LIFE = 30 * 60
+    PRICE_QUOTE_MAX_AGE = 24 * 60 * 60
+    # Quotes further than this fraction from the consolidated price are flagged as outliers
+    PRICE_OUTLIER_THRESHOLD = 0.1
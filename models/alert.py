@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Rule kind -> (observed subject, crossing direction that fires it)
+# 'price_move' fires on a move of threshold percent either way from its reference price
+ALERT_KINDS = {
+    'price_above': ('price', 'up'),
+    'price_below': ('price', 'down'),
+    'price_move': ('price', 'both'),
+    'health_below': ('health', 'down'),
+    'value_above': ('value', 'up'),
+    'value_below': ('value', 'down'),
+}
+
+@dataclass
+class AlertRule:
+    """A user-defined alert on a coin price, lending pool health ratio or position value"""
+    id: Optional[int]
+    kind: str
+    target: str
+    threshold: float
+    reference_price: Optional[float] = None
+    enabled: bool = True
+    note: Optional[str] = None
+    created_at: Optional[float] = None
+    last_fired_at: Optional[float] = None
+
+    @property
+    def subject(self) -> str:
+        """Observed value the rule watches, e.g. 'price:Bitcoin' or 'health:<lending pool id>'"""
+        return f'{ALERT_KINDS[self.kind][0]}:{self.target}'
+
+    def levels(self) -> List[Tuple[str, float]]:
+        """(direction, level) pairs whose crossing fires the rule"""
+        direction = ALERT_KINDS[self.kind][1]
+        if direction != 'both':
+            return [(direction, self.threshold)]
+        if self.reference_price is None:
+            return []
+        move = abs(self.threshold) / 100
+        return [('up', self.reference_price * (1 + move)), ('down', self.reference_price * (1 - move))]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'target': self.target,
+            'threshold': self.threshold,
+            'reference_price': self.reference_price,
+            'enabled': self.enabled,
+            'note': self.note,
+            'created_at': self.created_at,
+            'last_fired_at': self.last_fired_at
+        }
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import total_ordering
+from typing import Union
+
+from utils.fixed_point import (
+    DEFAULT_AMOUNT_DECIMALS, PRICE_DECIMALS, VALUE_DECIMALS, from_units, rescale, to_units
+)
+
+@total_ordering
+@dataclass(frozen=True, eq=False)
+class FixedAmount:
+    """
+    An exact quantity held as integer units of 10**-decimals.
+
+    Addition and subtraction align to the larger scale and never round, so
+    summing balances of the same coin from several chains (with different
+    token decimals) is exact. Amounts compare and hash by value, so 1.50 at 2
+    decimals equals 1.5 at 8.
+    """
+    units: int
+    decimals: int = DEFAULT_AMOUNT_DECIMALS
+
+    @classmethod
+    def from_value(cls, value: Union[int, float, str, Decimal], decimals: int = DEFAULT_AMOUNT_DECIMALS) -> 'FixedAmount':
+        """Round a number to the given decimals"""
+        return cls(to_units(value, decimals), decimals)
+
+    @classmethod
+    def from_raw(cls, raw: Union[int, str], decimals: int) -> 'FixedAmount':
+        """An on-chain integer balance (e.g. wei) with its token decimals"""
+        return cls(int(raw), int(decimals))
+
+    @classmethod
+    def coerce(cls, value, decimals: int = DEFAULT_AMOUNT_DECIMALS) -> 'FixedAmount':
+        """Return value unchanged if it's already a FixedAmount, otherwise round it to decimals"""
+        return value if isinstance(value, cls) else cls.from_value(value, decimals)
+
+    def rescale(self, decimals: int) -> 'FixedAmount':
+        """The amount at other decimals, rounding half-even when dropping digits"""
+        return FixedAmount(rescale(self.units, self.decimals, decimals), decimals)
+
+    def value(self, price, price_decimals: int = PRICE_DECIMALS) -> 'FixedAmount':
+        """
+        USD value of the amount at a price.
+
+        Args:
+            price: USD per coin, as a number or a FixedAmount
+            price_decimals: Decimals the price is rounded to when given as a number
+
+        Returns:
+            FixedAmount with VALUE_DECIMALS
+        """
+        return (self * FixedAmount.coerce(price, price_decimals)).rescale(VALUE_DECIMALS)
+
+    @classmethod
+    def sum(cls, amounts) -> 'FixedAmount':
+        """
+        Exact sum of many amounts at the largest of their decimals.
+
+        Units are added per scale first and rescaled once per scale, so this is
+        much faster than chaining +.
+        """
+        by_decimals = {}
+        for amount in amounts:
+            by_decimals[amount.decimals] = by_decimals.get(amount.decimals, 0) + amount.units
+        decimals = max(by_decimals, default=0)
+        return cls(sum(rescale(units, scale, decimals) for scale, units in by_decimals.items()), decimals)
+
+    def _align(self, other: 'FixedAmount'):
+        decimals = max(self.decimals, other.decimals)
+        return rescale(self.units, self.decimals, decimals), rescale(other.units, other.decimals, decimals), decimals
+
+    def __add__(self, other):
+        if isinstance(other, int) and other == 0:
+            return self
+        if not isinstance(other, FixedAmount):
+            return NotImplemented
+        if other.decimals == self.decimals:
+            return FixedAmount(self.units + other.units, self.decimals)
+        a, b, decimals = self._align(other)
+        return FixedAmount(a + b, decimals)
+
+    # Lets sum() start from 0
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if not isinstance(other, FixedAmount):
+            return NotImplemented
+        a, b, decimals = self._align(other)
+        return FixedAmount(a - b, decimals)
+
+    def __neg__(self):
+        return FixedAmount(-self.units, self.decimals)
+
+    def __mul__(self, other):
+        """Exact product; the result has the decimals of both factors combined"""
+        if isinstance(other, int):
+            return FixedAmount(self.units * other, self.decimals)
+        if not isinstance(other, FixedAmount):
+            return NotImplemented
+        return FixedAmount(self.units * other.units, self.decimals + other.decimals)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        if isinstance(other, int):
+            other = FixedAmount(other, 0)
+        if not isinstance(other, FixedAmount):
+            return NotImplemented
+        a, b, _ = self._align(other)
+        return a == b
+
+    def __lt__(self, other):
+        if isinstance(other, int):
+            other = FixedAmount(other, 0)
+        if not isinstance(other, FixedAmount):
+            return NotImplemented
+        a, b, _ = self._align(other)
+        return a < b
+
+    def __hash__(self):
+        return hash(self.to_decimal().normalize())
+
+    def __bool__(self):
+        return self.units != 0
+
+    def to_decimal(self) -> Decimal:
+        return from_units(self.units, self.decimals)
+
+    def __float__(self):
+        return self.units / 10 ** self.decimals
+
+    def __str__(self):
+        return f'{self.to_decimal():f}'
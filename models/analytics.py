@@ -0,0 +1,226 @@
+from dataclasses import dataclass
+from typing import Dict, List
+import numpy as np
+from utils.fixed_point import VALUE_DECIMALS, from_units_array, to_units_array
+
+@dataclass
+class PortfolioArrays:
+    """
+    Every position leg (one per coin a position holds) as aligned NumPy arrays.
+
+    Categorical columns are stored as integer codes into their label lists,
+    so breakdowns are a single np.bincount. Values default to the stored ones;
+    prices are also held once per coin and gathered per leg, so a different
+    price vector (e.g. a shocked one) can be valued without reloading anything.
+    """
+    data_version: int
+    positions: List[str]        # position labels
+    coins: List[str]            # coin labels
+    types: List[str]            # position type labels
+    protocols: List[str]        # protocol labels
+    chains: List[str]           # chain labels
+    position_idx: np.ndarray    # per leg, index into positions
+    coin_idx: np.ndarray        # per leg, index into coins
+    type_idx: np.ndarray        # per leg, index into types
+    protocol_idx: np.ndarray    # per leg, index into protocols
+    chain_idx: np.ndarray       # per leg, index into chains
+    amounts: np.ndarray         # per leg, coin amount (negative for debt)
+    stored_prices: np.ndarray   # per leg, price stored with the position
+    stored_values: np.ndarray   # per leg, value stored with the position, net of debt
+    prices: np.ndarray          # per coin, stored price of its legs
+    collateral_factors: np.ndarray  # per leg, collateral factor of lending collateral (NaN otherwise)
+
+    @property
+    def size(self) -> int:
+        return len(self.amounts)
+
+    def leg_prices(self, prices: np.ndarray = None) -> np.ndarray:
+        """Price of every leg from a per-coin price vector, falling back to the stored price"""
+        if prices is None:
+            return self.stored_prices
+        gathered = prices[self.coin_idx]
+        return np.where(np.isnan(gathered), self.stored_prices, gathered)
+
+    def values(self, prices: np.ndarray = None) -> np.ndarray:
+        """Value of every leg net of debt: the stored value, or at a per-coin price vector"""
+        if prices is None:
+            return self.stored_values
+        return self.amounts * self.leg_prices(prices)
+
+    def value_units(self, prices: np.ndarray = None) -> np.ndarray:
+        """Value of every leg as int64 units of VALUE_DECIMALS, whose sums are exact"""
+        return to_units_array(self.values(prices), VALUE_DECIMALS)
+
+    @property
+    def collateral_mask(self) -> np.ndarray:
+        return ~np.isnan(self.collateral_factors)
+
+    @property
+    def borrow_mask(self) -> np.ndarray:
+        if 'lending' not in self.types:
+            return np.zeros(self.size, dtype=bool)
+        return (self.type_idx == self.types.index('lending')) & ~self.collateral_mask
+
+    @property
+    def lending_pools(self) -> np.ndarray:
+        """Indices into positions of the lending pools"""
+        return np.unique(self.position_idx[self.collateral_mask | self.borrow_mask])
+
+    def group_sum(self, values: np.ndarray, by: str, legs: np.ndarray = None) -> np.ndarray:
+        """
+        Sum leg values per category along the last axis.
+
+        Args:
+            values: Leg values, shape (legs,) or (scenarios, legs); integer
+                    units are summed exactly in int64
+            by: 'position', 'coin', 'type', 'protocol' or 'chain'
+            legs: Only sum these legs; values then holds just their columns
+
+        Returns:
+            Sums of shape (categories,) or (scenarios, categories)
+        """
+        codes = getattr(self, f'{by}_idx')
+        codes = codes if legs is None else codes[legs]
+        count = len(getattr(self, f'{by}s'))
+        values = np.asarray(values)
+        if np.issubdtype(values.dtype, np.integer):
+            # np.bincount would sum the weights as floats
+            values, dtype = values.astype(np.int64), np.int64
+        else:
+            values, dtype = values.astype(float), float
+            if values.ndim == 1:
+                return np.bincount(codes, weights=values, minlength=count)
+        sums = np.zeros(values.shape[:-1] + (count,), dtype=dtype)
+        if len(codes):
+            # Legs are stored in position order, so grouping by position needs no reordering
+            if np.any(codes[1:] < codes[:-1]):
+                order = np.argsort(codes, kind='stable')
+                codes, values = codes[order], values[..., order]
+            present, starts = np.unique(codes, return_index=True)
+            sums[..., present] = np.add.reduceat(values, starts, axis=-1)
+        return sums
+
+    def lending_totals(self, values: np.ndarray = None):
+        """
+        Collateral weighted by its collateral factor and borrowed value per position.
+
+        Args:
+            values: Leg values, shape (legs,) or (scenarios, legs), defaults to values()
+
+        Returns:
+            (weighted collateral, borrowed), each summed per position
+        """
+        values = self.values() if values is None else values
+        collateral, borrow = self.collateral_mask, self.borrow_mask
+        legs = np.flatnonzero(collateral | borrow)
+        lending_values = np.asarray(values)[..., legs]
+        weighted = lending_values * np.where(collateral[legs], self.collateral_factors[legs], 0.0)
+        borrowed = -lending_values * borrow[legs]
+        return self.group_sum(weighted, 'position', legs), self.group_sum(borrowed, 'position', legs)
+
+    def health_ratios(self, values: np.ndarray = None) -> np.ndarray:
+        """Weighted collateral over borrowed value per position, NaN where nothing is borrowed"""
+        weighted, borrowed = self.lending_totals(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(borrowed > 0, weighted / borrowed, np.nan)
+
+    def breakdown(self, by: str, values: np.ndarray = None) -> Dict[str, float]:
+        """
+        Sum leg values per category.
+
+        Args:
+            by: 'position', 'coin', 'type', 'protocol' or 'chain'
+            values: Leg values to sum, or leg value units from value_units()
+                    for exact sums; defaults to values()
+        """
+        labels = getattr(self, f'{by}s')
+        values = self.values() if values is None else np.asarray(values)
+        sums = self.group_sum(values, by)
+        if np.issubdtype(values.dtype, np.integer):
+            sums = from_units_array(sums, VALUE_DECIMALS)
+        return dict(zip(labels, sums.tolist()))
+
+@dataclass
+class ReturnArrays:
+    """
+    Log returns of several coins aligned on a common time grid.
+
+    returns[t, i] is coin i's log return from bucket t to t + 1; it is NaN
+    before the coin's first price. Statistics use every bucket where the
+    coins involved both have a return, so coins with shorter histories don't
+    shorten everyone else's.
+    """
+    coins: List[str]            # coin labels
+    buckets: np.ndarray         # bucket start of each return's end point, epoch seconds
+    returns: np.ndarray         # (buckets, coins) log returns, NaN where missing
+
+    @classmethod
+    def from_prices(cls, coins: List[str], buckets: np.ndarray, prices: np.ndarray) -> 'ReturnArrays':
+        """
+        Build returns from a (buckets, coins) price matrix with NaN gaps.
+
+        Gaps after a coin's first price are forward filled, so a missing bucket
+        is a zero return followed by the whole move.
+        """
+        prices = np.where(prices > 0, prices, np.nan)
+        rows = np.arange(len(prices))[:, None]
+        last_seen = np.maximum.accumulate(np.where(np.isnan(prices), 0, rows), axis=0)
+        filled = prices[last_seen, np.arange(prices.shape[1])]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(np.log(filled), axis=0)
+        return cls(coins=list(coins), buckets=np.asarray(buckets)[1:], returns=returns)
+
+    @property
+    def observations(self) -> np.ndarray:
+        """Number of returns per coin"""
+        return (~np.isnan(self.returns)).sum(axis=0)
+
+    def volatility(self, periods_per_year: float) -> np.ndarray:
+        """Annualized standard deviation of returns per coin, NaN with fewer than two returns"""
+        valid = ~np.isnan(self.returns)
+        count = valid.sum(axis=0)
+        x = np.where(valid, self.returns, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = x.sum(axis=0) / count
+            variance = (np.where(valid, x - mean, 0.0) ** 2).sum(axis=0) / (count - 1)
+        return np.where(count > 1, np.sqrt(variance * periods_per_year), np.nan)
+
+    def correlation(self, min_periods: int = 2) -> np.ndarray:
+        """
+        Pairwise correlation of returns over the buckets both coins have.
+
+        Every pairwise sum is one matrix product over the zero-filled returns and
+        their validity mask, so the whole matrix costs a handful of BLAS calls.
+
+        Args:
+            min_periods: Pairs with fewer common returns get NaN
+
+        Returns:
+            (coins, coins) correlation matrix
+        """
+        mask = (~np.isnan(self.returns)).astype(float)
+        x = np.where(mask > 0, self.returns, 0.0)
+        n = mask.T @ mask
+        sum_x = x.T @ mask          # [i, j]: sum of coin i's returns where j also has one
+        sum_xx = (x * x).T @ mask
+        sum_xy = x.T @ x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = n * sum_xy - sum_x * sum_x.T
+            variance = (n * sum_xx - sum_x ** 2) * (n * sum_xx - sum_x ** 2).T
+            correlation = covariance / np.sqrt(variance)
+        correlation = np.clip(correlation, -1.0, 1.0)
+        correlation[(n < min_periods) | ~(variance > 0)] = np.nan
+        return correlation
+
+    def pnl(self, exposures: np.ndarray) -> np.ndarray:
+        """
+        Historical-simulation profit and loss per bucket of holding the current exposures.
+
+        Args:
+            exposures: Current net value per coin, aligned with coins
+
+        Returns:
+            PnL per bucket, with missing returns counted as no move
+        """
+        moves = np.expm1(np.nan_to_num(self.returns, nan=0.0))
+        return moves @ np.asarray(exposures, dtype=float)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
+import time
 
 @dataclass
 class Coin:
@@ -18,6 +19,23 @@ class Coin:
     DisplayName: str
     ApiId: str
     AlternateNames: Optional[List[str]] = field(default_factory=list)
+    LastUpdated: Optional[float] = None  # epoch seconds of the last price write
+
+    def age(self, now: float = None) -> Optional[float]:
+        '''Seconds since the price was last written, None if unknown'''
+        if self.LastUpdated is None:
+            return None
+        return (now if now is not None else time.time()) - self.LastUpdated
+
+    def age_label(self, now: float = None) -> str:
+        '''Short human-readable price age, e.g. "45s", "12m", "3h", "2d"'''
+        age = self.age(now)
+        if age is None:
+            return 'never'
+        for unit, seconds in (('d', 86400), ('h', 3600), ('m', 60)):
+            if age >= seconds:
+                return f'{int(age // seconds)}{unit}'
+        return f'{int(max(age, 0))}s'
 
     def add_alternate_name(self, name: str):
         if name not in self.AlternateNames:
@@ -39,7 +57,8 @@ class Coin:
             'PriceChangePercentage1h': self.PriceChangePercentage1h,
             'DisplayName': self.DisplayName,
             'ApiId': self.ApiId,
-            'AlternateNames': self.AlternateNames
+            'AlternateNames': self.AlternateNames,
+            'LastUpdated': self.LastUpdated
         }
     
     @classmethod
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+
+@dataclass
+class CoinExposure:
+    """Net value held in one coin, split by position type"""
+    token: str
+    total_value: float
+    wallet_value: float = 0.0
+    staked_value: float = 0.0
+    lp_value: float = 0.0
+    lending_borrowing_value: float = 0.0
+    leverage_farm_value: float = 0.0
+
+    def to_dict(self):
+        return {
+            'token': self.token,
+            'total_value': self.total_value,
+            'wallet_value': self.wallet_value,
+            'staked_value': self.staked_value,
+            'lp_value': self.lp_value,
+            'lending_borrowing_value': self.lending_borrowing_value,
+            'leverage_farm_value': self.leverage_farm_value
+        }
@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+LEDGER_SIDES = {'buy', 'sell'}
+COST_BASIS_METHODS = ('fifo', 'lifo', 'average')
+
+@dataclass
+class LedgerTransaction:
+    """One acquisition ('buy') or disposal ('sell') of a coin"""
+    ts: float
+    coin_id: str
+    side: str
+    amount: float
+    price: float
+    fee: float = 0.0
+    external_id: Optional[str] = None
+    source: Optional[str] = None
+    id: Optional[int] = None
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any], source: str = None) -> 'LedgerTransaction':
+        """
+        Parse an imported CSV row or JSON object.
+
+        Accepts 'timestamp' (epoch seconds or ISO 8601, UTC when no offset is
+        given), 'coin', 'side' ('buy'/'sell'), 'amount', 'price' (USD per coin),
+        optional 'fee' (USD) and optional 'id' used to skip duplicates.
+
+        Raises:
+            ValueError: if a field is missing or invalid
+        """
+        side = str(record.get('side') or '').strip().lower()
+        if side not in LEDGER_SIDES:
+            raise ValueError(f'side must be buy or sell, got {record.get("side")!r}')
+        coin = str(record.get('coin') or '').strip()
+        if not coin:
+            raise ValueError('coin is required')
+        amount = float(record.get('amount'))
+        price = float(record.get('price'))
+        fee = float(record.get('fee') or 0)
+        if not amount > 0 or not price >= 0 or not fee >= 0:
+            raise ValueError('amount must be positive, price and fee non-negative')
+        external_id = record.get('id')
+        return cls(
+            ts=cls.parse_timestamp(record.get('timestamp')),
+            coin_id=coin,
+            side=side,
+            amount=amount,
+            price=price,
+            fee=fee,
+            external_id=str(external_id) if external_id not in (None, '') else None,
+            source=source
+        )
+
+    @staticmethod
+    def parse_timestamp(value) -> float:
+        """Epoch seconds from a number or an ISO 8601 string"""
+        if value is None or value == '':
+            raise ValueError('timestamp is required')
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'external_id': self.external_id,
+            'ts': self.ts,
+            'coin_id': self.coin_id,
+            'side': self.side,
+            'amount': self.amount,
+            'price': self.price,
+            'fee': self.fee,
+            'source': self.source
+        }
@@ -1,14 +1,15 @@
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
-from decimal import Decimal
+from models.amount import FixedAmount
+from utils.fixed_point import PRICE_DECIMALS, amount_decimals
 
 @dataclass
 class Position:
     id: str
     protocol_id: str
     position_type: str
-    total_value: Decimal
+    total_value: FixedAmount
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -25,22 +26,31 @@ class WalletPosition:
     """Represents a wallet position with its core position data"""
     position: Position
     coin_id: str
-    amount: Decimal
-    price: Decimal
+    amount: FixedAmount
+    price: FixedAmount
 
 
     @property
-    def value(self) -> Decimal:
-        """Calculate position value - matches DB generated column"""
-        return self.amount * self.price
+    def value(self) -> FixedAmount:
+        """Calculate position value - matches DB generated column, rounded to VALUE_DECIMALS"""
+        return self.amount.value(self.price)
     
     @classmethod
-    def create_new(cls, coin_id: str, amount: Decimal, price: Decimal) -> 'WalletPosition':
-        """Factory method to create a new wallet position"""
+    def create_new(cls, coin_id: str, amount, price, decimals: int = None) -> 'WalletPosition':
+        """
+        Factory method to create a new wallet position
+
+        Args:
+            amount: Coin amount as a FixedAmount or a number
+            price: USD price as a FixedAmount or a number
+            decimals: Decimals a numeric amount is rounded to, defaults to the coin's storage decimals
+        """
+        amount = FixedAmount.coerce(amount, amount_decimals(decimals))
+        price = FixedAmount.coerce(price, PRICE_DECIMALS)
         position = Position(
             id=f'wallet_{coin_id}',
             protocol_id ='default',
             position_type = 'wallet',
-            total_value=amount * price
+            total_value=amount.value(price)
         )
         return cls(position=position, coin_id=coin_id, amount=amount, price=price)
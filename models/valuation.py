@@ -0,0 +1,109 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+from utils.fixed_point import VALUE_DECIMALS, VALUE_SCALE, to_units
+
+POSITION_TYPES = ['wallet', 'staking', 'farming', 'leveraged', 'lending']
+
+@dataclass
+class PositionValue:
+    """Value of one position, net of any debt"""
+    position_id: str
+    position_type: str
+    protocol: str
+    chain: str
+    gross_value: float
+    debt_value: float = 0.0
+
+    @property
+    def value(self) -> float:
+        return self.gross_value - self.debt_value
+
+    def to_dict(self):
+        return {
+            'position_id': self.position_id,
+            'position_type': self.position_type,
+            'protocol': self.protocol,
+            'chain': self.chain,
+            'gross_value': self.gross_value,
+            'debt_value': self.debt_value,
+            'value': self.value
+        }
+
+def _values(units: Dict[str, int]) -> Dict[str, float]:
+    return {key: value / VALUE_SCALE for key, value in units.items()}
+
+@dataclass
+class PortfolioValuation:
+    """
+    Every position value and its totals per position, type, chain and protocol.
+
+    Totals are accumulated as integer units of VALUE_DECIMALS, so they are exact
+    and don't depend on the order positions are added in.
+    """
+    data_version: int
+    positions: List[PositionValue] = field(default_factory=list)
+    type_units: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(POSITION_TYPES, 0))
+    chain_units: Dict[str, int] = field(default_factory=dict)
+    protocol_units: Dict[str, int] = field(default_factory=dict)
+    position_units: Dict[str, int] = field(default_factory=dict)
+    total_units: int = 0
+    gross_units: int = 0
+    debt_units: int = 0
+
+    def add(self, position: PositionValue) -> None:
+        """Add a position to the valuation and its totals"""
+        gross, debt = to_units(position.gross_value, VALUE_DECIMALS), to_units(position.debt_value, VALUE_DECIMALS)
+        value = gross - debt
+        self.positions.append(position)
+        self.type_units[position.position_type] = self.type_units.get(position.position_type, 0) + value
+        self.chain_units[position.chain] = self.chain_units.get(position.chain, 0) + value
+        self.protocol_units[position.protocol] = self.protocol_units.get(position.protocol, 0) + value
+        self.position_units[position.position_id] = self.position_units.get(position.position_id, 0) + value
+        self.total_units += value
+        self.gross_units += gross
+        self.debt_units += debt
+
+    @property
+    def by_type(self) -> Dict[str, float]:
+        return _values(self.type_units)
+
+    @property
+    def by_chain(self) -> Dict[str, float]:
+        return _values(self.chain_units)
+
+    @property
+    def by_protocol(self) -> Dict[str, float]:
+        return _values(self.protocol_units)
+
+    @property
+    def by_position(self) -> Dict[str, float]:
+        return _values(self.position_units)
+
+    @property
+    def total(self) -> float:
+        return self.total_units / VALUE_SCALE
+
+    @property
+    def gross_total(self) -> float:
+        return self.gross_units / VALUE_SCALE
+
+    @property
+    def debt_total(self) -> float:
+        return self.debt_units / VALUE_SCALE
+
+    def percent_of_total(self, value: float) -> float:
+        return (value / self.total * 100) if self.total > 0 else 0
+
+    def to_dict(self, include_positions: bool = True):
+        result = {
+            'data_version': self.data_version,
+            'total': self.total,
+            'gross_total': self.gross_total,
+            'debt_total': self.debt_total,
+            'by_type': self.by_type,
+            'by_chain': self.by_chain,
+            'by_protocol': self.by_protocol
+        }
+        if include_positions:
+            result['positions'] = [position.to_dict() for position in self.positions]
+        return result
@@ -1,17 +1,20 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
+from utils.fixed_point import VALUE_DECIMALS, amount_decimals, value_units
 
 @dataclass
 class WalletItem:
     token: str
     price: float
     holdings: float
-    value: float
     original_name: str
+    decimals: Optional[int] = None          # coin's on-chain decimals, None when unknown
+    value: float = field(init=False)
+    value_units: int = field(init=False)    # value in integer units of VALUE_DECIMALS, exact to sum
 
     def __post_init__(self):
         self.price = float(self.price)
         self.holdings = float(self.holdings)
-        self.value = float(self.value)
-
-    def calculate_percent_of_total(self, total_value):
-        return (self.value / total_value * 100) if total_value > 0 else 0
\ No newline at end of file
+        # Not through 64-bit units: display values must survive huge balances and sub-PRICE_DECIMALS prices
+        self.value_units = value_units(self.holdings, self.price, amount_decimals(self.decimals))
+        self.value = self.value_units / 10 ** VALUE_DECIMALS
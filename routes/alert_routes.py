@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify
+from services.database import DatabaseService
+from services.alert_service import AlertService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+alert_routes = Blueprint('alert_routes', __name__)
+
+@alert_routes.route('/api/alerts/rules', methods=['GET'])
+@log_function_call(logger)
+def get_alert_rules():
+    """Every alert rule"""
+    result = AlertService.get_rules()
+    if result['success']:
+        result['data'] = [rule.to_dict() for rule in result['data']]
+    return jsonify(result), 200 if result['success'] else 500
+
+@alert_routes.route('/api/alerts/rules', methods=['POST'])
+@log_function_call(logger)
+def add_alert_rule():
+    """
+    Create an alert rule.
+    JSON body: {'kind': price_above | price_below | price_move | health_below | value_above | value_below,
+                'target': coin, lending pool or position id, 'threshold': number, 'note': str (optional)}
+    """
+    body = request.get_json(silent=True) or {}
+    result = AlertService.add_rule(body.get('kind'), body.get('target'), body.get('threshold'), body.get('note'))
+    if result['success']:
+        result['data'] = result['data'].to_dict()
+    return jsonify(result), 201 if result['success'] else 400
+
+@alert_routes.route('/api/alerts/rules/<int:rule_id>', methods=['PATCH'])
+@log_function_call(logger)
+def update_alert_rule(rule_id):
+    """Enable or disable an alert rule. JSON body: {'enabled': bool}"""
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body.get('enabled'), bool):
+        return jsonify(ResponseHandler.error('enabled must be true or false')), 400
+    result = AlertService.set_enabled(rule_id, body['enabled'])
+    if result['success']:
+        result['data'] = result['data'].to_dict()
+    return jsonify(result), 200 if result['success'] else 404
+
+@alert_routes.route('/api/alerts/rules/<int:rule_id>', methods=['DELETE'])
+@log_function_call(logger)
+def delete_alert_rule(rule_id):
+    """Delete an alert rule"""
+    result = AlertService.delete_rule(rule_id)
+    return jsonify(result), 200 if result['success'] else 404
+
+@alert_routes.route('/api/alerts/events', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_alert_events():
+    """
+    Most recent fired alerts, newest first.
+    Query args: limit (default 100), status (logged, pending, sent, failed)
+    """
+    result = AlertService.get_events(request.args.get('limit', 100, type=int), request.args.get('status'))
+    return jsonify(result), 200 if result['success'] else 500
@@ -1,10 +1,18 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, json
 from services.coin_price_service import CoinPriceService
+from services.database import DatabaseService
+from services.refresh_scheduler import RefreshScheduler
+from services.price_tier_service import PriceTierService
+from services.price_history_service import PriceHistoryService
+from services.price_aggregation_service import PriceAggregationService
 from utils.response import ResponseHandler
+from config import Config
+import time
 
 coin_routes = Blueprint('coin_routes', __name__)
 
 @coin_routes.route('/coin_prices')
+@DatabaseService.read_only
 def coin_prices():
     sort_by = request.args.get('sort_by', 'MarketCap')
     order = request.args.get('order', 'desc')
@@ -14,17 +22,47 @@ def coin_prices():
         coins = []
     else:
         coins = response['data']
-    return render_template('coin_prices.html', coins=coins, sort_by=sort_by, order=order)
+    return render_template('coin_prices.html', coins=coins, sort_by=sort_by, order=order,
+                           now=time.time(), stale_after=Config.PRICE_STALE_AFTER)
 
 @coin_routes.route('/update_coin_prices', methods=['GET'])
 def update_coin_prices():
-    result = CoinPriceService.update_coin_prices()
+    result = RefreshScheduler.trigger('coin_prices')
     if result['success']:
         flash(result['message'], 'success')
     else:
         flash(result['error'], 'error')
     return redirect(url_for('coin_routes.coin_prices'))
 
+@coin_routes.route('/api/coin_prices/refresh_plan')
+@DatabaseService.read_only
+def refresh_plan():
+    '''Coins the next tiered refresh would fetch, in priority order'''
+    plan = PriceTierService.plan_refresh(request.args.get('budget', type=int))
+    return jsonify(ResponseHandler.success('Refresh plan', data=[coin.to_dict() for coin in plan]))
+
+@coin_routes.route('/api/coin_prices/<name>/history')
+@DatabaseService.read_only
+def price_history(name):
+    '''
+    Price history for a coin.
+    Query args: start, end (epoch seconds), resolution (0 = raw, 3600 = hourly, 86400 = daily)
+    '''
+    result = PriceHistoryService.get_history(
+        name,
+        start=request.args.get('start', type=float),
+        end=request.args.get('end', type=float),
+        resolution=request.args.get('resolution', type=int)
+    )
+    return jsonify(result), 200 if result['success'] else 400
+
+@coin_routes.route('/api/coin_prices/<name>/quotes')
+@DatabaseService.read_only
+def price_quotes(name):
+    '''Every source's latest quote for a coin, with outlier flags and the consolidated price'''
+    result = PriceAggregationService.get_quotes(name)
+    return jsonify(result), 200 if result['success'] else 500
+
 @coin_routes.route('/update_coin_name', methods=['POST'])
 def update_coin_name():
     data = request.json
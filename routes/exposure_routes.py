@@ -0,0 +1,67 @@
+from flask import Blueprint, render_template, request, flash, jsonify
+from services.database import DatabaseService
+from services.exposure_service import ExposureService
+from services.valuation_service import ValuationService
+from services.analytics_service import AnalyticsService
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+exposure_routes = Blueprint('exposure_routes', __name__)
+
+@exposure_routes.route('/coin_exposure')
+@log_function_call(logger)
+@DatabaseService.read_only
+def coin_exposure():
+    """
+    Display net exposure per coin across every position type.
+    Supports sorting by the exposure columns
+    """
+    sort_by = request.args.get('sort_by', 'Total')
+    order = request.args.get('order', 'desc')
+    try:
+        response = ExposureService.get_coin_exposure(sort_by, order)
+        if not response['success']:
+            flash(response['error'], 'error')
+            exposures = []
+        else:
+            exposures = response['data']
+
+        total_portfolio_value = ValuationService.get_valuation().total
+        percents = AnalyticsService.percent_of_total([exposure.total_value for exposure in exposures], total_portfolio_value)
+        exposure_with_percent = list(zip(exposures, percents))
+        next_order = 'asc' if order == 'desc' else 'desc'
+
+        return render_template('coin_exposure.html',
+                               exposure_data=exposure_with_percent,
+                               total_portfolio_value=total_portfolio_value,
+                               sort_by=sort_by,
+                               order=next_order)
+    except Exception as e:
+        logger.error(f'Error in coin exposure route: {str(e)}', exc_info=True)
+        flash('An error occurred while loading exposure data', 'error')
+        return render_template('coin_exposure.html', exposure_data=[], total_portfolio_value=0,
+                               sort_by=sort_by, order='desc')
+
+@exposure_routes.route('/api/exposure', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_exposure():
+    """
+    Exposure per coin.
+    Query args: sort_by (Token, Total, Wallet, Staked, LP, Lending, Leveraged), order
+    """
+    result = ExposureService.get_coin_exposure(
+        request.args.get('sort_by', 'Total'),
+        request.args.get('order', 'desc')
+    )
+    if result['success']:
+        result['data'] = [exposure.to_dict() for exposure in result['data']]
+    return jsonify(result), 200 if result['success'] else 500
+
+@exposure_routes.route('/api/exposure/<coin_id>', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_position_exposure(coin_id):
+    """Positions holding a coin with their share of its exposure"""
+    result = ExposureService.get_position_exposure(coin_id)
+    return jsonify(result), 200 if result['success'] else 500
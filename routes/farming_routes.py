@@ -0,0 +1,36 @@
+from flask import Blueprint, render_template, request, flash, jsonify
+from services.database import DatabaseService
+from services.farming_analytics_service import FarmingAnalyticsService
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+farming_routes = Blueprint('farming_routes', __name__)
+
+@farming_routes.route('/farming_analytics')
+@log_function_call(logger)
+@DatabaseService.read_only
+def farming_analytics():
+    """
+    Display impermanent loss, fee yield and APR of the LP and leveraged farm positions.
+    Query args: type ('farming' or 'leveraged')
+    """
+    position_type = request.args.get('type')
+    response = FarmingAnalyticsService.get_analytics(position_type)
+    if not response['success']:
+        flash(response['error'], 'error')
+        return render_template('farming_analytics.html', positions=[], totals={}, position_type=position_type)
+    return render_template('farming_analytics.html',
+                           positions=response['data']['positions'],
+                           totals=response['data']['totals'],
+                           position_type=position_type)
+
+@farming_routes.route('/api/farming/analytics', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_farming_analytics():
+    """
+    Impermanent loss, fee yield and APR per farming position, with totals.
+    Query args: type ('farming' or 'leveraged')
+    """
+    result = FarmingAnalyticsService.get_analytics(request.args.get('type'))
+    return jsonify(result), 200 if result['success'] else 400
@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify
+from services.job_service import JobService
+from services.refresh_scheduler import RefreshScheduler
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+job_routes = Blueprint('job_routes', __name__)
+
+@job_routes.route('/jobs', methods=['GET'])
+@log_function_call(logger)
+def list_jobs():
+    """List the most recent jobs"""
+    result = JobService.list_jobs()
+    return jsonify(result), 200 if result['success'] else 500
+
+@job_routes.route('/jobs/<job_id>', methods=['GET'])
+@log_function_call(logger)
+def get_job(job_id):
+    """
+    Get the status of a job.
+    Running jobs report live progress and per-stage timings.
+    """
+    try:
+        job = JobService.find_job(job_id)
+    except Exception as e:
+        logger.error(f'Error retrieving job {job_id}: {str(e)}', exc_info=True)
+        return jsonify(ResponseHandler.error(f'Failed to retrieve job: {str(e)}')), 500
+    if job is None:
+        return jsonify(ResponseHandler.error(f'Job {job_id} not found')), 404
+    return jsonify(ResponseHandler.success('Job retrieved', data=job)), 200
+
+@job_routes.route('/jobs/<name>/run', methods=['POST'])
+@log_function_call(logger)
+def run_job(name):
+    """Queue a registered refresh or fix as a job and return its ID"""
+    result = RefreshScheduler.trigger(name)
+    return jsonify(result), 202 if result['success'] else 404
@@ -0,0 +1,59 @@
+import os
+from flask import Blueprint, request, jsonify
+from services.database import DatabaseService
+from services.ledger_service import LedgerService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+ledger_routes = Blueprint('ledger_routes', __name__)
+
+@ledger_routes.route('/api/ledger/import', methods=['POST'])
+@log_function_call(logger)
+def import_ledger():
+    """
+    Import transactions from an uploaded CSV or JSON file (form field 'file').
+    Form fields: format ('csv', 'json' or 'jsonl', taken from the file extension when omitted)
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(ResponseHandler.error('No file uploaded')), 400
+    fmt = request.form.get('format') or os.path.splitext(upload.filename)[1].lstrip('.').lower()
+    result = LedgerService.import_transactions(upload.stream, fmt, source=upload.filename)
+    return jsonify(result), 200 if result['success'] else 400
+
+@ledger_routes.route('/api/ledger/transactions', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_ledger_transactions():
+    """
+    Most recent ledger transactions, newest first.
+    Query args: coin, limit (default 100)
+    """
+    result = LedgerService.get_transactions(request.args.get('coin'), request.args.get('limit', 100, type=int))
+    if result['success']:
+        result['data'] = [transaction.to_dict() for transaction in result['data']]
+    return jsonify(result), 200 if result['success'] else 500
+
+@ledger_routes.route('/api/ledger/transactions', methods=['POST'])
+@log_function_call(logger)
+def add_ledger_transaction():
+    """
+    Add one transaction.
+    JSON body: {'timestamp', 'coin', 'side': 'buy' | 'sell', 'amount', 'price', 'fee' (optional), 'id' (optional)}
+    """
+    result = LedgerService.add_transaction(request.get_json(silent=True) or {})
+    if result['success']:
+        result['data'] = result['data'].to_dict()
+    return jsonify(result), 201 if result['success'] else 400
+
+@ledger_routes.route('/api/ledger/pnl', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def get_ledger_pnl():
+    """
+    Cost basis, realized and unrealized PnL per coin.
+    Query args: method ('fifo', 'lifo' or 'average')
+    """
+    result = LedgerService.get_pnl(request.args.get('method'))
+    return jsonify(result), 200 if result['success'] else 400
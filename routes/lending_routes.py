@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify
+from services.database import DatabaseService
+from services.lending_health_service import LendingHealthService
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+lending_routes = Blueprint('lending_routes', __name__)
+
+@lending_routes.route('/api/lending/health', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def lending_health():
+    """Lending pools with their health ratio and per-coin liquidation prices, riskiest first"""
+    result = LendingHealthService.get_health()
+    return jsonify(result), 200 if result['success'] else 500
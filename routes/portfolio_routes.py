@@ -0,0 +1,95 @@
+from flask import Blueprint, request, jsonify
+from services.database import DatabaseService
+from services.portfolio_snapshot_service import PortfolioSnapshotService
+from services.valuation_service import ValuationService
+from services.analytics_service import AnalyticsService
+from services.scenario_service import ScenarioService
+from services.risk_service import RiskService
+from services.price_history_service import HOUR, DAY
+from utils.response import ResponseHandler
+from config import Config
+from utils.logging_config import setup_logger, log_function_call
+
+logger = setup_logger(__name__)
+portfolio_routes = Blueprint('portfolio_routes', __name__)
+
+@portfolio_routes.route('/api/portfolio/history', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def portfolio_history():
+    """
+    Portfolio value series for charts.
+    Query args: start, end (epoch seconds), points (max points, default 500),
+    method ('lttb' or 'avg')
+    """
+    result = PortfolioSnapshotService.get_series(
+        start=request.args.get('start', type=float),
+        end=request.args.get('end', type=float),
+        points=request.args.get('points', 500, type=int),
+        method=request.args.get('method', 'lttb')
+    )
+    return jsonify(result), 200 if result['success'] else 400
+
+@portfolio_routes.route('/api/portfolio/valuation', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def portfolio_valuation():
+    """
+    Current portfolio value with totals per type, chain and protocol.
+    Query args: positions (1 to include every position's value),
+    currency (one of Config.FX_CURRENCIES, default usd)
+    """
+    currency = request.args.get('currency', 'usd').lower()
+    if currency not in Config.FX_CURRENCIES:
+        return jsonify(ResponseHandler.error(f'currency must be one of {", ".join(Config.FX_CURRENCIES)}')), 400
+    result = ValuationService.get_summary(
+        include_positions=request.args.get('positions', 0, type=int) == 1,
+        currency=currency
+    )
+    return jsonify(result), 200 if result['success'] else 500
+
+@portfolio_routes.route('/api/portfolio/analytics', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def portfolio_analytics():
+    """
+    Portfolio totals with value and weight breakdowns.
+    Query args: by (comma separated: position, coin, type, protocol, chain),
+    currency (one of Config.FX_CURRENCIES, default usd)
+    """
+    by = request.args.get('by')
+    result = AnalyticsService.get_summary(by.split(',') if by else None, request.args.get('currency', 'usd'))
+    return jsonify(result), 200 if result['success'] else 400
+
+@portfolio_routes.route('/api/portfolio/scenarios', methods=['POST'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def portfolio_scenarios():
+    """
+    Value the portfolio under price shocks.
+    JSON body: {'scenarios': [{'name': str, 'shocks': {coin: percent move, '*': move for the rest}}],
+                'detail': bool (default true)}
+    """
+    body = request.get_json(silent=True) or {}
+    result = ScenarioService.run_scenarios(body.get('scenarios'), detail=bool(body.get('detail', True)))
+    return jsonify(result), 200 if result['success'] else 400
+
+@portfolio_routes.route('/api/portfolio/risk', methods=['GET'])
+@log_function_call(logger)
+@DatabaseService.read_only
+def portfolio_risk():
+    """
+    Realized volatility, correlation matrix and historical VaR of the held coins.
+    Query args: resolution ('hour' or 'day', default hour), days (default 365),
+    confidence (comma separated percents, default Config.RISK_VAR_CONFIDENCE)
+    """
+    resolution = {'hour': HOUR, 'day': DAY}.get(request.args.get('resolution', 'hour'))
+    if resolution is None:
+        return jsonify(ResponseHandler.error('resolution must be hour or day')), 400
+    confidence = request.args.get('confidence')
+    try:
+        confidence = [float(level) for level in confidence.split(',')] if confidence else None
+    except ValueError:
+        return jsonify(ResponseHandler.error('confidence must be comma separated numbers')), 400
+    result = RiskService.get_risk(resolution, request.args.get('days', 365, type=int), confidence)
+    return jsonify(result), 200 if result['success'] else 400
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for
 from services.staking_service import StakingService
 from services.wallet_service import WalletService # For total portfolio value - temporary
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
 from utils.logging_config import setup_logger, log_function_call
 
 logger = setup_logger(__name__)
@@ -8,6 +10,7 @@ staking_routes = Blueprint('staking_routes', __name__)
 
 @staking_routes.route('/staking')
 @log_function_call(logger)
+@DatabaseService.read_only
 def staking():
     """Display the staking page with all staked positions."""
     sort_by = request.args.get('sort_by', 'Value')
@@ -28,10 +31,8 @@ def staking():
     total_portfolio_value = WalletService.calculate_total_portfolio_value()
 
     # Calculate percentages and create display data
-    staking_with_percent = []
-    for position in staking_positions:
-        percent_of_total = position.calculate_percent_of_total(total_staking_value)
-        staking_with_percent.append((position, percent_of_total))
+    percents = AnalyticsService.percent_of_total([position.value for position in staking_positions], total_staking_value)
+    staking_with_percent = list(zip(staking_positions, percents))
     
     return render_template('staking.html',
                            staking_data=staking_with_percent,
@@ -1,5 +1,8 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from services.wallet_service import WalletService
+from services.database import DatabaseService
+from services.refresh_scheduler import RefreshScheduler
+from services.analytics_service import AnalyticsService
 from utils.logging_config import setup_logger, log_function_call
 from utils.response import ResponseHandler
 import datetime
@@ -10,6 +13,7 @@ wallet_routes = Blueprint('wallet_routes', __name__)
 
 @wallet_routes.route('/wallet')
 @log_function_call(logger)
+@DatabaseService.read_only
 def wallet():
     """
     Display wallet page with current holdings and values.
@@ -43,10 +47,8 @@ def wallet():
         total_wallet_value = WalletService.calculate_total_value()
         total_portfolio_value = WalletService.calculate_total_portfolio_value()
 
-        wallet_with_percent = []
-        for item in wallet_items:
-            percent_of_total = item.calculate_percent_of_total(total_portfolio_value)
-            wallet_with_percent.append((item,percent_of_total))
+        percents = AnalyticsService.percent_of_total([item.value for item in wallet_items], total_portfolio_value)
+        wallet_with_percent = list(zip(wallet_items, percents))
 
         # Determine next sort order for template
         next_order = 'asc' if order == 'desc' else 'desc'
@@ -114,19 +116,19 @@ def update_token():
 @log_function_call(logger)
 def update_wallet_and_prices():
     """
-    Trigger wallet and price update from Moralis
-    Handles the complete update process including new token discovery
+    Queue a wallet and price update from Moralis
+    The update runs on the background refresh scheduler
     """
     try:
-        logger.info('Starting wallet and prices update')
-        result = WalletService.update_wallet_and_prices()
+        logger.info('Queueing wallet and prices update')
+        result = RefreshScheduler.trigger('wallet')
 
         if result['success']:
             flash(result['message'], 'success')
-            logger.info('Successfully update wallet and prices')
+            logger.info('Queued wallet and prices update')
         else:
             flash(result['error'], 'error')
-            logger.error(f'Failed to update wallet and prices: {result["error"]}')
+            logger.error(f'Failed to queue wallet and prices update: {result["error"]}')
         
         return redirect(url_for('wallet_routes.wallet'))
     except Exception as e:
@@ -136,6 +138,7 @@ def update_wallet_and_prices():
     
 @wallet_routes.route('/api/wallet/summary', methods=['GET'])
 @log_function_call(logger)
+@DatabaseService.read_only
 def get_wallet_summary():
     """
     API endpoint for getting wallet summary data.
@@ -0,0 +1,107 @@
+import argparse
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config import Config
+from models.coin import Coin
+from services.database import DatabaseService, STORAGE_PROFILES
+from services.coin_price_service import CoinPriceService, COIN_COLUMNS
+from services.price_aggregation_service import PriceAggregationService
+from services.wallet_service import WalletService
+
+def refresh_workload():
+    '''
+    Rewrite every coin with a jittered price through the same path as update_coin_prices:
+    one transaction for the batch with a savepoint per coin, then consolidate the quotes.
+    '''
+    rows = DatabaseService.execute_query(f'SELECT {", ".join(COIN_COLUMNS)} FROM CoinPrices')
+    with DatabaseService.unit_of_work():
+        for row in rows:
+            coin = Coin.from_dict(dict(zip(COIN_COLUMNS, row)))
+            coin.CurrentPrice = (coin.CurrentPrice or 0) * random.uniform(0.98, 1.02)
+            coin.AlternateNames = CoinPriceService._normalize_alternate_names(coin.AlternateNames)
+            with DatabaseService.transaction():
+                CoinPriceService._update_coin_in_db(coin)
+    PriceAggregationService.consolidate()
+
+
+def page_render_workload():
+    '''Run the queries behind the coin prices and wallet pages in one unit of work'''
+    with DatabaseService.unit_of_work():
+        CoinPriceService.get_all_coins()
+        WalletService.get_wallet_items('value', 'desc')
+        WalletService.calculate_total_value()
+        WalletService.calculate_total_portfolio_value()
+
+
+WORKLOADS = {
+    'refresh': refresh_workload,
+    'page_render': page_render_workload
+}
+
+
+def benchmark_profile(source_db, profile, iterations, workdir):
+    '''
+    Time each workload against a fresh copy of the database tuned with a profile.
+
+    Returns:
+        dict: workload name -> seconds for all iterations
+    '''
+    db_path = Path(workdir) / f'benchmark_{profile}.db'
+    shutil.copy2(source_db, db_path)
+
+    DatabaseService.cleanup()
+    DatabaseService.initialize(str(db_path), replica=False, profile=profile)
+    try:
+        timings = {}
+        for name, workload in WORKLOADS.items():
+            workload()  # warm up caches
+            start = time.perf_counter()
+            for _ in range(iterations):
+                workload()
+            timings[name] = time.perf_counter() - start
+        return timings
+    finally:
+        DatabaseService.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SQLite storage profiles against app workloads')
+    parser.add_argument('-d', '--database', default=Config.DATABASE, help='Database to copy for each run')
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='Iterations per workload')
+    parser.add_argument('-p', '--profiles', nargs='+', default=list(STORAGE_PROFILES), help='Profiles to compare')
+    parser.add_argument('-w', '--weights', nargs=2, type=float, default=[1.0, 1.0], metavar=('REFRESH', 'PAGE_RENDER'),
+                        help='Relative weight of each workload when picking the winner')
+    args = parser.parse_args()
+
+    # Measure storage, not per-query debug logging
+    logging.disable(logging.WARNING)
+
+    weights = dict(zip(WORKLOADS, args.weights))
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for profile in args.profiles:
+            print(f'Benchmarking profile {profile}...')
+            results[profile] = benchmark_profile(args.database, profile, args.iterations, workdir)
+
+    print(f'\n{"Profile":<14}' + ''.join(f'{name:>14}' for name in WORKLOADS) + f'{"Weighted":>14}')
+    scores = {}
+    for profile, timings in results.items():
+        scores[profile] = sum(timings[name] * weights[name] for name in WORKLOADS)
+        print(f'{profile:<14}' + ''.join(f'{timings[name] * 1000:>12.1f}ms' for name in WORKLOADS)
+              + f'{scores[profile] * 1000:>12.1f}ms')
+
+    winner = min(scores, key=scores.get)
+    print(f'\nWinner: {winner}')
+    print(f'Set DATABASE_PROFILE = {winner!r} in config.py to use it')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import requests
+from config import Config
+from models.alert import ALERT_KINDS, AlertRule
+from services.analytics_service import AnalyticsService
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+RULE_COLUMNS = 'id, kind, target, threshold, reference_price, enabled, note, created_at, last_fired_at'
+
+
+class AlertService:
+    """
+    User-defined alerts checked after every price refresh.
+
+    Rules watch a subject: a coin price ('price:<coin>'), a lending pool's
+    health ratio ('health:<pool>') or a position's net value ('value:<position>').
+    Each enabled rule is stored as one or two levels in AlertLevel, indexed by
+    (subject, direction, level), and AlertState keeps the value each subject had
+    at the previous check. A check looks up only the levels that lie between a
+    subject's previous and current value, so its cost depends on the rules
+    crossed rather than the number of rules. Alerts fire on the crossing, not
+    while the value stays beyond the level; 'price_move' rules re-anchor their
+    reference price when they fire.
+
+    Fired alerts are logged and recorded in AlertEvent. With
+    Config.ALERT_WEBHOOK_URL set, AlertEvent doubles as an outbox: pending
+    events are posted to the webhook and marked sent.
+    """
+
+    @classmethod
+    def add_rule(cls, kind: str, target: str, threshold: float, note: str = None) -> Dict[str, Any]:
+        """
+        Create an alert rule.
+
+        Args:
+            kind: One of ALERT_KINDS
+            target: Coin name for price rules, lending pool id for health_below,
+                    position id for value rules
+            threshold: Price, health ratio or value level; percent move for price_move
+            note: Optional free text sent along with the alert
+
+        Returns:
+            ResponseHandler with the created AlertRule
+        """
+        if kind not in ALERT_KINDS:
+            return ResponseHandler.error(f'Unsupported alert kind: {kind}')
+        if not target:
+            return ResponseHandler.error('An alert needs a target')
+        if not isinstance(threshold, (int, float)) or isinstance(threshold, bool) or not np.isfinite(threshold):
+            return ResponseHandler.error('threshold must be a number')
+        try:
+            rule = AlertRule(id=None, kind=kind, target=target, threshold=float(threshold), note=note,
+                             created_at=time.time())
+            current = cls.observe([rule.subject]).get(rule.subject)
+            if kind == 'price_move':
+                if current is None:
+                    return ResponseHandler.error(f'No current price for {target} to measure moves from')
+                rule.reference_price = current
+
+            with DatabaseService.transaction() as conn:
+                cursor = conn.execute(
+                    'INSERT INTO AlertRule (kind, target, threshold, reference_price, note, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (rule.kind, rule.target, rule.threshold, rule.reference_price, rule.note, rule.created_at)
+                )
+                rule.id = cursor.lastrowid
+                cls._write_levels([rule])
+                # Start watching from the current value so the first check sees real crossings
+                if current is not None:
+                    DatabaseService.execute_query(
+                        'INSERT OR IGNORE INTO AlertState VALUES (?, ?, ?)',
+                        (rule.subject, current, rule.created_at), fetch=False
+                    )
+
+            logger.info(f'Created alert rule {rule.id}: {kind} {target} {threshold}')
+            return ResponseHandler.success(f'Created alert rule {rule.id}', data=rule)
+        except Exception as e:
+            logger.error(f'Error creating alert rule: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to create alert rule: {str(e)}')
+
+    @classmethod
+    def get_rules(cls) -> Dict[str, Any]:
+        """
+        Get every alert rule.
+
+        Returns:
+            ResponseHandler with data [AlertRule]
+        """
+        try:
+            rules = [
+                cls._rule_from_row(row)
+                for row in DatabaseService.execute_query(f'SELECT {RULE_COLUMNS} FROM AlertRule ORDER BY id')
+            ]
+            return ResponseHandler.success(f'Retrieved {len(rules)} alert rules', data=rules)
+        except Exception as e:
+            logger.error(f'Error retrieving alert rules: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve alert rules: {str(e)}')
+
+    @classmethod
+    def set_enabled(cls, rule_id: int, enabled: bool) -> Dict[str, Any]:
+        """
+        Enable or disable an alert rule. Disabled rules keep their row but have no levels.
+
+        Args:
+            rule_id: Rule to change
+            enabled: New state
+
+        Returns:
+            ResponseHandler with the updated AlertRule
+        """
+        try:
+            with DatabaseService.transaction():
+                rows = DatabaseService.execute_query(f'SELECT {RULE_COLUMNS} FROM AlertRule WHERE id = ?', (rule_id,))
+                if not rows:
+                    return ResponseHandler.error(f'Alert rule {rule_id} not found')
+                rule = cls._rule_from_row(rows[0])
+                rule.enabled = bool(enabled)
+                DatabaseService.execute_query(
+                    'UPDATE AlertRule SET enabled = ? WHERE id = ?', (int(rule.enabled), rule_id), fetch=False
+                )
+                DatabaseService.execute_query('DELETE FROM AlertLevel WHERE rule_id = ?', (rule_id,), fetch=False)
+                cls._write_levels([rule])
+            return ResponseHandler.success(f'Alert rule {rule_id} {"enabled" if enabled else "disabled"}', data=rule)
+        except Exception as e:
+            logger.error(f'Error updating alert rule {rule_id}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to update alert rule: {str(e)}')
+
+    @classmethod
+    def delete_rule(cls, rule_id: int) -> Dict[str, Any]:
+        """
+        Delete an alert rule and its levels. Events it fired are kept.
+
+        Args:
+            rule_id: Rule to delete
+
+        Returns:
+            ResponseHandler
+        """
+        try:
+            with DatabaseService.transaction():
+                DatabaseService.execute_query('DELETE FROM AlertLevel WHERE rule_id = ?', (rule_id,), fetch=False)
+                DatabaseService.execute_query('DELETE FROM AlertRule WHERE id = ?', (rule_id,), fetch=False)
+                deleted = DatabaseService.execute_query('SELECT changes()')[0][0]
+            if not deleted:
+                return ResponseHandler.error(f'Alert rule {rule_id} not found')
+            return ResponseHandler.success(f'Deleted alert rule {rule_id}')
+        except Exception as e:
+            logger.error(f'Error deleting alert rule {rule_id}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to delete alert rule: {str(e)}')
+
+    @staticmethod
+    def observe(subjects: Iterable[str]) -> Dict[str, float]:
+        """
+        Current value of each subject that has one.
+
+        Prices come from CoinPrices; health ratios and position values from the
+        PortfolioArrays, so they reflect the latest prices.
+
+        Args:
+            subjects: Subjects such as 'price:Bitcoin', 'health:<pool>', 'value:<position>'
+
+        Returns:
+            {subject: value}
+        """
+        by_kind: Dict[str, List[str]] = {}
+        for subject in subjects:
+            prefix, _, target = subject.partition(':')
+            by_kind.setdefault(prefix, []).append(target)
+
+        observed: Dict[str, float] = {}
+        if by_kind.get('price') and DatabaseService.execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'CoinPrices'"
+        ):
+            for name, price in DatabaseService.execute_query(
+                'SELECT Name, CurrentPrice FROM CoinPrices '
+                'WHERE Name IN (SELECT value FROM json_each(?)) AND CurrentPrice IS NOT NULL',
+                (json.dumps(by_kind['price']),)
+            ):
+                observed[f'price:{name}'] = float(price)
+
+        if by_kind.get('health') or by_kind.get('value'):
+            arrays = AnalyticsService.get_arrays()
+            values = arrays.values()
+            position_index = {position: i for i, position in enumerate(arrays.positions)}
+            if by_kind.get('health'):
+                health = arrays.health_ratios(values)
+                for pool in by_kind['health']:
+                    i = position_index.get(pool)
+                    if i is not None and np.isfinite(health[i]):
+                        observed[f'health:{pool}'] = float(health[i])
+            if by_kind.get('value'):
+                position_values = arrays.group_sum(values, 'position')
+                for position in by_kind['value']:
+                    i = position_index.get(position)
+                    if i is not None:
+                        observed[f'value:{position}'] = float(position_values[i])
+        return observed
+
+    @classmethod
+    def check_alerts(cls, source: str = None) -> Dict[str, Any]:
+        """
+        Fire every rule whose level was crossed since the previous check.
+
+        Args:
+            source: What triggered the check, e.g. the refresh task name
+
+        Returns:
+            ResponseHandler with data {'observed': subjects checked, 'fired': [event dicts]}
+        """
+        job = JobService.current()
+        job.stage('alerts')
+        try:
+            subjects = [row[0] for row in DatabaseService.execute_query('SELECT DISTINCT subject FROM AlertLevel')]
+            observed = cls.observe(subjects)
+            now = time.time()
+            status = 'pending' if Config.ALERT_WEBHOOK_URL else 'logged'
+            fired = []
+
+            with DatabaseService.transaction():
+                crossed = DatabaseService.execute_query('''
+                    WITH observed AS (
+                        SELECT o.key AS subject, o.value AS value, s.value AS previous
+                        FROM json_each(?) o
+                        JOIN AlertState s ON s.subject = o.key
+                        WHERE o.value != s.value
+                    )
+                    SELECT l.rule_id, l.level, o.previous, o.value
+                    FROM observed o
+                    JOIN AlertLevel l ON l.subject = o.subject AND l.direction = 'up'
+                        AND l.level > o.previous AND l.level <= o.value
+                    UNION ALL
+                    SELECT l.rule_id, l.level, o.previous, o.value
+                    FROM observed o
+                    JOIN AlertLevel l ON l.subject = o.subject AND l.direction = 'down'
+                        AND l.level < o.previous AND l.level >= o.value
+                ''', (json.dumps(observed),)) if observed else []
+
+                crossings = {row[0]: row for row in crossed}
+                if crossings:
+                    rules = {
+                        row['id']: cls._rule_from_row(row)
+                        for row in DatabaseService.execute_query(
+                            f'SELECT {RULE_COLUMNS} FROM AlertRule WHERE id IN (SELECT value FROM json_each(?))',
+                            (json.dumps(list(crossings)),)
+                        )
+                    }
+                    events = []
+                    for rule_id, (_, level, previous, value) in sorted(crossings.items()):
+                        rule = rules.get(rule_id)
+                        if rule is None:
+                            continue
+                        message = cls._message(rule, level, previous, value)
+                        logger.warning(f'Alert {rule.id} fired: {message}')
+                        events.append((rule.id, rule.kind, rule.target, level, previous, value, message, now, status))
+                        fired.append({
+                            'rule_id': rule.id, 'kind': rule.kind, 'target': rule.target, 'level': level,
+                            'previous_value': previous, 'value': value, 'message': message, 'note': rule.note
+                        })
+                        rule.last_fired_at = now
+                        if rule.kind == 'price_move':
+                            rule.reference_price = value
+
+                    DatabaseService.execute_many('''
+                        INSERT INTO AlertEvent (rule_id, kind, target, level, previous_value, value, message, fired_at, status)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', events)
+                    DatabaseService.execute_many(
+                        'UPDATE AlertRule SET last_fired_at = ?, reference_price = ? WHERE id = ?',
+                        [(now, rule.reference_price, rule.id) for rule in rules.values()]
+                    )
+                    # Moves are measured from the price they last fired at
+                    moved = [rule for rule in rules.values() if rule.kind == 'price_move']
+                    DatabaseService.execute_many(
+                        'DELETE FROM AlertLevel WHERE rule_id = ?', [(rule.id,) for rule in moved]
+                    )
+                    cls._write_levels(moved)
+
+                DatabaseService.execute_many('''
+                    INSERT INTO AlertState VALUES (?, ?, ?)
+                    ON CONFLICT(subject) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                ''', [(subject, value, now) for subject, value in observed.items()])
+
+            if Config.ALERT_WEBHOOK_URL:
+                # Also retries events a previous delivery failed on
+                cls.deliver_outbox()
+
+            job.add_report(alerts_fired=len(fired))
+            logger.info(f'Checked {len(observed)} alert subjects after {source}, {len(fired)} alerts fired')
+            return ResponseHandler.success(
+                f'{len(fired)} alerts fired', data={'observed': len(observed), 'fired': fired}
+            )
+        except Exception as e:
+            logger.error(f'Error checking alerts: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to check alerts: {str(e)}')
+
+    @classmethod
+    def deliver_outbox(cls) -> Dict[str, Any]:
+        """
+        Post pending alert events to Config.ALERT_WEBHOOK_URL in one request.
+
+        Events that still fail after Config.ALERT_WEBHOOK_MAX_ATTEMPTS tries are marked failed.
+
+        Returns:
+            ResponseHandler with data {'sent': events delivered}
+        """
+        if not Config.ALERT_WEBHOOK_URL:
+            return ResponseHandler.error('No alert webhook configured')
+        try:
+            events = [dict(row) for row in DatabaseService.execute_query(
+                "SELECT * FROM AlertEvent WHERE status = 'pending' ORDER BY id"
+            )]
+            if not events:
+                return ResponseHandler.success('No pending alerts', data={'sent': 0})
+            ids = [(event['id'],) for event in events]
+            try:
+                response = requests.post(Config.ALERT_WEBHOOK_URL, json={'alerts': events},
+                                         timeout=Config.ALERT_WEBHOOK_TIMEOUT)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f'Alert webhook failed for {len(events)} events: {str(e)}')
+                DatabaseService.execute_many('''
+                    UPDATE AlertEvent
+                    SET attempts = attempts + 1,
+                        status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END
+                    WHERE id = ?
+                ''', [(Config.ALERT_WEBHOOK_MAX_ATTEMPTS, event_id) for (event_id,) in ids])
+                return ResponseHandler.error(f'Alert webhook failed: {str(e)}')
+
+            DatabaseService.execute_many(
+                "UPDATE AlertEvent SET status = 'sent', attempts = attempts + 1 WHERE id = ?", ids
+            )
+            logger.info(f'Delivered {len(events)} alerts to webhook')
+            return ResponseHandler.success(f'Delivered {len(events)} alerts', data={'sent': len(events)})
+        except Exception as e:
+            logger.error(f'Error delivering alerts: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to deliver alerts: {str(e)}')
+
+    @classmethod
+    def get_events(cls, limit: int = 100, status: str = None) -> Dict[str, Any]:
+        """
+        Get the most recent fired alerts.
+
+        Args:
+            limit: Maximum events returned
+            status: Only events with this status ('logged', 'pending', 'sent', 'failed')
+
+        Returns:
+            ResponseHandler with data [event dicts], newest first
+        """
+        try:
+            where, params = (' WHERE status = ?', (status, limit)) if status else ('', (limit,))
+            events = [dict(row) for row in DatabaseService.execute_query(
+                f'SELECT * FROM AlertEvent{where} ORDER BY id DESC LIMIT ?', params
+            )]
+            return ResponseHandler.success(f'Retrieved {len(events)} alerts', data=events)
+        except Exception as e:
+            logger.error(f'Error retrieving alerts: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve alerts: {str(e)}')
+
+    @staticmethod
+    def _write_levels(rules: List[AlertRule]) -> None:
+        DatabaseService.execute_many(
+            'INSERT OR IGNORE INTO AlertLevel VALUES (?, ?, ?, ?)',
+            [(rule.subject, direction, level, rule.id) for rule in rules if rule.enabled
+             for direction, level in rule.levels()]
+        )
+
+    @staticmethod
+    def _rule_from_row(row) -> AlertRule:
+        return AlertRule(
+            id=row['id'],
+            kind=row['kind'],
+            target=row['target'],
+            threshold=row['threshold'],
+            reference_price=row['reference_price'],
+            enabled=bool(row['enabled']),
+            note=row['note'],
+            created_at=row['created_at'],
+            last_fired_at=row['last_fired_at']
+        )
+
+    @staticmethod
+    def _message(rule: AlertRule, level: float, previous: float, value: float) -> str:
+        subject = {'price': 'price', 'health': 'health ratio', 'value': 'value'}[ALERT_KINDS[rule.kind][0]]
+        moved = 'rose above' if value > previous else 'fell below'
+        message = f'{rule.target} {subject} {moved} {level:g} ({previous:g} -> {value:g})'
+        if rule.kind == 'price_move':
+            reference = rule.reference_price
+            message = f'{rule.target} moved {(value - reference) / reference * 100:+.2f}% from {reference:g} to {value:g}'
+        return f'{message}: {rule.note}' if rule.note else message
@@ -0,0 +1,194 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from models.analytics import PortfolioArrays
+from services.database import DatabaseService
+from services.fx_service import FxService, BASE_CURRENCY
+from services.position_legs import legs_in
+from services.valuation_service import ValuationService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+BREAKDOWNS = ['position', 'coin', 'type', 'protocol', 'chain']
+
+
+class AnalyticsService:
+    """
+    Vectorized portfolio math over PortfolioArrays.
+
+    Every position leg (see POSITION_LEGS) is loaded with its stored price
+    and value into aligned NumPy arrays once per DatabaseService.data_version();
+    values, weights and per-coin breakdowns are then whole-array operations,
+    so their cost barely grows with the number of positions. Totals and the
+    per-position/type/protocol/chain breakdowns are ValuationService's, so the
+    analytics and valuation endpoints agree to the micro-dollar.
+    """
+
+    _cache: Optional[Tuple[object, int, PortfolioArrays]] = None  # (pool, data version, arrays)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_arrays(cls, use_cache: bool = True) -> PortfolioArrays:
+        """
+        Load every position leg with its stored price and value into aligned arrays.
+
+        Args:
+            use_cache: Reuse the arrays loaded at the current data version
+
+        Returns:
+            PortfolioArrays
+        """
+        pool = DatabaseService.get_pool()
+        version = DatabaseService.data_version()
+        cacheable = not DatabaseService.has_uncommitted_writes()
+        if use_cache and cacheable:
+            with cls._lock:
+                cached = cls._cache
+            if cached and cached[0] is pool and cached[1] == version:
+                return cached[2]
+
+        rows = DatabaseService.execute_query(cls._legs_query())
+        arrays = cls.build_arrays(version, rows)
+        logger.debug(f'Loaded {arrays.size} position legs over {len(arrays.coins)} coins at data version {version}')
+
+        if cacheable:
+            with cls._lock:
+                cls._cache = (pool, version, arrays)
+        return arrays
+
+    @staticmethod
+    def build_arrays(version: int, rows: List[Iterable]) -> PortfolioArrays:
+        """
+        Build PortfolioArrays from rows of (position_id, coin_id, position_type, protocol, chain,
+        amount net of debt, stored price, stored value net of debt, collateral factor or None).
+        """
+        # Legs in position order, so per-position sums are contiguous
+        rows = sorted(rows, key=lambda row: str(row[0]))
+        columns = list(zip(*rows)) if rows else [()] * 9
+        position_ids, coin_ids, types, protocols, chains, amounts, stored, values, factors = columns
+
+        def encode(values):
+            labels, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+            return labels.tolist(), codes.astype(np.intp)
+
+        positions, position_idx = encode(position_ids)
+        coins, coin_idx = encode(coin_ids)
+        type_labels, type_idx = encode(types)
+        protocol_labels, protocol_idx = encode(protocols)
+        chain_labels, chain_idx = encode(chains)
+
+        # One price per coin; repricing gives every leg of a coin the same stored price
+        stored_prices = np.nan_to_num(np.array(stored, dtype=float))
+        prices = np.full(len(coins), np.nan)
+        prices[coin_idx] = stored_prices
+
+        return PortfolioArrays(
+            data_version=version,
+            positions=positions,
+            coins=coins,
+            types=type_labels,
+            protocols=protocol_labels,
+            chains=chain_labels,
+            position_idx=position_idx,
+            coin_idx=coin_idx,
+            type_idx=type_idx,
+            protocol_idx=protocol_idx,
+            chain_idx=chain_idx,
+            amounts=np.nan_to_num(np.array(amounts, dtype=float)),
+            stored_prices=stored_prices,
+            stored_values=np.nan_to_num(np.array(values, dtype=float)),
+            prices=prices,
+            collateral_factors=np.array(factors, dtype=float)
+        )
+
+    @classmethod
+    def get_summary(cls, breakdowns: List[str] = None, currency: str = BASE_CURRENCY) -> Dict[str, Any]:
+        """
+        Totals, weights and breakdowns at the current data version.
+
+        Args:
+            breakdowns: Any of BREAKDOWNS, defaults to coin, type, protocol and chain
+            currency: Currency to report values in, one of Config.FX_CURRENCIES
+
+        Returns:
+            ResponseHandler with data {'data_version', 'total', 'gross_total', 'debt_total',
+            'by_<breakdown>': {label: value}, 'weights': {<breakdown>: {label: percent}}, 'currency'}
+        """
+        breakdowns = breakdowns or ['coin', 'type', 'protocol', 'chain']
+        unknown = [by for by in breakdowns if by not in BREAKDOWNS]
+        if unknown:
+            return ResponseHandler.error(f'Unsupported breakdowns: {", ".join(unknown)}')
+        try:
+            valuation = ValuationService.get_valuation()
+            total = valuation.total
+            data = {
+                'data_version': valuation.data_version,
+                'total': total,
+                'gross_total': valuation.gross_total,
+                'debt_total': valuation.debt_total,
+                'weights': {}
+            }
+            for by in breakdowns:
+                if by == 'coin':
+                    # Positions split across coins per leg; exact integer sums of leg value units
+                    arrays = cls.get_arrays()
+                    sums = arrays.breakdown(by, arrays.value_units())
+                else:
+                    sums = getattr(valuation, f'by_{by}')
+                data[f'by_{by}'] = sums
+                data['weights'][by] = dict(zip(sums, cls.percent_of_total(list(sums.values()), total)))
+            fields = ['total', 'gross_total', 'debt_total'] + [f'by_{by}' for by in breakdowns]
+            data = FxService.convert_fields(data, currency, fields)
+            return ResponseHandler.success('Portfolio analytics computed', data=data)
+        except Exception as e:
+            logger.error(f'Error computing portfolio analytics: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to compute portfolio analytics: {str(e)}')
+
+    @staticmethod
+    def percent_of_total(values, total: float) -> List[float]:
+        """Percent of total for every value at once, 0 when the total isn't positive"""
+        values = np.asarray(values, dtype=float)
+        if total <= 0:
+            return np.zeros(len(values)).tolist()
+        return (values * (100.0 / total)).tolist()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached arrays"""
+        with cls._lock:
+            cls._cache = None
+
+    @staticmethod
+    def _legs_query() -> str:
+        """Union of the legs of every position table that exists, with protocol and chain"""
+        existing = {row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        legs = [
+            f"SELECT {leg.position_column}, {leg.coin_column}, '{leg.position_type}', {leg.amount}, {leg.price}, "
+            f"{leg.net_value}, {leg.collateral_factor} FROM {leg.table}"
+            for leg in legs_in(existing)
+        ] or ['SELECT NULL, NULL, NULL, 0, 0, 0, NULL WHERE 0']
+        joins = ''
+        protocol, chain, factor = "'unknown'", "'unknown'", 'l.factor'
+        if 'Position' in existing:
+            joins += ' LEFT JOIN Position p ON p.id = l.position_id'
+            protocol = "COALESCE(p.protocol_id, 'unknown')"
+            if 'Protocol' in existing:
+                joins += ' LEFT JOIN Protocol pr ON pr.name = p.protocol_id'
+                chain = "COALESCE(pr.chain_id, 'unknown')"
+            if 'ProtocolCollateralConfig' in existing:
+                # The protocol's configured factor wins over the one stored with the position
+                joins += ' LEFT JOIN ProtocolCollateralConfig pcc ON pcc.protocol_id = p.protocol_id AND pcc.coin_id = l.coin_id'
+                factor = 'CASE WHEN l.factor IS NOT NULL THEN COALESCE(pcc.collateral_factor, l.factor) END'
+        union = '\n            UNION ALL '.join(legs)
+        return f'''
+            WITH legs(position_id, coin_id, position_type, amount, price, value, factor) AS (
+                {union}
+            )
+            SELECT l.position_id, COALESCE(l.coin_id, 'unknown'), l.position_type, {protocol}, {chain},
+                   l.amount, l.price, l.value, {factor}
+            FROM legs l{joins}
+        '''
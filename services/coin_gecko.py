@@ -40,6 +40,53 @@ class CoinGeckoService:
         logger.info(f'Successfully fetch a total of {len(all_coins)} coins from CoinGeck API')
         return ResponseHandler.success('Fetched coins from API', data=all_coins)
     
+    @staticmethod
+    @log_function_call(logger)
+    def fetch_coins_by_ids(api_ids, per_page=250):
+        '''
+        Fetch market data for specific coins, up to per_page coins per API call.
+
+        Returns entries in the same format as fetch_coin_prices.
+        '''
+        url = f'{CoinGeckoService.BASE_URL}/coins/markets'
+        api_ids = list(api_ids)
+        coins = []
+        for start in range(0, len(api_ids), per_page):
+            batch = api_ids[start:start + per_page]
+            params = {
+                'x_cg_demo_api_key': Config.CG_API_KEY,
+                'vs_currency': 'usd',
+                'ids': ','.join(batch),
+                'per_page': per_page,
+                'page': 1,
+                'sparkline': 'false',
+                'price_change_percentage': '1h,24h',
+            }
+            logger.info(f'Fetching prices for {len(batch)} coins from CoinGecko API')
+            response = CoinGeckoService._make_request(url, params=params)
+
+            if response['success']:
+                coins.extend(response['data'])
+            else:
+                logger.error(f'Failed to fetch batch starting at {batch[0]}: {response["error"]}')
+        if not coins and api_ids:
+            return ResponseHandler.error('Failed to fetch any coins from API')
+        return ResponseHandler.success(f'Fetched {len(coins)} coins from API', data=coins)
+
+    @staticmethod
+    @log_function_call(logger)
+    def fetch_exchange_rates():
+        '''
+        Fetch BTC exchange rates for every fiat and crypto currency CoinGecko supports.
+
+        One call covers all currencies: data['rates'][currency]['value'] is the
+        price of one BTC in that currency.
+        '''
+        url = f'{CoinGeckoService.BASE_URL}/exchange_rates'
+        params = {'x_cg_demo_api_key': Config.CG_API_KEY}
+        logger.info('Fetching exchange rates from CoinGecko API')
+        return CoinGeckoService._make_request(url, params=params)
+
     @staticmethod
     @log_function_call(logger)
     def fetch_single_coin_price(api_id, max_retries=5):
@@ -1,15 +1,36 @@
 from services.database import DatabaseService
 from services.coin_gecko import CoinGeckoService
 from services.table_uniformity_manager import TableUniformityManager
+from services.job_service import JobService
+from services.price_aggregation_service import PriceAggregationService
 from utils.response import ResponseHandler
 from utils.logging_config import setup_logger, log_function_call
+from utils.single_flight import single_flight
 from models.coin import Coin
-from typing import List
-import json, re
+from config import Config
+from typing import List, Optional, Set
+import json, re, time
 
 logger = setup_logger(__name__)
 
+COIN_COLUMNS = ['Name', 'CurrentPrice', 'MarketCap', 'MarketCapRank', 'TotalVolume', 'High24h', 'Low24h',
+                'PriceChange24h', 'PriceChangePercentage24h', 'MarketCapChange24h', 'MarketCapChangePercentage24h',
+                'PriceChangePercentage1h', 'DisplayName', 'ApiId', 'AlternateNames', 'LastUpdated']
+
 class CoinPriceService:
+    @staticmethod
+    def get_fresh_coin_names(max_age: float) -> Set[str]:
+        '''
+        Get the coins whose price was written less than max_age seconds ago.
+        '''
+        if not max_age:
+            return set()
+        result = DatabaseService.execute_query(
+            'SELECT Name FROM CoinPrices WHERE LastUpdated >= ?',
+            (time.time() - max_age,)
+        )
+        return {row[0] for row in result}
+
     @staticmethod
     def _normalize_alternate_names(names) -> List[str]:
         '''
@@ -60,13 +81,11 @@ class CoinPriceService:
 
     @staticmethod
     def get_all_coins(sort_by='MarketCap', order='desc'):
-        query = f'SELECT * FROM CoinPrices ORDER BY {sort_by} {"DESC" if order == "desc" else "ASC"}'
+        query = f'SELECT {", ".join(COIN_COLUMNS)} FROM CoinPrices ORDER BY {sort_by} {"DESC" if order == "desc" else "ASC"}'
         result = DatabaseService.execute_query(query)
         coins = []
         for row in result:
-            coin_dict = dict(zip(['Name', 'CurrentPrice', 'MarketCap', 'MarketCapRank', 'TotalVolume', 'High24h', 'Low24h',
-                                  'PriceChange24h', 'PriceChangePercentage24h', 'MarketCapChange24h', 'MarketCapChangePercentage24h',
-                                  'PriceChangePercentage1h', 'DisplayName', 'ApiId', 'AlternateNames'], row))
+            coin_dict = dict(zip(COIN_COLUMNS, row))
             
             # Clean up alternate names
             coin_dict['AlternateNames'] = CoinPriceService._normalize_alternate_names(
@@ -80,44 +99,59 @@ class CoinPriceService:
         return ResponseHandler.success('Coins retrieved successfully', data=coins)
     
     @staticmethod
-    def update_coin_prices():
+    def update_coin_prices(max_age: float = None):
+        '''
+        Refresh the top 500 coins and every other coin with an API ID.
+
+        Args:
+            max_age: Only refresh coins whose price is older than this many seconds,
+                     defaults to Config.PRICE_REFRESH_MIN_AGE. 0 refreshes everything.
+        '''
         logger.info('Starting coin price update')
-        response = CoinGeckoService.fetch_coin_prices()
-        if not response['success']:
-            logger.error('Failed to fetch coin prices from CoinGecko')
-            return ResponseHandler.error('Failed to fetch coin prices')
-        
-        coins = response['data']
+        max_age = Config.PRICE_REFRESH_MIN_AGE if max_age is None else max_age
+        fresh_coins = CoinPriceService.get_fresh_coin_names(max_age)
+        job = JobService.current()
+
+        job.stage('fetch_top_coins')
+        stale_top = DatabaseService.execute_query(
+            'SELECT COUNT(*) FROM CoinPrices WHERE MarketCapRank BETWEEN 1 AND 500 AND (LastUpdated IS NULL OR LastUpdated < ?)',
+            (time.time() - max_age,)
+        )[0][0] if fresh_coins else None
+        if stale_top == 0:
+            # Everything the bulk fetch would return was written moments ago
+            logger.info(f'All top coins were refreshed in the last {max_age}s, skipping the top 500 fetch')
+            coins = []
+        else:
+            response = CoinGeckoService.fetch_coin_prices()
+            if not response['success']:
+                logger.error('Failed to fetch coin prices from CoinGecko')
+                return ResponseHandler.error('Failed to fetch coin prices')
+            coins = response['data']
         logger.info(f'Fetched {len(coins)} coins from CoinGecko')
 
         top_500_coins = set()
         updated_count = 0
-        for coin_data in coins:
-            try:
-                coin = Coin(
-                    Name=coin_data['name'],
-                    CurrentPrice=coin_data['current_price'],
-                    MarketCap=coin_data['market_cap'],
-                    MarketCapRank=coin_data['market_cap_rank'],
-                    TotalVolume=coin_data['total_volume'],
-                    High24h=coin_data['high_24h'],
-                    Low24h=coin_data['low_24h'],
-                    PriceChange24h=coin_data['price_change_24h'],
-                    PriceChangePercentage24h=coin_data['price_change_percentage_24h'],
-                    MarketCapChange24h=coin_data['market_cap_change_24h'],
-                    MarketCapChangePercentage24h=coin_data['market_cap_change_percentage_24h'],
-                    PriceChangePercentage1h=coin_data['price_change_percentage_1h_in_currency'],
-                    ApiId=coin_data['id'],
-                    DisplayName=coin_data['name'],
-                    AlternateNames=[] # init - changed later
-                )
-                top_500_coins.add(coin.Name)
-                CoinPriceService._update_coin_in_db(coin)
-                updated_count += 1
-            except KeyError as e:
-                logger.error(f'Failed to process coin data for {coin_data.get("name", "Unknown")}: Missing key {str(e)}')
-            except Exception as e:
-                logger.error(f'Failed to update price for {coin_data.get("name", "Unknown")}: {str(e)}')
+        skipped_fresh = 0
+        job.stage('update_top_coins', total=len(coins))
+        # One transaction for the whole batch; each coin gets its own savepoint
+        # so a bad row is rolled back on its own without losing the rest
+        with DatabaseService.unit_of_work():
+            for coin_data in coins:
+                try:
+                    coin = CoinPriceService._coin_from_market_data(coin_data)
+                    top_500_coins.add(coin.Name)
+                    if coin.Name in fresh_coins:
+                        skipped_fresh += 1
+                        job.advance()
+                        continue
+                    with DatabaseService.transaction():
+                        CoinPriceService._update_coin_in_db(coin)
+                    updated_count += 1
+                except KeyError as e:
+                    logger.error(f'Failed to process coin data for {coin_data.get("name", "Unknown")}: Missing key {str(e)}')
+                except Exception as e:
+                    logger.error(f'Failed to update price for {coin_data.get("name", "Unknown")}: {str(e)}')
+                job.advance()
             
         logger.info(f'Updated {updated_count} coins from top 500 list')
         # Fetch all coins
@@ -125,7 +159,12 @@ class CoinPriceService:
         logger.info(f'Fetch {len(all_db_coins)} coins from database for additional updates')
 
         additional_updates = 0
+        job.stage('update_other_coins', total=len(all_db_coins))
         for name, api_id in all_db_coins:
+            job.advance()
+            if name in fresh_coins and name not in top_500_coins:
+                skipped_fresh += 1
+                continue
             if (name not in top_500_coins) and api_id:
                 logger.info(f'Fetching data for {name} (API ID: {api_id})')
                 response = CoinGeckoService.fetch_single_coin_price(api_id)
@@ -154,10 +193,35 @@ class CoinPriceService:
                     logger.warning(f'Failed to update data for {name} (API ID: {api_id})')
         logger.info(f'Updated and additional {additional_updates} coins not in top 500')
         logger.info(f'Finished updating coin prices. Total updates: {updated_count + additional_updates}')
+        if skipped_fresh:
+            logger.info(f'Skipped {skipped_fresh} coins refreshed in the last {max_age}s')
+        job.add_report(fetched=len(coins), top_coins_updated=updated_count, other_coins_updated=additional_updates,
+                       skipped_fresh=skipped_fresh)
         return ResponseHandler.success('Coin prices updated successfully')
         
     
         
+    @staticmethod
+    def _coin_from_market_data(coin_data) -> Coin:
+        '''Build a Coin from an entry of CoinGecko's /coins/markets response'''
+        return Coin(
+            Name=coin_data['name'],
+            CurrentPrice=coin_data['current_price'],
+            MarketCap=coin_data['market_cap'],
+            MarketCapRank=coin_data['market_cap_rank'],
+            TotalVolume=coin_data['total_volume'],
+            High24h=coin_data['high_24h'],
+            Low24h=coin_data['low_24h'],
+            PriceChange24h=coin_data['price_change_24h'],
+            PriceChangePercentage24h=coin_data['price_change_percentage_24h'],
+            MarketCapChange24h=coin_data['market_cap_change_24h'],
+            MarketCapChangePercentage24h=coin_data['market_cap_change_percentage_24h'],
+            PriceChangePercentage1h=coin_data['price_change_percentage_1h_in_currency'],
+            ApiId=coin_data['id'],
+            DisplayName=coin_data['name'],
+            AlternateNames=[] # init - changed later
+        )
+
     @staticmethod
     def update_coin_names(coin_name, new_alternate_names, new_display_name, api_id):
         try:
@@ -176,11 +240,15 @@ class CoinPriceService:
                                 ApiId = ?
                             WHERE Name = ?'''
             params = (json.dumps(new_alternate_names), new_display_name, api_id, coin_name)
-            DatabaseService.execute_query(update_query, params)
 
-            # Update the name in all other tables only if the display name has changed
+            with DatabaseService.transaction():
+                DatabaseService.execute_query(update_query, params)
+
+                # Update the name in all other tables only if the display name has changed
+                if current_display_name != new_display_name:
+                    TableUniformityManager.update_coin_display_name(current_display_name, new_display_name)
+
             if current_display_name != new_display_name:
-                TableUniformityManager.update_coin_display_name(current_display_name, new_display_name)
                 return ResponseHandler.success('Display name updated successfully across all tables')
             else:
                 return ResponseHandler.success("Coin information updated successfully")
@@ -192,7 +260,7 @@ class CoinPriceService:
         query = '''
             SELECT ApiId, DisplayName, CurrentPrice
             FROM CoinPrices
-            WHERE LOWER(ApiId) = LOWER(?) OR LOWER(Name) = LOWER(?) OR LOWER(?) OR LOWER(DisplayName) = LOWER(?)
+            WHERE LOWER(ApiId) = LOWER(?) OR LOWER(Name) = LOWER(?) OR LOWER(DisplayName) = LOWER(?)
         '''
         result = DatabaseService.execute_query(query, (token.lower(), token.lower(), token.lower()))
         if result:
@@ -202,7 +270,7 @@ class CoinPriceService:
     @staticmethod
     def find_coin_by_name(name):
         query = '''
-            SELECT Name, DisplayName, AlternameNames, ApiId
+            SELECT Name, DisplayName, AlternateNames, ApiId
             FROM CoinPrices
             WHERE LOWER(Name) = LOWER(?) OR LOWER(DisplayName) = LOWER(?) OR LOWER(AlternateNames) LIKE LOWER(?)
         '''
@@ -213,7 +281,29 @@ class CoinPriceService:
     
     @staticmethod
     @log_function_call(logger)
-    def insert_or_update_coin(api_id):
+    @single_flight(key=lambda api_id, max_age=None: (api_id, Config.PRICE_REFRESH_MIN_AGE if max_age is None else max_age))
+    def insert_or_update_coin(api_id, max_age: float = None):
+        '''
+        Fetch one coin from CoinGecko and store it.
+
+        Concurrent calls for the same api_id and max_age share one fetch and its result,
+        so a forced fetch never joins one that may skip a fresh coin.
+
+        Args:
+            api_id: CoinGecko API ID of the coin
+            max_age: Skip the fetch if the coin's price is younger than this many seconds,
+                     defaults to Config.PRICE_REFRESH_MIN_AGE. 0 always fetches.
+        '''
+        max_age = Config.PRICE_REFRESH_MIN_AGE if max_age is None else max_age
+        if max_age:
+            fresh = DatabaseService.execute_query(
+                'SELECT Name FROM CoinPrices WHERE ApiId = ? AND LastUpdated >= ?',
+                (api_id, time.time() - max_age)
+            )
+            if fresh:
+                logger.info(f'Skipping fetch for {api_id}: refreshed in the last {max_age}s')
+                return ResponseHandler.success('Coin is already up to date')
+
         response = CoinGeckoService.fetch_single_coin_price(api_id)
         if not response['success']:
             logger.error(f'Failed to fetch coin data for {api_id}')
@@ -240,6 +330,8 @@ class CoinPriceService:
         )
 
         CoinPriceService._update_coin_in_db(coin)
+        # Other sources' quotes may outvote CoinGecko's
+        PriceAggregationService.consolidate([coin.Name])
         logger.info(f'Token {coin.DisplayName} updated successfully')
         return ResponseHandler.success('Coin updated successfully')
     
@@ -276,23 +368,25 @@ class CoinPriceService:
             name.strip("'\"") for name in coin.AlternateNames if name
         ])
 
-        query = '''
-        INSERT OR REPLACE INTO CoinPrices (
-            Name, CurrentPrice, MarketCap, MarketCapRank, TotalVolume, High24h, Low24h,
-            PriceChange24h, PriceChangePercentage24h, MarketCapChange24h, MarketCapChangePercentage24h,
-            PriceChangePercentage1h, DisplayName, ApiId, AlternateNames
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        # CurrentPrice is only written by PriceAggregationService.consolidate(), which
+        # weighs this quote against the other sources'; a new coin has none until then
+        columns = [column for column in COIN_COLUMNS if column != 'CurrentPrice']
+        query = f'''
+        INSERT INTO CoinPrices ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(Name) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns[1:])}
         '''
-        
+        coin.LastUpdated = time.time()
+
 
         params = (
-            coin.Name, coin.CurrentPrice, coin.MarketCap, coin.MarketCapRank, coin.TotalVolume, coin.High24h, coin.Low24h,
+            coin.Name, coin.MarketCap, coin.MarketCapRank, coin.TotalVolume, coin.High24h, coin.Low24h,
             coin.PriceChange24h, coin.PriceChangePercentage24h, coin.MarketCapChange24h,
             coin.MarketCapChangePercentage24h, coin.PriceChangePercentage1h,
-            coin.DisplayName, coin.ApiId, alternate_names_json
+            coin.DisplayName, coin.ApiId, alternate_names_json, coin.LastUpdated
         )
 
         DatabaseService.execute_query(query, params)
+        PriceAggregationService.record_quote(coin.Name, 'coingecko', coin.CurrentPrice, coin.LastUpdated)
         logger.info(f'Updated/Inserted coin: {coin.Name} with alternate Names: {alternate_names_json}')
         #logging.debug(f'Inserted data: {json.dumps(dict(zip(query.split("(")[1].split(")")[0].split(", "), params)), indent=2)}')
 
@@ -344,8 +438,12 @@ class CoinPriceService:
 
         
         logger.info(f'Found {len(rows)} rows with non-empty alternate names')
+        job = JobService.current()
+        job.stage('fix_alternate_names', total=len(rows))
+        updated_count = 0
 
         for name, alternate_names in rows:
+            job.advance()
 
             logger.info(f'Processing {name}: {alternate_names!r}')
             cleaned_names = []
@@ -388,6 +486,7 @@ class CoinPriceService:
                     if cleaned_names != alternate_names:
                         update_query = f'UPDATE {table_name} SET AlternateNames = ? WHERE Name = ?'
                         DatabaseService.execute_query(update_query, (cleaned_json, name))
+                        updated_count += 1
                         logger.info(f'Updated {name}:')
                         logger.info(f'Original: {alternate_names}')
                         logger.info(f'Cleaned: {cleaned_names}')
@@ -398,4 +497,7 @@ class CoinPriceService:
                 logger.error(f'Error processing {name}: {type(e).__name__}: {str(e)}')
                 logger.error(f'Raw Value: {alternate_names!r}')
                 continue
+
+        job.add_report(rows_checked=len(rows), rows_updated=updated_count)
+        return ResponseHandler.success(f'Fixed alternate names in {updated_count} rows')
                     
\ No newline at end of file
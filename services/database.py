@@ -1,17 +1,23 @@
-import sqlite3, threading
-from sqlite3 import Connection
-from typing import Any, List, Optional, Dict, Union
-from contextlib import contextmanager
+import sqlite3, threading, itertools, os
+from sqlite3 import Connection, Cursor
+from typing import Any, Callable, List, Optional, Dict, Union
+from contextlib import closing, contextmanager
+from functools import wraps
 from threading import Lock, local
 import queue
 from datetime import datetime
 from dataclasses import dataclass
 from pathlib import Path
+from flask import current_app, g, has_app_context
 from config import Config
+from services.schema import apply_schema
 from utils.logging_config import setup_logger
 
 logger = setup_logger(__name__)
 
+# Default for arguments where None is a meaningful value
+_DEFAULT = object()
+
 @dataclass
 class QueryMetrics:
     """Tracks query performance metrics"""
@@ -28,11 +34,108 @@ class QueryMetrics:
             return (self.end_time - self.start_time).total_seconds() * 1000
         return 0
 
+@dataclass
+class ChangeRecord:
+    """A row that changed in a tracked table"""
+    version: int
+    table_name: str
+    row_key: str
+    operation: str  # 'I'nsert, 'U'pdate or 'D'elete
+
+
+# Tables with trigger-maintained change tracking, mapped to their key column
+TRACKED_TABLES = {
+    'CoinPrices': 'Name',
+    'Wallet': 'position_id',
+    'Staking': 'position_id',
+    'FarmingPool': 'position_id',
+    'LeveragedFarmingPool': 'position_id',
+    'LendingPool': 'position_id',
+    'CollateralPosition': 'position_id',
+    'BorrowPosition': 'position_id',
+    'Position': 'id',
+    'Protocol': 'name',
+    'ProtocolCollateralConfig': ('protocol_id', 'coin_id')
+}
+
+
+def _row_key(row: str, key: Union[str, tuple]) -> str:
+    """SQL expression for a tracked row's key; composite keys are joined with ':'"""
+    columns = (key,) if isinstance(key, str) else key
+    return " || ':' || ".join(f'{row}.{column}' for column in columns)
+
+@dataclass
+class StorageProfile:
+    """A named set of SQLite tuning pragmas"""
+    name: str
+    journal_mode: str
+    synchronous: str
+    cache_size: int  # negative values are KiB, positive values are pages
+    mmap_size: int
+    temp_store: str
+    page_size: int
+
+    def apply_persistent(self, conn: Connection) -> None:
+        """
+        Apply the settings stored in the database file itself.
+
+        Changing the page size rewrites the file with VACUUM, which can't be
+        done in WAL mode, so the journal is switched back afterwards.
+        """
+        current_page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        if current_page_size != self.page_size:
+            conn.execute('PRAGMA journal_mode = DELETE')
+            conn.execute(f'PRAGMA page_size = {self.page_size}')
+            conn.execute('VACUUM')
+        conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+
+    def apply(self, conn: Connection) -> None:
+        """Apply the per-connection settings"""
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA cache_size = {self.cache_size}')
+        conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+        conn.execute(f'PRAGMA temp_store = {self.temp_store}')
+
+
+STORAGE_PROFILES = {
+    # Many small reads from page renders, occasional refresh writes
+    'dashboard': StorageProfile(
+        name='dashboard',
+        journal_mode='WAL',
+        synchronous='NORMAL',
+        cache_size=-16000,
+        mmap_size=64 * 1024 * 1024,
+        temp_store='MEMORY',
+        page_size=4096
+    ),
+    # Large refresh batches where losing the last commit on power loss is acceptable
+    'bulk_ingest': StorageProfile(
+        name='bulk_ingest',
+        journal_mode='WAL',
+        synchronous='OFF',
+        cache_size=-64000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store='MEMORY',
+        page_size=8192
+    ),
+    # Every commit is fsynced before returning
+    'durable': StorageProfile(
+        name='durable',
+        journal_mode='DELETE',
+        synchronous='FULL',
+        cache_size=-2000,
+        mmap_size=0,
+        temp_store='DEFAULT',
+        page_size=4096
+    )
+}
+
 class DatabaseConnection:
     """Manages a single database connection with transaction support"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, profile: Optional[StorageProfile] = None):
         self.db_path = db_path
+        self.profile = profile
         self.conn: Optional[Connection] = None
         self.transaction_level = 0
         self._lock = threading.Lock()
@@ -52,6 +155,8 @@ class DatabaseConnection:
                 detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
             )
             self.conn.row_factory = sqlite3.Row
+            if self.profile:
+                self.profile.apply(self.conn)
     
     def close(self) -> None:
         """Close the database connection"""
@@ -66,36 +171,53 @@ class DatabaseConnection:
     def transaction(self):
         """
         Transaction context manager supporting nested transactions.
-        Only commit when the outermost transaction exits successfully.
+
+        The outermost level opens a real transaction and commits when it exits
+        successfully. Nested levels (or any level entered while the connection
+        is already inside a transaction) run in a SAVEPOINT, so an inner failure
+        only rolls back the inner block and the caller can decide whether to
+        carry on with the outer transaction.
         """
         if not self.conn:
             self.connect()
-            
+
         with self._lock:
             self.transaction_level += 1
-        
+            savepoint = None
+            if self.conn.in_transaction:
+                savepoint = f'sp_{self.transaction_level}'
+                self.conn.execute(f'SAVEPOINT {savepoint}')
+            else:
+                self.conn.execute('BEGIN')
+
         try:
             yield self.conn
-
-            with self._lock:
-                self.transaction_level -= 1
-                if self.transaction_level == 0:
-                    self.conn.commit()
-
         except Exception:
             with self._lock:
-                if self.transaction_level > 0:
+                if savepoint:
+                    self.conn.execute(f'ROLLBACK TO {savepoint}')
+                    self.conn.execute(f'RELEASE {savepoint}')
+                else:
                     self.conn.rollback()
-                self.transaction_level = 0
             raise
+        else:
+            with self._lock:
+                if savepoint:
+                    self.conn.execute(f'RELEASE {savepoint}')
+                else:
+                    self.conn.commit()
+        finally:
+            with self._lock:
+                self.transaction_level -= 1
 
 
 class ConnectionPool:
     """Manages a pool of database connections"""
 
-    def __init__(self, db_path: str, max_connections: int = 5):
+    def __init__(self, db_path: str, max_connections: int = 5, profile: Optional[StorageProfile] = None):
         self.db_path = db_path
         self.max_connections = max_connections
+        self.profile = profile
         self._local = threading.local()
         self._lock = threading.Lock()
 
@@ -103,26 +225,189 @@ class ConnectionPool:
         """Get a connection from the pool"""
         if not hasattr(self._local, 'connection'):
             with self._lock:
-                self._local.connection = DatabaseConnection(self.db_path)
+                self._local.connection = self.create_connection()
                 self._local.connection.connect()
         return self._local.connection
+
+    def create_connection(self) -> DatabaseConnection:
+        """Create a connection outside the per-thread pool, with the pool's profile"""
+        return DatabaseConnection(self.db_path, self.profile)
         
     def close_all(self) -> None:
         """Close all connections in the pool"""
         if hasattr(self._local, 'connection'):
             self._local.connection.close()
             delattr(self._local, 'connection')
-            
+
+
+class UnitOfWork:
+    """
+    Shares one connection and one transaction across every query in a unit of work.
+
+    The transaction is opened with BEGIN up front so all reads see the same
+    snapshot, and writes are committed once when the unit of work closes.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseConnection,
+        on_commit: Optional[Callable[[], None]] = None,
+        changed: Optional[Callable[[Connection], bool]] = None
+    ):
+        self.db = db
+        self.db.connect()
+        self.db.conn.execute('BEGIN')
+        self.on_commit = on_commit
+        self.changed = changed or (lambda conn: conn.total_changes > 0)
+        self.closed = False
+        self._after_close: List[Callable[[], None]] = []
+
+    @property
+    def conn(self) -> Connection:
+        return self.db.conn
+
+    def execute(self, query: str, params: tuple = None) -> Cursor:
+        """Execute a query on the shared connection"""
+        return self.db.conn.execute(query, params or ())
+
+    def after_close(self, callback: Callable[[], None]) -> None:
+        """Run callback once the unit of work has committed or rolled back"""
+        self._after_close.append(callback)
+
+    def close(self, commit: bool = True) -> None:
+        """Commit (or roll back) the shared transaction and release the connection"""
+        if self.closed:
+            return
+        try:
+            if commit:
+                self.db.conn.commit()
+                changed = self.changed(self.db.conn)
+            else:
+                self.db.conn.rollback()
+                changed = False
+        finally:
+            self.closed = True
+            self.db.close()
+
+        if changed and self.on_commit:
+            self.on_commit()
+        callbacks, self._after_close = self._after_close, []
+        for callback in callbacks:
+            callback()
+
+
+class ReplicaSnapshot:
+    """
+    An immutable in-memory copy of the database taken at one point in time.
+
+    The copy is a named shared-cache memory database. Each thread reads it
+    through its own connection, so readers never wait on each other.
+    """
+
+    _names = itertools.count()
+
+    def __init__(self, uri: str, conn: Connection, schema_version: int):
+        self.uri = uri
+        self.conn = conn  # keeps the memory database alive
+        self.schema_version = schema_version  # of the database file when it was copied
+        self.created_at = datetime.utcnow()
+        self._local = threading.local()
+
+    @classmethod
+    def build(cls, db_path: str) -> 'ReplicaSnapshot':
+        """Copy the database at db_path into a new memory database"""
+        uri = f'file:replica-{os.getpid()}-{next(cls._names)}?mode=memory&cache=shared'
+        conn = cls._connect(uri)
+        with closing(sqlite3.connect(db_path)) as source:
+            # Read before copying: a schema change in between only costs an extra refresh
+            schema_version = source.execute('PRAGMA schema_version').fetchone()[0]
+            source.backup(conn)
+        conn.execute('PRAGMA query_only = ON')
+        return cls(uri, conn, schema_version)
+
+    @staticmethod
+    def _connect(uri: str) -> Connection:
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def connection(self) -> Connection:
+        """Get this thread's connection to the snapshot"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect(self.uri)
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def execute(self, query: str, params: tuple = None) -> List[sqlite3.Row]:
+        """Run a read-only query against the snapshot"""
+        return self.connection().execute(query, params or ()).fetchall()
+
+
+class ReadReplica:
+    """
+    Serves read-only queries from an in-memory copy of the database.
+
+    The copy is rebuilt with the sqlite backup API after writes commit (once
+    per write batch, see DatabaseService.write_batch) and swapped in as a
+    whole, so readers never touch disk or wait on the writer and a reader
+    holding the previous snapshot keeps a consistent view.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._snapshot = ReplicaSnapshot.build(db_path)
+
+    def refresh(self) -> None:
+        """Build a fresh snapshot and swap it in"""
+        snapshot = ReplicaSnapshot.build(self.db_path)
+        with self._lock:
+            self._snapshot = snapshot
+        logger.debug(f'Refreshed read replica of {self.db_path}')
+
+    def current(self) -> ReplicaSnapshot:
+        """Get the latest snapshot"""
+        with self._lock:
+            return self._snapshot
+
+    def schema_changed(self, conn: Connection) -> bool:
+        """Whether the schema seen by conn differs from the one the latest snapshot was copied with"""
+        return conn.execute('PRAGMA schema_version').fetchone()[0] != self.current().schema_version
+
 class DatabaseService:
     """Enhanced database service with connection pooling and transaction management"""
 
     _pool: Optional[ConnectionPool] = None
     _lock: Lock = threading.Lock()
     _initialized: bool = False
+    _scope = threading.local()
+    _replica: Optional[ReadReplica] = None
 
     @classmethod
-    def initialize(cls, db_path: str = None, max_connections: int = 5) -> None:
-        """Initialize the database service"""
+    def initialize(
+        cls,
+        db_path: str = None,
+        max_connections: int = 5,
+        replica: bool = None,
+        profile: Optional[str] = _DEFAULT
+    ) -> None:
+        """
+        Initialize the database service
+
+        Args:
+            db_path: Path to the database file (defaults to Config.DATABASE)
+            max_connections: Size of the connection pool
+            replica: Serve read-only routes from an in-memory replica
+                     (defaults to Config.DATABASE_REPLICA)
+            profile: Name of a STORAGE_PROFILES entry to tune the database with
+                     (defaults to Config.DATABASE_PROFILE, None leaves SQLite defaults)
+        """
         if not cls._initialized:
             with cls._lock:
                 if not cls._initialized:
@@ -136,19 +421,42 @@ class DatabaseService:
                         db_dir = Path(db_path).parent
                         db_dir.mkdir(exist_ok=True)
 
+                        # Resolve storage profile
+                        if profile is _DEFAULT:
+                            profile = Config.DATABASE_PROFILE
+                        storage_profile = None
+                        if profile:
+                            if profile not in STORAGE_PROFILES:
+                                raise ValueError(f'Unknown storage profile: {profile}')
+                            storage_profile = STORAGE_PROFILES[profile]
+                            with closing(sqlite3.connect(db_path)) as conn:
+                                storage_profile.apply_persistent(conn)
+
                         # initialize connection pool
-                        cls._pool = ConnectionPool(db_path, max_connections)
+                        cls._pool = ConnectionPool(db_path, max_connections, storage_profile)
 
                         # Test connection
-                        with cls.get_connection() as conn:
+                        with cls._pool.get_connection() as conn:
                             if not conn:
                                 raise RuntimeError('Failed to create database connection')
-                            
+
+                        cls.create_schema()
+
+                        if replica is None:
+                            replica = Config.DATABASE_REPLICA
+                        if replica:
+                            cls._replica = ReadReplica(db_path)
+                            logger.info('Serving read-only queries from an in-memory replica')
+
                         cls._initialized = True
-                        logger.info(f'Initialized database connection pool with {max_connections} connections')
+                        logger.info(
+                            f'Initialized database connection pool with {max_connections} connections '
+                            f'(storage profile: {profile or "default"})'
+                        )
                     
                     except Exception as e:
                         cls._pool = None
+                        cls._replica = None
                         cls._initialized = False
                         logger.error(f'Failed to initialize database: {str(e)}')
                         raise RuntimeError(f'Database initialization failed: {str(e)}') from e
@@ -168,7 +476,196 @@ class DatabaseService:
         if not cls._initialized:
             cls.initialize()
         return cls._pool.get_connection()
-        
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """
+        Bind a unit of work to each Flask app context.
+
+        The first query in a request opens the unit of work and every later
+        query in that request reuses its connection and snapshot. Writes are
+        committed once when the app context tears down, or rolled back if the
+        request raised.
+        """
+        app.extensions['database_service'] = cls
+        app.teardown_appcontext(cls._teardown_unit_of_work)
+
+    @classmethod
+    def current_unit_of_work(cls) -> Optional[UnitOfWork]:
+        """Get the active unit of work for this thread or app context, if any"""
+        uow = getattr(cls._scope, 'unit_of_work', None)
+        if uow is not None:
+            return uow
+        if has_app_context() and 'database_service' in current_app.extensions:
+            if '_unit_of_work' not in g:
+                g._unit_of_work = UnitOfWork(cls.get_pool().create_connection(), cls._after_commit, cls._changed)
+            return g._unit_of_work
+        return None
+
+    @classmethod
+    def after_unit_of_work(cls, callback: Callable[[], None]) -> bool:
+        """
+        Defer callback until the active unit of work closes.
+
+        For writes that must not wait on the unit's write lock, such as job
+        progress written through execute_detached.
+
+        Returns:
+            False if no unit of work is active; callback is then not called
+        """
+        uow = cls.active_unit_of_work()
+        if uow is None:
+            return False
+        uow.after_close(callback)
+        return True
+
+    @classmethod
+    def active_unit_of_work(cls) -> Optional[UnitOfWork]:
+        """Get the open unit of work for this thread or app context without opening one"""
+        uow = getattr(cls._scope, 'unit_of_work', None)
+        if uow is None and has_app_context():
+            uow = g.get('_unit_of_work')
+        if uow is None or uow.closed:
+            return None
+        return uow
+
+    @classmethod
+    @contextmanager
+    def unit_of_work(cls):
+        """
+        Run a block of service calls against one connection and transaction.
+
+        Reuses the active unit of work when one exists, so nested calls join
+        the outer transaction instead of committing on their own.
+        """
+        current = cls.current_unit_of_work()
+        if current is not None:
+            yield current
+            return
+
+        uow = UnitOfWork(cls.get_pool().create_connection(), cls._after_commit, cls._changed)
+        cls._scope.unit_of_work = uow
+        try:
+            yield uow
+            uow.close(commit=True)
+        except Exception:
+            uow.close(commit=False)
+            raise
+        finally:
+            cls._scope.unit_of_work = None
+
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """
+        Run a block of queries as one transaction, nesting with SAVEPOINTs.
+
+        Joins the active unit of work (opening one if needed) and wraps the
+        block in a savepoint. If the block raises, only its own writes are
+        rolled back and the exception propagates, so composite operations can
+        isolate failures per item while still committing once. Inside a
+        transaction block execute_query raises on errors instead of returning
+        an empty result.
+
+        Yields:
+            The shared sqlite3 connection
+        """
+        with cls.unit_of_work() as uow:
+            with uow.db.transaction() as conn:
+                yield conn
+
+    @classmethod
+    @contextmanager
+    def replica_reads(cls):
+        """
+        Route SELECT queries in this block to the read replica.
+
+        The block is pinned to the snapshot that was current when it started,
+        so every read in it sees the same data. Does nothing when replica mode
+        is off.
+        """
+        if not cls._initialized:
+            cls.initialize()
+        previous = getattr(cls._scope, 'replica', None)
+        cls._scope.replica = cls._replica.current() if cls._replica else None
+        try:
+            yield
+        finally:
+            cls._scope.replica = previous
+
+    @classmethod
+    def read_only(cls, func):
+        """Decorator for routes that only read, serving their queries from the replica"""
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with cls.replica_reads():
+                return func(*args, **kwargs)
+        return wrapper
+
+    @classmethod
+    def refresh_replica(cls) -> None:
+        """Rebuild the read replica from the database file"""
+        if cls._replica:
+            cls._replica.refresh()
+
+    @classmethod
+    @contextmanager
+    def write_batch(cls):
+        """
+        Refresh the read replica once for a batch of writes.
+
+        Commits made on this thread inside the block only mark the replica
+        stale; it is rebuilt when the outermost batch ends. Every job runs in
+        a batch, so a refresh rebuilds the replica once rather than per commit.
+        """
+        depth = getattr(cls._scope, 'batch_depth', 0)
+        cls._scope.batch_depth = depth + 1
+        try:
+            yield
+        finally:
+            cls._scope.batch_depth = depth
+            if depth == 0 and getattr(cls._scope, 'replica_stale', False):
+                cls._scope.replica_stale = False
+                cls._after_commit()
+
+    @classmethod
+    def _changed(cls, conn: Connection) -> bool:
+        """
+        Whether a commit on conn changed rows, or the schema the replica was copied with.
+
+        DDL doesn't count towards total_changes, so tables created since the
+        replica was built are found by comparing PRAGMA schema_version.
+        """
+        if conn.total_changes > 0:
+            return True
+        return cls._replica is not None and cls._replica.schema_changed(conn)
+
+    @classmethod
+    def _after_commit(cls) -> None:
+        """Called after a commit that changed rows or the schema"""
+        if cls._replica and getattr(cls._scope, 'batch_depth', 0):
+            cls._scope.replica_stale = True
+        elif cls._replica:
+            try:
+                cls._replica.refresh()
+            except Exception as e:
+                logger.error(f'Failed to refresh read replica: {str(e)}', exc_info=True)
+
+    @staticmethod
+    def _is_read_query(query: str) -> bool:
+        return query.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+    @classmethod
+    def _teardown_unit_of_work(cls, exc: Optional[BaseException]) -> None:
+        """Commit or roll back the app context's unit of work"""
+        uow = g.pop('_unit_of_work', None)
+        if uow is None:
+            return
+        try:
+            uow.close(commit=exc is None)
+        except Exception as e:
+            logger.error(f'Failed to close unit of work: {str(e)}', exc_info=True)
+
 
     @classmethod
     def execute_query(
@@ -195,29 +692,73 @@ class DatabaseService:
             start_time=datetime.utcnow()
         )
 
+        uow = None
         try:
-            conn = cls.get_connection()
-            with conn:
-                cursor = conn.execute(query, params or ())
-                if fetch:
-                    results = cursor.fetchall()
-                    metrics.end_time = datetime.utcnow()
-                    cls._log_metrics(metrics)
-                    return results
-
-                metrics.end_time = datetime.utcnow()
-                cls._log_metrics(metrics)
-                return None
+            snapshot = getattr(cls._scope, 'replica', None)
+            if snapshot is not None and fetch and cls._is_read_query(query):
+                results = snapshot.execute(query, params)
+            else:
+                uow = cls.current_unit_of_work()
+                if uow is not None:
+                    cursor = uow.execute(query, params)
+                    results = cursor.fetchall() if fetch else None
+                else:
+                    with cls.get_connection() as conn:
+                        cursor = conn.execute(query, params or ())
+                        results = cursor.fetchall() if fetch else None
+                        conn.commit()
+                        changed = cls._changed(conn)
+                    if changed:
+                        cls._after_commit()
+
+            metrics.end_time = datetime.utcnow()
+            cls._log_metrics(metrics)
+            return results
             
         except Exception as e:
             metrics.error = str(e)
             metrics.end_time = datetime.utcnow()
             cls._log_metrics(metrics)
             logger.error(f'Database error executing query: {str(e)}', exc_info=True)
+            if uow is not None and uow.db.transaction_level > 0:
+                # Let the enclosing transaction block roll back its savepoint
+                raise
             if fetch:
                 return []
             return None
 
+    @classmethod
+    def execute_detached(
+        cls,
+        query: str,
+        params: tuple = None,
+        fetch: bool = True
+    ) -> Union[List[sqlite3.Row], None]:
+        """
+        Execute a query on its own connection and commit it immediately.
+
+        Bypasses the active unit of work and replica, for bookkeeping (job
+        status, progress) that other threads must see right away. Errors are
+        raised rather than swallowed. Don't call this after writing in the
+        same unit of work, as it would wait on that unit's write lock.
+
+        Args:
+            query: SQL query to execute
+            params: Query parameters
+            fetch: Whether to fetch and return results
+
+        Returns:
+            Query results if fetch=True, None otherwise
+        """
+        with cls.get_pool().create_connection() as conn:
+            cursor = conn.execute(query, params or ())
+            results = cursor.fetchall() if fetch else None
+            conn.commit()
+            changed = cls._changed(conn)
+        if changed:
+            cls._after_commit()
+        return results
+
     @classmethod
     def execute_transaction(cls, queries: List[Dict[str, Any]]) -> None:
         """
@@ -227,8 +768,7 @@ class DatabaseService:
             queries: List of dicts with 'query' and optional 'params' keys
         """
         try:
-            conn = cls.get_connection()
-            with conn:
+            with cls.transaction() as conn:
                 for query_dict in queries:
                     query = query_dict['query']
                     params = query_dict.get('params', None)
@@ -238,6 +778,24 @@ class DatabaseService:
             logger.error(f'Transaction failed: {str(e)}', exc_info=True)
             return False
 
+    @classmethod
+    def execute_many(cls, query: str, params_seq) -> int:
+        """
+        Execute a query once per parameter tuple in a single transaction.
+
+        Joins the active unit of work if there is one. Errors are raised.
+
+        Args:
+            query: SQL query to execute
+            params_seq: Iterable of parameter tuples
+
+        Returns:
+            Number of rows changed
+        """
+        with cls.transaction() as conn:
+            cursor = conn.executemany(query, params_seq)
+            return cursor.rowcount
+
     @classmethod
     def _log_metrics(cls, metrics: QueryMetrics) -> None:
         """Log query performance metrics"""
@@ -254,10 +812,141 @@ class DatabaseService:
         else:
             logger.debug(log_msg)
 
+    @classmethod
+    def create_schema(cls) -> None:
+        """
+        Create the app's own tables (see services.schema), migrate older tables
+        and install change tracking.
+
+        Run by initialize() before the replica is copied. Call it again after
+        creating tables it migrates or tracks.
+        """
+        pool = cls._pool or cls.get_pool()
+        with pool.get_connection() as conn:
+            apply_schema(conn)
+        cls.install_change_tracking()
+        cls.refresh_replica()
+
+    @classmethod
+    def install_change_tracking(cls, tables: Dict[str, str] = None) -> List[str]:
+        """
+        Install the change log and its triggers on the tracked tables.
+
+        Every insert, update and delete on a tracked table records the row's
+        key in ChangeLog under a new, monotonically increasing version. The
+        log keeps only the latest change per row, so it stays as small as the
+        tracked tables themselves. Tables that don't exist yet are skipped;
+        call this again after creating them. Safe to run repeatedly; triggers
+        are recreated so a changed key takes effect.
+
+        Args:
+            tables: Mapping of table name to key column, or tuple of columns for a
+                    composite key (defaults to TRACKED_TABLES)
+
+        Returns:
+            Names of the tables that are now tracked
+        """
+        tables = tables or TRACKED_TABLES
+        tracked = []
+        pool = cls._pool or cls.get_pool()
+        with pool.get_connection() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS ChangeLog (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    operation TEXT NOT NULL CHECK(operation IN ('I', 'U', 'D')),
+                    UNIQUE (table_name, row_key)
+                );
+            ''')
+            existing = {
+                row[0] for row in
+                conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            for table, key in tables.items():
+                if table not in existing:
+                    continue
+                log_select = 'INSERT OR REPLACE INTO ChangeLog (table_name, row_key, operation) SELECT'
+                log = 'INSERT OR REPLACE INTO ChangeLog (table_name, row_key, operation) VALUES'
+                old_key, new_key = _row_key('OLD', key), _row_key('NEW', key)
+                conn.executescript(f'''
+                    DROP TRIGGER IF EXISTS cdc_{table}_insert;
+                    DROP TRIGGER IF EXISTS cdc_{table}_update;
+                    DROP TRIGGER IF EXISTS cdc_{table}_delete;
+                    CREATE TRIGGER cdc_{table}_insert AFTER INSERT ON {table}
+                    BEGIN
+                        {log} ('{table}', {new_key}, 'I');
+                    END;
+                    CREATE TRIGGER cdc_{table}_update AFTER UPDATE ON {table}
+                    BEGIN
+                        {log_select} '{table}', {old_key}, 'D' WHERE {old_key} IS NOT {new_key};
+                        {log} ('{table}', {new_key}, 'U');
+                    END;
+                    CREATE TRIGGER cdc_{table}_delete AFTER DELETE ON {table}
+                    BEGIN
+                        {log} ('{table}', {old_key}, 'D');
+                    END;
+                ''')
+                tracked.append(table)
+        logger.debug(f'Change tracking installed on: {", ".join(tracked)}')
+        return tracked
+
+    @classmethod
+    def data_version(cls) -> int:
+        """Get the current data version (0 if nothing has changed yet)"""
+        result = cls.execute_query("SELECT seq FROM sqlite_sequence WHERE name = 'ChangeLog'")
+        return result[0][0] if result else 0
+
+    @classmethod
+    def has_uncommitted_writes(cls) -> bool:
+        """
+        Whether the open unit of work has written rows it hasn't committed yet.
+
+        Its data version is not safe to cache on: a rollback also rolls back the
+        version, and a later commit reuses it for different data.
+        """
+        uow = cls.active_unit_of_work()
+        return uow is not None and uow.conn.total_changes > 0
+
+    @classmethod
+    def changes_since(cls, version: int, tables: List[str] = None) -> List[ChangeRecord]:
+        """
+        Get the rows that changed after a data version.
+
+        Each row is reported once with its latest change, in version order.
+
+        Args:
+            version: Data version the caller last saw
+            tables: Only report changes to these tables
+
+        Returns:
+            List of ChangeRecord
+        """
+        query = '''
+            SELECT version, table_name, row_key, operation
+            FROM ChangeLog
+            WHERE version > ?
+        '''
+        params = [version]
+        if tables:
+            query += f' AND table_name IN ({", ".join("?" for _ in tables)})'
+            params.extend(tables)
+        query += ' ORDER BY version'
+
+        result = cls.execute_query(query, tuple(params))
+        return [ChangeRecord(*row) for row in result]
+
+    @classmethod
+    def prune_change_log(cls, version: int) -> None:
+        """Drop change log entries at or before a version every consumer has seen"""
+        cls.execute_query('DELETE FROM ChangeLog WHERE version <= ?', (version,), fetch=False)
+
     @classmethod
     def cleanup(cls) -> None:
         """Clean up database connections"""
         if cls._pool:
             cls._pool.close_all()
             cls._pool = None
+        cls._replica = None
+        cls._initialized = False
     
\ No newline at end of file
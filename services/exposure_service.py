@@ -0,0 +1,252 @@
+import json
+from typing import Any, Dict, Optional, Set
+from models.exposure import CoinExposure
+from services.database import DatabaseService
+from services.job_service import JobService
+from services.position_legs import POSITION_TABLES, legs_in
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# CoinExposure column -> position type summed into it
+TYPE_COLUMNS = {
+    'WalletValue': 'wallet',
+    'StakedValue': 'staking',
+    'LPValue': 'farming',
+    'LendingBorrowingValue': 'lending',
+    'LeverageFarmValue': 'leveraged',
+}
+
+SORT_COLUMNS = {
+    'Token': 'Token',
+    'Total': 'TotalValue',
+    'Wallet': 'WalletValue',
+    'Staked': 'StakedValue',
+    'LP': 'LPValue',
+    'Lending': 'LendingBorrowingValue',
+    'Leveraged': 'LeverageFarmValue',
+}
+
+
+class ExposureService:
+    """
+    Maintains CoinExposure, PositionExposure and CoinGroup from the position tables.
+
+    Each run reads the change log since the last processed data version,
+    finds the coins held (before or after) by the positions that changed,
+    and recomputes the exposure rows of just those coins: per-coin totals in
+    CoinExposure and one PositionExposure row per position and coin, with its
+    share of the coin's total and of the coin's total within its position
+    type. The first run, or one with rebuild=True, recomputes every coin.
+    Readers get a plain indexed SELECT.
+    """
+
+    @classmethod
+    def update_exposure(cls, source: str = None, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the exposure tables up to date with the position tables.
+
+        Args:
+            source: What triggered the update, e.g. the refresh task name
+            rebuild: Recompute every coin instead of only the changed ones
+
+        Returns:
+            ResponseHandler with data {'coins': coins recomputed, 'positions': positions changed}
+        """
+        job = JobService.current()
+        job.stage('update_exposure')
+        try:
+            existing = cls._existing_tables()
+            with DatabaseService.transaction():
+                version = DatabaseService.data_version()
+                watermark = DatabaseService.execute_query('SELECT version FROM ExposureWatermark WHERE id = 1')
+                if rebuild or not watermark:
+                    positions = None
+                    coins = None
+                else:
+                    changes = DatabaseService.changes_since(watermark[0][0], tables=POSITION_TABLES)
+                    version = max([version] + [change.version for change in changes])
+                    positions = {change.row_key for change in changes}
+                    coins = cls._coins_of(positions, existing) if positions else set()
+
+                if coins is None or coins:
+                    cls._recompute(coins, existing)
+                DatabaseService.execute_query(
+                    'INSERT OR REPLACE INTO ExposureWatermark (id, version) VALUES (1, ?)', (version,), fetch=False
+                )
+
+            data = {
+                'coins': len(coins) if coins is not None else 'all',
+                'positions': len(positions) if positions is not None else 'all'
+            }
+            job.add_report(exposure_coins=data['coins'])
+            logger.info(f'Updated exposure after {source}: {data}')
+            return ResponseHandler.success('Exposure updated', data=data)
+        except Exception as e:
+            logger.error(f'Error updating exposure: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to update exposure: {str(e)}')
+
+    @classmethod
+    def get_coin_exposure(cls, sort_by: str = 'Total', order: str = 'desc') -> Dict[str, Any]:
+        """
+        Get the exposure per coin.
+
+        Args:
+            sort_by: One of SORT_COLUMNS, defaults to total value
+            order: 'asc' or 'desc'
+
+        Returns:
+            ResponseHandler with a list of CoinExposure as data
+        """
+        column = SORT_COLUMNS.get(sort_by, 'TotalValue')
+        direction = 'ASC' if order == 'asc' else 'DESC'
+        try:
+            rows = DatabaseService.execute_query(f'''
+                SELECT Token, TotalValue, WalletValue, StakedValue, LPValue, LendingBorrowingValue, LeverageFarmValue
+                FROM CoinExposure
+                ORDER BY {column} {direction}
+            ''')
+            return ResponseHandler.success(
+                f'Retrieved exposure for {len(rows)} coins',
+                data=[CoinExposure(*(value if value is not None else 0.0 for value in row)) for row in rows]
+            )
+        except Exception as e:
+            logger.error(f'Error retrieving coin exposure: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve coin exposure: {str(e)}')
+
+    @staticmethod
+    def get_position_exposure(coin_id: str) -> Dict[str, Any]:
+        """Get every position holding a coin, largest first"""
+        try:
+            rows = DatabaseService.execute_query('''
+                SELECT position_id, position_value, position_percent, type_percent
+                FROM PositionExposure
+                WHERE coin_id = ?
+                ORDER BY position_value DESC
+            ''', (coin_id,))
+            return ResponseHandler.success(
+                f'Retrieved {len(rows)} positions holding {coin_id}',
+                data=[dict(row) for row in rows]
+            )
+        except Exception as e:
+            logger.error(f'Error retrieving exposure for {coin_id}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve exposure for {coin_id}: {str(e)}')
+
+    @staticmethod
+    def _existing_tables() -> Set[str]:
+        return {row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+
+    @staticmethod
+    def _legs_query(existing: Set[str], filter_column: str = None) -> str:
+        """
+        Union of the exposure legs of every position table that exists.
+
+        Args:
+            existing: Names of the existing tables
+            filter_column: 'coin' or 'position' to keep only legs whose coin or
+                           position is in the JSON array bound to each leg's parameter
+        """
+        legs = []
+        for leg in legs_in(existing):
+            # Legs are keyed by their own row (the change log's key), so a lending
+            # pool's collateral and borrows are separate positions here
+            where = f' AND {leg.coin_column if filter_column == "coin" else "position_id"} IN (SELECT value FROM json_each(?))' \
+                if filter_column else ''
+            legs.append(
+                f"SELECT {leg.coin_column} AS coin_id, position_id, '{leg.position_type}' AS position_type, "
+                f"{leg.net_value} AS value FROM {leg.table} WHERE {leg.coin_column} IS NOT NULL{where}"
+            )
+        return '\nUNION ALL '.join(legs) or "SELECT NULL, NULL, NULL, NULL WHERE 0"
+
+    @classmethod
+    def _leg_params(cls, existing: Set[str], values: Set[str]) -> tuple:
+        """The JSON array parameter, once per leg of _legs_query"""
+        count = len(legs_in(existing))
+        return (json.dumps(sorted(values)),) * count
+
+    @classmethod
+    def _coins_of(cls, positions: Set[str], existing: Set[str]) -> Set[str]:
+        """Coins the positions held at the last update or hold now"""
+        batch = json.dumps(sorted(positions))
+        previous = DatabaseService.execute_query(
+            'SELECT DISTINCT coin_id FROM PositionExposure WHERE position_id IN (SELECT value FROM json_each(?))',
+            (batch,)
+        )
+        current = DatabaseService.execute_query(
+            f'SELECT DISTINCT coin_id FROM ({cls._legs_query(existing, "position")})',
+            cls._leg_params(existing, positions)
+        )
+        return {row[0] for row in previous} | {row[0] for row in current}
+
+    @classmethod
+    def _recompute(cls, coins: Optional[Set[str]], existing: Set[str]) -> None:
+        """
+        Recompute the exposure rows of some coins (or all, when coins is None)
+        from their legs, staged once in a temp table.
+        """
+        DatabaseService.execute_query('''
+            CREATE TEMP TABLE IF NOT EXISTS ExposureLeg (
+                coin_id TEXT, position_id TEXT, position_type TEXT, value REAL
+            )
+        ''', fetch=False)
+        DatabaseService.execute_query('DELETE FROM temp.ExposureLeg', fetch=False)
+        if coins is None:
+            DatabaseService.execute_query(f'INSERT INTO temp.ExposureLeg {cls._legs_query(existing)}', fetch=False)
+            scope, scope_params = '', ()
+        else:
+            DatabaseService.execute_query(
+                f'INSERT INTO temp.ExposureLeg {cls._legs_query(existing, "coin")}',
+                cls._leg_params(existing, coins),
+                fetch=False
+            )
+            scope, scope_params = ' WHERE {column} IN (SELECT value FROM json_each(?))', (json.dumps(sorted(coins)),)
+
+        display_name = 'COALESCE(c.DisplayName, l.coin_id)' if 'CoinPrices' in existing else 'l.coin_id'
+        coin_join = ' LEFT JOIN CoinPrices c ON c.Name = l.coin_id' if 'CoinPrices' in existing else ''
+        DatabaseService.execute_query(f'''
+            INSERT OR IGNORE INTO CoinGroup (id, name, display_name)
+            SELECT DISTINCT l.coin_id, l.coin_id, {display_name}
+            FROM temp.ExposureLeg l{coin_join}
+        ''', fetch=False)
+
+        DatabaseService.execute_query(
+            'DELETE FROM CoinExposure' + scope.format(column='Token'), scope_params, fetch=False
+        )
+        type_sums = ', '.join(
+            f"SUM(CASE WHEN position_type = '{position_type}' THEN value ELSE 0 END)"
+            for position_type in TYPE_COLUMNS.values()
+        )
+        DatabaseService.execute_query(f'''
+            INSERT INTO CoinExposure (Token, TotalValue, {", ".join(TYPE_COLUMNS)})
+            SELECT coin_id, SUM(value), {type_sums}
+            FROM temp.ExposureLeg
+            GROUP BY coin_id
+        ''', fetch=False)
+
+        DatabaseService.execute_query(f'''
+            INSERT INTO PositionExposure (id, position_id, coin_id, position_value, position_percent, type_percent)
+            SELECT position_id || ':' || coin_id, position_id, coin_id, value,
+                   COALESCE(value * 100.0 / NULLIF(SUM(value) OVER (PARTITION BY coin_id), 0), 0),
+                   COALESCE(value * 100.0 / NULLIF(SUM(value) OVER (PARTITION BY coin_id, position_type), 0), 0)
+            FROM (
+                SELECT coin_id, position_id, position_type, SUM(value) AS value
+                FROM temp.ExposureLeg
+                GROUP BY coin_id, position_id, position_type
+            )
+            WHERE true
+            ON CONFLICT(id) DO UPDATE SET
+                position_value = excluded.position_value,
+                position_percent = excluded.position_percent,
+                type_percent = excluded.type_percent,
+                updated_at = CURRENT_TIMESTAMP
+        ''', fetch=False)
+        # Legs that no longer exist, e.g. a sold coin or a deleted position
+        DatabaseService.execute_query(
+            'DELETE FROM PositionExposure' + (scope.format(column='coin_id') or ' WHERE true') +
+            ' AND id NOT IN (SELECT position_id || \':\' || coin_id FROM temp.ExposureLeg)',
+            scope_params,
+            fetch=False
+        )
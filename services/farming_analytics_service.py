@@ -0,0 +1,188 @@
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from services.database import DatabaseService
+from services.schema import FARMING_METRIC_COLUMNS
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# (table, position type, debt columns)
+FARM_TABLES = [
+    ('FarmingPool', 'farming', ('0', '0')),
+    ('LeveragedFarmingPool', 'leveraged', ('debt_a', 'debt_b')),
+]
+
+
+class FarmingAnalyticsService:
+    """
+    Impermanent loss, fee yield and APR of every LP and leveraged-farm position.
+
+    Pools are treated as 50/50 constant-product pools. The amounts put into
+    the pool at entry are the deposits plus any debt, so k = a * b at entry is
+    known, and at today's prices a fee-less pool would hold
+    a = sqrt(k * pb / pa), b = sqrt(k * pa / pb), worth 2 * sqrt(k * pa * pb).
+    Against the entry amounts held outright that is the impermanent loss;
+    what the pool holds beyond it is the fees and rewards earned. APR
+    annualizes that yield over the time since the position was created,
+    relative to the deposits valued at today's prices (the HODL value).
+
+    All positions are computed in one vectorized pass after every refresh
+    and stored in FarmingAnalytics.
+    """
+
+    @staticmethod
+    def compute(
+        price_a, price_b, holdings_a, holdings_b, deposited_a, deposited_b,
+        debt_a=0.0, debt_b=0.0, days_held=np.nan
+    ) -> Dict[str, np.ndarray]:
+        """
+        LP metrics for arrays of positions.
+
+        Args:
+            price_a, price_b: Current token prices
+            holdings_a, holdings_b: Tokens the pool position holds now
+            deposited_a, deposited_b: Tokens deposited from own funds
+            debt_a, debt_b: Tokens borrowed into the pool (leveraged farms)
+            days_held: Days since the position was opened, NaN when unknown
+
+        Returns:
+            {metric: array} for every FARMING_METRIC_COLUMNS entry; NaN where undefined
+        """
+        pa, pb = np.asarray(price_a, dtype=float), np.asarray(price_b, dtype=float)
+        ha, hb = np.asarray(holdings_a, dtype=float), np.asarray(holdings_b, dtype=float)
+        da, db = np.asarray(deposited_a, dtype=float), np.asarray(deposited_b, dtype=float)
+        debt_a, debt_b = np.asarray(debt_a, dtype=float), np.asarray(debt_b, dtype=float)
+        days_held = np.broadcast_to(np.asarray(days_held, dtype=float), pa.shape)
+
+        entry_a, entry_b = da + debt_a, db + debt_b
+        lp_value = ha * pa + hb * pb
+        debt_value = debt_a * pa + debt_b * pb
+        hodl_value = da * pa + db * pb
+        entry_value = entry_a * pa + entry_b * pb
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = (entry_a > 0) & (entry_b > 0) & (pa > 0) & (pb > 0)
+            no_fee_value = np.where(valid, 2 * np.sqrt(entry_a * entry_b * pa * pb), np.nan)
+            il_value = no_fee_value - entry_value
+            fee_value = lp_value - no_fee_value
+            apr = np.where((days_held > 0) & (hodl_value > 0), fee_value / hodl_value * 365 / days_held, np.nan)
+            return {
+                'lp_value': lp_value,
+                'debt_value': debt_value,
+                'net_value': lp_value - debt_value,
+                'hodl_value': hodl_value,
+                'no_fee_value': no_fee_value,
+                'il_value': il_value,
+                'il_percent': il_value / entry_value * 100,
+                'fee_value': fee_value,
+                'fee_percent': fee_value / no_fee_value * 100,
+                'pnl_vs_hodl': lp_value - debt_value - hodl_value,
+                'days_held': days_held,
+                'apr': apr * 100
+            }
+
+    @classmethod
+    def update_analytics(cls, source: str = None) -> Dict[str, Any]:
+        """
+        Recompute the metrics of every farming and leveraged farming position.
+
+        Args:
+            source: What triggered the update, e.g. the refresh task name
+
+        Returns:
+            ResponseHandler with data {'positions': positions computed}
+        """
+        job = JobService.current()
+        job.stage('farming_analytics')
+        try:
+            query = cls._positions_query()
+            rows = DatabaseService.execute_query(query) if query else []
+            now = time.time()
+            with DatabaseService.transaction():
+                DatabaseService.execute_query('DELETE FROM FarmingAnalytics', fetch=False)
+                if rows:
+                    columns = list(zip(*rows))
+                    metrics = cls.compute(*[np.array(column, dtype=float) for column in columns[4:]])
+                    values = np.column_stack([metrics[column] for column in FARMING_METRIC_COLUMNS])
+                    # NaN becomes NULL
+                    values = np.where(np.isfinite(values), values, None).tolist()
+                    placeholders = ', '.join('?' * (len(FARMING_METRIC_COLUMNS) + 5))
+                    DatabaseService.execute_many(
+                        f'INSERT INTO FarmingAnalytics VALUES ({placeholders})',
+                        [tuple(row[:4]) + tuple(metric_row) + (now,) for row, metric_row in zip(rows, values)]
+                    )
+
+            job.add_report(farming_positions=len(rows))
+            logger.info(f'Updated farming analytics for {len(rows)} positions after {source}')
+            return ResponseHandler.success(f'Computed analytics for {len(rows)} farming positions',
+                                           data={'positions': len(rows)})
+        except Exception as e:
+            logger.error(f'Error updating farming analytics: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to update farming analytics: {str(e)}')
+
+    @classmethod
+    def get_analytics(cls, position_type: str = None) -> Dict[str, Any]:
+        """
+        Get the stored metrics, largest positions first.
+
+        Args:
+            position_type: 'farming' or 'leveraged', all when omitted
+
+        Returns:
+            ResponseHandler with data {'positions': [row dicts], 'totals': {lp_value, net_value,
+            hodl_value, il_value, fee_value, pnl_vs_hodl}}
+        """
+        if position_type not in (None, 'farming', 'leveraged'):
+            return ResponseHandler.error(f'Unsupported position type: {position_type}')
+        try:
+            where, params = (' WHERE position_type = ?', (position_type,)) if position_type else ('', None)
+            positions = [dict(row) for row in DatabaseService.execute_query(
+                f'SELECT * FROM FarmingAnalytics{where} ORDER BY net_value DESC', params
+            )]
+            totals = {
+                column: sum(position[column] or 0.0 for position in positions)
+                for column in ('lp_value', 'net_value', 'hodl_value', 'il_value', 'fee_value', 'pnl_vs_hodl')
+            }
+            return ResponseHandler.success(f'Retrieved analytics for {len(positions)} farming positions',
+                                           data={'positions': positions, 'totals': totals})
+        except Exception as e:
+            logger.error(f'Error retrieving farming analytics: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve farming analytics: {str(e)}')
+
+    @staticmethod
+    def _existing_tables() -> List[str]:
+        return [row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('FarmingPool', 'LeveragedFarmingPool', "
+            "'CoinPrices', 'Position')"
+        )]
+
+    @classmethod
+    def _positions_query(cls) -> Optional[str]:
+        """Union of the farm tables that exist with current prices and days held, None without any"""
+        existing = cls._existing_tables()
+        legs = [
+            f"SELECT position_id, '{position_type}' AS position_type, token_a_id, token_b_id, price_a, price_b, "
+            f"holdings_a, holdings_b, deposited_a, deposited_b, {debt_a} AS debt_a, {debt_b} AS debt_b FROM {table}"
+            for table, position_type, (debt_a, debt_b) in FARM_TABLES
+            if table in existing
+        ]
+        if not legs:
+            return None
+        joins, price_a, price_b, days_held = '', 'f.price_a', 'f.price_b', 'NULL'
+        if 'CoinPrices' in existing:
+            joins += ' LEFT JOIN CoinPrices ca ON ca.Name = f.token_a_id LEFT JOIN CoinPrices cb ON cb.Name = f.token_b_id'
+            price_a, price_b = 'COALESCE(ca.CurrentPrice, f.price_a)', 'COALESCE(cb.CurrentPrice, f.price_b)'
+        if 'Position' in existing:
+            joins += ' LEFT JOIN Position p ON p.id = f.position_id'
+            days_held = "julianday('now') - julianday(p.created_at)"
+        union = '\n            UNION ALL '.join(legs)
+        return f'''
+            WITH f AS (
+                {union}
+            )
+            SELECT f.position_id, f.position_type, f.token_a_id, f.token_b_id, {price_a}, {price_b},
+                   f.holdings_a, f.holdings_b, f.deposited_a, f.deposited_b, f.debt_a, f.debt_b, {days_held}
+            FROM f{joins}
+        '''
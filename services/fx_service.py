@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+from services.coin_gecko import CoinGeckoService
+from services.database import DatabaseService
+from services.job_service import JobService
+from config import Config
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+BASE_CURRENCY = 'usd'
+
+
+class FxService:
+    """
+    Exchange rates for reporting USD values in other currencies.
+
+    Every price in the database is in USD, so another currency only needs one
+    rate per currency: the FxRate table holds units of each of
+    Config.FX_CURRENCIES per USD. All rates come from a single CoinGecko
+    /exchange_rates call, refreshed after price refreshes, so coin prices are
+    never fetched per currency. Converting a result set is a multiplication of
+    its value columns by one rate.
+    """
+
+    _cache: Optional[Tuple[object, Dict[str, float]]] = None  # (pool, {currency: per USD})
+    _lock = threading.Lock()
+
+    @classmethod
+    def refresh_rates(cls, source: str = 'manual', force: bool = False) -> Dict[str, Any]:
+        """
+        Fetch and store the exchange rates of Config.FX_CURRENCIES.
+
+        Args:
+            source: Name of the refresh that triggered this, for logging
+            force: Fetch even if the stored rates are younger than Config.FX_REFRESH_MIN_AGE
+
+        Returns:
+            ResponseHandler with data {'updated': number of rates written, 'skipped': bool}
+        """
+        try:
+            now = time.time()
+            if not force:
+                oldest = DatabaseService.execute_query('SELECT MIN(updated_at), COUNT(*) FROM FxRate')[0]
+                # Only skip when every configured currency has a recent rate
+                if oldest[1] >= len(Config.FX_CURRENCIES) - 1 and oldest[0] and now - oldest[0] < Config.FX_REFRESH_MIN_AGE:
+                    return ResponseHandler.success('Exchange rates are fresh', data={'updated': 0, 'skipped': True})
+
+            response = CoinGeckoService.fetch_exchange_rates()
+            if not response['success']:
+                return ResponseHandler.error(f'Failed to fetch exchange rates: {response["error"]}')
+            rates = cls.parse_rates(response['data'], Config.FX_CURRENCIES)
+            DatabaseService.execute_many('''
+                INSERT INTO FxRate (currency, per_usd, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(currency) DO UPDATE SET per_usd = excluded.per_usd, updated_at = excluded.updated_at
+            ''', [(currency, rate, now) for currency, rate in rates.items() if currency != BASE_CURRENCY])
+            cls.invalidate()
+
+            missing = sorted(set(Config.FX_CURRENCIES) - set(rates))
+            if missing:
+                logger.warning(f'No exchange rate returned for: {", ".join(missing)}')
+            logger.info(f'Updated {len(rates) - 1} exchange rates after {source} refresh')
+            JobService.current().add_report(fx_rates=len(rates) - 1)
+            return ResponseHandler.success('Exchange rates updated', data={'updated': len(rates) - 1, 'skipped': False})
+        except Exception as e:
+            logger.error(f'Error refreshing exchange rates: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to refresh exchange rates: {str(e)}')
+
+    @staticmethod
+    def parse_rates(data: Dict[str, Any], currencies: Iterable[str]) -> Dict[str, float]:
+        """
+        Units of each currency per USD from a CoinGecko /exchange_rates response.
+
+        CoinGecko quotes every currency per BTC, so a currency's rate per USD is
+        its BTC rate over the USD one. Currencies without a positive rate are left out.
+
+        Raises:
+            ValueError: if the response has no USD rate
+        """
+        quoted = data.get('rates') or {}
+        usd = float((quoted.get(BASE_CURRENCY) or {}).get('value') or 0)
+        if not usd > 0:
+            raise ValueError('Exchange rates have no USD rate')
+        rates = {BASE_CURRENCY: 1.0}
+        for currency in currencies:
+            value = float((quoted.get(currency.lower()) or {}).get('value') or 0)
+            if value > 0:
+                rates[currency.lower()] = value / usd
+        return rates
+
+    @classmethod
+    def get_rates(cls) -> Dict[str, float]:
+        """Units of each stored currency per USD, including USD itself"""
+        pool = DatabaseService.get_pool()
+        with cls._lock:
+            cached = cls._cache
+        if cached and cached[0] is pool:
+            return cached[1]
+        rates = {BASE_CURRENCY: 1.0}
+        rates.update(DatabaseService.execute_query('SELECT currency, per_usd FROM FxRate'))
+        with cls._lock:
+            cls._cache = (pool, rates)
+        return rates
+
+    @classmethod
+    def rate(cls, currency: str) -> float:
+        """
+        Units of currency per USD.
+
+        Raises:
+            ValueError: if the currency isn't supported or has no rate yet
+        """
+        currency = (currency or BASE_CURRENCY).lower()
+        if currency not in Config.FX_CURRENCIES:
+            raise ValueError(f'Unsupported currency {currency}, expected one of {", ".join(Config.FX_CURRENCIES)}')
+        rates = cls.get_rates()
+        if currency not in rates:
+            raise ValueError(f'No exchange rate for {currency} yet')
+        return rates[currency]
+
+    @classmethod
+    def convert(cls, values, currency: str) -> np.ndarray:
+        """Convert an array of USD values to currency"""
+        return np.asarray(values, dtype=float) * cls.rate(currency)
+
+    @classmethod
+    def convert_fields(cls, data: Dict[str, Any], currency: str, fields: Iterable[str],
+                       row_fields: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Convert the USD values of a result set to currency.
+
+        Args:
+            data: Result dict
+            currency: Target currency
+            fields: Keys of data holding a number or a {label: value} dict
+            row_fields: Keys to convert in every row of data['positions']
+
+        Returns:
+            Copy of data with converted values and 'currency' set
+        """
+        rate = cls.rate(currency)
+        converted = dict(data, currency=currency.lower())
+        for key in fields:
+            value = data.get(key)
+            if isinstance(value, dict):
+                converted[key] = dict(zip(value, (np.fromiter(value.values(), dtype=float, count=len(value)) * rate).tolist()))
+            elif value is not None:
+                converted[key] = value * rate
+        rows = data.get('positions')
+        row_fields = list(row_fields)
+        if rows and row_fields:
+            # One (rows, fields) matrix for the whole result set
+            matrix = np.array([[row[key] for key in row_fields] for row in rows], dtype=float) * rate
+            converted['positions'] = [dict(row, **dict(zip(row_fields, values))) for row, values in zip(rows, matrix.tolist())]
+        return converted
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached rates"""
+        with cls._lock:
+            cls._cache = None
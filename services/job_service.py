@@ -0,0 +1,327 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from config import Config
+from services.database import DatabaseService
+from utils.logging_config import setup_logger
+from utils.response import ResponseHandler
+
+logger = setup_logger(__name__)
+
+
+class JobTracker:
+    """
+    Progress, stage timings and report for one running job.
+
+    Progress lives in memory so services can report it from inside a unit of
+    work without waiting on the database; it is persisted at stage changes,
+    at most every Config.JOB_PERSIST_INTERVAL seconds, and when the job ends.
+    Inside a unit of work the write is deferred until the unit closes, since
+    the unit may hold the write lock.
+    """
+
+    def __init__(self, job_id: Optional[str], name: str):
+        self.id = job_id
+        self.name = name
+        self.status = 'running'
+        self.done = 0
+        self.total: Optional[int] = None
+        self.stage_name: Optional[str] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.report: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self._stage_started: Optional[float] = None
+        self._last_persist = 0.0
+        self._persist_pending = False
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, total: Optional[int] = None) -> None:
+        """Start a new stage, closing the timing of the previous one"""
+        with self._lock:
+            self._close_stage()
+            self.stage_name = name
+            self.done = 0
+            self.total = total
+            self._stage_started = time.perf_counter()
+        self.persist()
+
+    def set_total(self, total: int) -> None:
+        """Set the number of items in the current stage"""
+        with self._lock:
+            self.total = total
+
+    def advance(self, count: int = 1) -> None:
+        """Mark items of the current stage as done"""
+        with self._lock:
+            self.done += count
+        if time.monotonic() - self._last_persist >= Config.JOB_PERSIST_INTERVAL:
+            self.persist()
+
+    def add_report(self, **values) -> None:
+        """Add values to the job's final report"""
+        with self._lock:
+            self.report.update(values)
+
+    def finish(self, error: Optional[str] = None) -> None:
+        """Close the last stage and record the outcome"""
+        with self._lock:
+            self._close_stage()
+            self.stage_name = None
+            self.status = 'failed' if error else 'succeeded'
+            self.error = error
+            self.finished_at = datetime.utcnow()
+        self.persist()
+
+    def persist(self) -> None:
+        """Write the current state to the Job table, or once the active unit of work closes"""
+        if self.id is None or self._persist_pending:
+            return
+        if DatabaseService.after_unit_of_work(self._persist_deferred):
+            self._persist_pending = True
+            return
+        self._write()
+
+    def _persist_deferred(self) -> None:
+        self._persist_pending = False
+        self._write()
+
+    def _write(self) -> None:
+        state = self.to_dict()
+        try:
+            DatabaseService.execute_detached(
+                '''
+                UPDATE Job
+                SET status = ?, stage = ?, progress_done = ?, progress_total = ?,
+                    stages = ?, report = ?, error = ?, started_at = ?, finished_at = ?
+                WHERE id = ?
+                ''',
+                (state['status'], state['stage'], state['progress_done'], state['progress_total'],
+                 json.dumps(state['stages']), json.dumps(state['report'], default=str), state['error'],
+                 state['started_at'], state['finished_at'], self.id),
+                fetch=False
+            )
+        except sqlite3.Error as e:
+            logger.warning(f'Failed to persist progress for job {self.id}: {str(e)}')
+        self._last_persist = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = list(self.stages)
+            if self.stage_name is not None and self._stage_started is not None:
+                stages.append({
+                    'name': self.stage_name,
+                    'seconds': round(time.perf_counter() - self._stage_started, 3),
+                    'running': True
+                })
+            return {
+                'id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'stage': self.stage_name,
+                'progress_done': self.done,
+                'progress_total': self.total,
+                'stages': stages,
+                'report': dict(self.report),
+                'error': self.error,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+    def _close_stage(self) -> None:
+        if self.stage_name is not None and self._stage_started is not None:
+            self.stages.append({
+                'name': self.stage_name,
+                'seconds': round(time.perf_counter() - self._stage_started, 3),
+                'done': self.done,
+                'total': self.total
+            })
+        self._stage_started = None
+
+
+class JobService:
+    """
+    Persistent jobs for long-running refreshes and fixes.
+
+    Each job is a row in the Job table with its status, progress, stage
+    timings and final report. Partial unique indexes allow at most one queued
+    and one running job per name, so the same refresh can never run twice at
+    once, even across processes.
+    """
+
+    _active: Dict[str, JobTracker] = {}
+    _scope = threading.local()
+    _lock = threading.Lock()
+
+    @classmethod
+    def create_job(cls, name: str) -> Dict[str, Any]:
+        """
+        Queue a job, or return the job already queued under this name.
+
+        Returns:
+            ResponseHandler with data {'job_id', 'created'}
+        """
+        try:
+            cls._expire_stale_jobs(name)
+            job_id = uuid.uuid4().hex
+            try:
+                DatabaseService.execute_detached(
+                    'INSERT INTO Job (id, name, status, created_at) VALUES (?, ?, ?, ?)',
+                    (job_id, name, 'queued', datetime.utcnow().isoformat()),
+                    fetch=False
+                )
+                return ResponseHandler.success(f'Job {name} queued', data={'job_id': job_id, 'created': True})
+            except sqlite3.IntegrityError:
+                result = DatabaseService.execute_detached(
+                    "SELECT id FROM Job WHERE name = ? AND status = 'queued'",
+                    (name,)
+                )
+                if not result:
+                    raise
+                return ResponseHandler.success(
+                    f'Job {name} is already queued',
+                    data={'job_id': result[0][0], 'created': False}
+                )
+        except Exception as e:
+            logger.error(f'Error creating job {name}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to create job: {str(e)}')
+
+    @classmethod
+    def run_job(cls, job_id: str, name: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func as the given job, tracking progress and recording the outcome.
+
+        Services report progress through JobService.current() while it runs.
+        The job runs as one DatabaseService.write_batch(), so the read replica
+        is rebuilt once when it ends. If another process is already running a
+        job with this name, func is not called and the job is marked failed.
+
+        Returns:
+            Whatever func returns
+        """
+        with DatabaseService.write_batch():
+            tracker = JobTracker(job_id, name)
+            try:
+                DatabaseService.execute_detached(
+                    "UPDATE Job SET status = 'running', started_at = ? WHERE id = ?",
+                    (tracker.started_at.isoformat(), job_id),
+                    fetch=False
+                )
+            except sqlite3.IntegrityError:
+                logger.warning(f'Skipping job {job_id}: another {name} job is running')
+                tracker.finish(f'Another {name} job is already running')
+                return ResponseHandler.error(f'Another {name} job is already running')
+
+            with cls._lock:
+                cls._active[job_id] = tracker
+            cls._scope.tracker = tracker
+            try:
+                result = func()
+                if isinstance(result, dict):
+                    tracker.add_report(success=result.get('success'),
+                                       message=result.get('message') or result.get('error'))
+                error = result.get('error') if isinstance(result, dict) and not result.get('success') else None
+                tracker.finish(error)
+                return result
+            except Exception as e:
+                tracker.finish(str(e))
+                raise
+            finally:
+                cls._scope.tracker = None
+                with cls._lock:
+                    cls._active.pop(job_id, None)
+
+    @classmethod
+    def current(cls) -> JobTracker:
+        """
+        Get the tracker of the job running on this thread.
+
+        Outside a job this returns a throwaway tracker, so services can report
+        progress unconditionally.
+        """
+        tracker = getattr(cls._scope, 'tracker', None)
+        return tracker if tracker is not None else JobTracker(None, 'untracked')
+
+    @classmethod
+    def find_job(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        A job's status, with live progress if it is running in this process.
+
+        Returns:
+            The job as a dict, or None if there is no such job
+
+        Raises:
+            sqlite3.Error: if the job can't be read
+        """
+        with cls._lock:
+            tracker = cls._active.get(job_id)
+        if tracker:
+            return tracker.to_dict()
+        result = DatabaseService.execute_detached('SELECT * FROM Job WHERE id = ?', (job_id,))
+        return cls._row_to_dict(result[0]) if result else None
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Dict[str, Any]:
+        """Get a job's status as a ResponseHandler dict; see find_job()"""
+        try:
+            job = cls.find_job(job_id)
+            if job is None:
+                return ResponseHandler.error(f'Job {job_id} not found')
+            return ResponseHandler.success('Job retrieved', data=job)
+        except Exception as e:
+            logger.error(f'Error retrieving job {job_id}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve job: {str(e)}')
+
+    @classmethod
+    def list_jobs(cls, limit: int = 20) -> Dict[str, Any]:
+        """Get the most recent jobs"""
+        try:
+            result = DatabaseService.execute_detached(
+                'SELECT * FROM Job ORDER BY created_at DESC LIMIT ?',
+                (limit,)
+            )
+            jobs = []
+            for row in result:
+                with cls._lock:
+                    tracker = cls._active.get(row['id'])
+                jobs.append(tracker.to_dict() if tracker else cls._row_to_dict(row))
+            return ResponseHandler.success(f'Retrieved {len(jobs)} jobs', data=jobs)
+        except Exception as e:
+            logger.error(f'Error listing jobs: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to list jobs: {str(e)}')
+
+    @classmethod
+    def _expire_stale_jobs(cls, name: str) -> None:
+        """Fail jobs left queued or running by a process that died"""
+        cutoff = (datetime.utcnow() - timedelta(seconds=Config.JOB_STALE_AFTER)).isoformat()
+        DatabaseService.execute_detached(
+            '''
+            UPDATE Job SET status = 'failed', error = 'Abandoned', finished_at = ?
+            WHERE name = ? AND status IN ('queued', 'running')
+            AND COALESCE(started_at, created_at) < ?
+            ''',
+            (datetime.utcnow().isoformat(), name, cutoff),
+            fetch=False
+        )
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a Job row to the same shape as JobTracker.to_dict"""
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'status': row['status'],
+            'stage': row['stage'],
+            'progress_done': row['progress_done'],
+            'progress_total': row['progress_total'],
+            'stages': json.loads(row['stages']) if row['stages'] else [],
+            'report': json.loads(row['report']) if row['report'] else {},
+            'error': row['error'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
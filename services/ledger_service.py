@@ -0,0 +1,370 @@
+import csv
+import io
+import json
+from collections import deque
+from typing import Any, Dict, IO, Iterator, List, Optional
+from config import Config
+from models.ledger import COST_BASIS_METHODS, LedgerTransaction
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Remaining amounts below this are treated as fully consumed
+DUST = 1e-12
+
+
+class LedgerService:
+    """
+    Transaction ledger with FIFO, LIFO and average-cost lot tracking.
+
+    Transactions live in LedgerTransaction. For every method in
+    Config.COST_BASIS_METHODS the lot engine keeps the open lots (CostLot),
+    per-coin totals (CostBasisState) and the realized PnL of each sale
+    (RealizedTrade), plus the last transaction id it processed
+    (LedgerWatermark). update_lots() only applies transactions past the
+    watermark on top of the stored lots; a coin is replayed from scratch only
+    when a new transaction is dated before ones already applied to it.
+
+    Imports stream CSV or JSON (an array or one object per line) and insert
+    in batches of Config.LEDGER_IMPORT_BATCH rows, so memory use doesn't grow
+    with the file.
+    """
+
+    @classmethod
+    def import_transactions(cls, stream: IO, fmt: str, source: str = None) -> Dict[str, Any]:
+        """
+        Stream transactions from a CSV or JSON file into the ledger and update the lots.
+
+        Args:
+            stream: Text or binary file object
+            fmt: 'csv', 'json' (array or one object per line) or 'jsonl'
+            source: Label stored with every imported row, e.g. the file name
+
+        Returns:
+            ResponseHandler with data {'read', 'inserted', 'duplicates', 'invalid',
+            'errors': first Config.LEDGER_IMPORT_MAX_ERRORS problems, 'lots': update_lots data}
+        """
+        if fmt not in ('csv', 'json', 'jsonl'):
+            return ResponseHandler.error(f'Unsupported import format: {fmt}')
+        if isinstance(stream.read(0), bytes):
+            stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+        job = JobService.current()
+        job.stage('import')
+        records = csv.DictReader(stream) if fmt == 'csv' else cls._iter_json(stream)
+        stats = {'read': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+        batch = []
+        try:
+            for number, record in enumerate(records, start=1):
+                stats['read'] += 1
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError('expected an object')
+                    batch.append(LedgerTransaction.from_record(record, source))
+                except (ValueError, TypeError) as e:
+                    stats['invalid'] += 1
+                    if len(stats['errors']) < Config.LEDGER_IMPORT_MAX_ERRORS:
+                        stats['errors'].append(f'Record {number}: {str(e)}')
+                if len(batch) >= Config.LEDGER_IMPORT_BATCH:
+                    cls._insert_batch(batch, stats)
+                    job.advance(len(batch))
+                    batch = []
+            cls._insert_batch(batch, stats)
+        except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error(f'Aborted transaction import after {stats["read"]} records: {str(e)}')
+            return ResponseHandler.error(f'Malformed {fmt} file after {stats["read"]} records: {str(e)}')
+        except Exception as e:
+            logger.error(f'Error importing transactions: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to import transactions: {str(e)}')
+
+        lots = cls.update_lots()
+        stats['lots'] = lots.get('data')
+        logger.info(f'Imported transactions from {source}: {stats["inserted"]} new of {stats["read"]} read')
+        return ResponseHandler.success(f'Imported {stats["inserted"]} transactions', data=stats)
+
+    @classmethod
+    def add_transaction(cls, record: Dict[str, Any], source: str = 'manual') -> Dict[str, Any]:
+        """
+        Add one transaction and update the lots.
+
+        Args:
+            record: Same fields as an imported row
+            source: Label stored with the row
+
+        Returns:
+            ResponseHandler with the stored LedgerTransaction
+        """
+        try:
+            transaction = LedgerTransaction.from_record(record, source)
+        except (ValueError, TypeError) as e:
+            return ResponseHandler.error(f'Invalid transaction: {str(e)}')
+        try:
+            stats = {'inserted': 0, 'duplicates': 0}
+            cls._insert_batch([transaction], stats)
+            if stats['duplicates']:
+                return ResponseHandler.error(f'Transaction {transaction.external_id} already exists')
+            transaction.id = DatabaseService.execute_query('SELECT MAX(id) FROM LedgerTransaction')[0][0]
+            cls.update_lots()
+            return ResponseHandler.success('Transaction added', data=transaction)
+        except Exception as e:
+            logger.error(f'Error adding transaction: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to add transaction: {str(e)}')
+
+    @staticmethod
+    def _insert_batch(batch: List[LedgerTransaction], stats: Dict[str, Any]) -> None:
+        if not batch:
+            return
+        inserted = DatabaseService.execute_many('''
+            INSERT OR IGNORE INTO LedgerTransaction (external_id, ts, coin_id, side, amount, price, fee, source)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(t.external_id, t.ts, t.coin_id, t.side, t.amount, t.price, t.fee, t.source) for t in batch])
+        stats['inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+
+    @staticmethod
+    def _iter_json(stream: IO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+        """
+        Yield the objects of a JSON array, or of one-object-per-line JSON, reading in chunks.
+        """
+        decoder = json.JSONDecoder()
+        buffer, position, eof = '', 0, False
+        started = False
+        while True:
+            # Skip separators between values
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer) and buffer[position] == '[':
+                position += 1
+                started = True
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    if buffer[position:].strip():
+                        raise
+                    return
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next chunk
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            started = True
+            position = end
+            yield value
+
+    @classmethod
+    def update_lots(cls) -> Dict[str, Any]:
+        """
+        Apply transactions added since the last update to the lots of every method.
+
+        Returns:
+            ResponseHandler with data {method: {'applied': transactions, 'replayed': coins}}
+        """
+        try:
+            data = {}
+            for method in Config.COST_BASIS_METHODS:
+                if method not in COST_BASIS_METHODS:
+                    raise ValueError(f'Unsupported cost basis method: {method}')
+                data[method] = cls._update_method(method)
+            return ResponseHandler.success('Lots updated', data=data)
+        except Exception as e:
+            logger.error(f'Error updating lots: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to update lots: {str(e)}')
+
+    @classmethod
+    def _update_method(cls, method: str) -> Dict[str, int]:
+        rows = DatabaseService.execute_query('SELECT last_tx_id FROM LedgerWatermark WHERE method = ?', (method,))
+        watermark = rows[0][0] if rows else 0
+        latest = DatabaseService.execute_query('SELECT COALESCE(MAX(id), 0) FROM LedgerTransaction')[0][0]
+        if latest <= watermark:
+            return {'applied': 0, 'replayed': 0}
+
+        coins = DatabaseService.execute_query('''
+            SELECT t.coin_id, MIN(t.ts), s.last_ts, s.last_tx_id
+            FROM LedgerTransaction t
+            LEFT JOIN CostBasisState s ON s.method = ? AND s.coin_id = t.coin_id
+            WHERE t.id > ? AND t.id <= ?
+            GROUP BY t.coin_id
+        ''', (method, watermark, latest))
+        applied = replayed = 0
+        with DatabaseService.transaction():
+            for coin_id, first_ts, last_ts, last_tx_id in coins:
+                # Backdated transactions change the lots later sales used, so the coin is rebuilt
+                replay = last_ts is not None and first_ts < last_ts
+                if replay:
+                    replayed += 1
+                    for table in ('CostLot', 'CostBasisState', 'RealizedTrade'):
+                        DatabaseService.execute_query(
+                            f'DELETE FROM {table} WHERE method = ? AND coin_id = ?', (method, coin_id), fetch=False
+                        )
+                    where, params = 'coin_id = ? AND id <= ?', (coin_id, latest)
+                else:
+                    where, params = 'coin_id = ? AND id > ? AND id <= ?', (coin_id, watermark, latest)
+                transactions = DatabaseService.execute_query(
+                    f'SELECT id, ts, side, amount, price, fee FROM LedgerTransaction WHERE {where} ORDER BY ts, id',
+                    params
+                )
+                applied += len(transactions)
+                cls._apply(method, coin_id, transactions)
+
+            DatabaseService.execute_query(
+                'INSERT OR REPLACE INTO LedgerWatermark (method, last_tx_id) VALUES (?, ?)', (method, latest), fetch=False
+            )
+        logger.info(f'Applied {applied} transactions to {method} lots, replayed {replayed} coins')
+        return {'applied': applied, 'replayed': replayed}
+
+    @classmethod
+    def _apply(cls, method: str, coin_id: str, transactions: List) -> None:
+        """Apply transactions (in time order) to one coin's stored lots and totals"""
+        state = DatabaseService.execute_query(
+            'SELECT quantity, cost, realized_pnl, last_ts, last_tx_id FROM CostBasisState WHERE method = ? AND coin_id = ?',
+            (method, coin_id)
+        )
+        quantity, cost, realized, last_ts, last_tx_id = state[0] if state else (0.0, 0.0, 0.0, 0.0, 0)
+
+        # Open lots as [ts, tx_id, amount, cost_per_unit] in time order; average cost keeps none
+        lots = deque() if method == 'average' else deque(list(row) for row in DatabaseService.execute_query(
+            'SELECT ts, tx_id, amount, cost_per_unit FROM CostLot WHERE method = ? AND coin_id = ? ORDER BY ts, tx_id',
+            (method, coin_id)
+        ))
+        loaded = {(lot[0], lot[1]): lot[2] for lot in lots}
+        trades = []
+        for tx_id, ts, side, amount, price, fee in transactions:
+            if side == 'buy':
+                quantity += amount
+                cost += amount * price + fee
+                if method != 'average':
+                    lots.append([ts, tx_id, amount, price + fee / amount])
+            else:
+                cost_basis = cls._consume(method, lots, amount, quantity, cost)
+                if amount > quantity + DUST:
+                    logger.warning(f'Sale {tx_id} of {amount} {coin_id} exceeds the {quantity} held; '
+                                   f'the excess has no cost basis')
+                quantity = max(quantity - amount, 0.0)
+                cost = max(cost - cost_basis, 0.0) if quantity > DUST else 0.0
+                proceeds = amount * price - fee
+                realized += proceeds - cost_basis
+                trades.append((method, tx_id, coin_id, ts, amount, proceeds, cost_basis, proceeds - cost_basis))
+            last_ts, last_tx_id = max((last_ts, last_tx_id), (ts, tx_id))
+
+        remaining = {(lot[0], lot[1]): lot for lot in lots if lot[2] > DUST}
+        DatabaseService.execute_many(
+            'DELETE FROM CostLot WHERE method = ? AND coin_id = ? AND ts = ? AND tx_id = ?',
+            [(method, coin_id, ts, tx_id) for ts, tx_id in loaded if (ts, tx_id) not in remaining]
+        )
+        DatabaseService.execute_many(
+            'INSERT OR REPLACE INTO CostLot VALUES (?, ?, ?, ?, ?, ?)',
+            [(method, coin_id, ts, tx_id, amount, cost_per_unit)
+             for (ts, tx_id), (_, _, amount, cost_per_unit) in remaining.items()
+             if loaded.get((ts, tx_id)) != amount]
+        )
+        DatabaseService.execute_many('INSERT OR REPLACE INTO RealizedTrade VALUES (?, ?, ?, ?, ?, ?, ?, ?)', trades)
+        DatabaseService.execute_query(
+            'INSERT OR REPLACE INTO CostBasisState VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (method, coin_id, quantity, cost, realized, last_ts, last_tx_id), fetch=False
+        )
+
+    @staticmethod
+    def _consume(method: str, lots: deque, amount: float, quantity: float, cost: float) -> float:
+        """Remove amount from the lots in method order and return its cost basis"""
+        if method == 'average':
+            return cost * min(amount, quantity) / quantity if quantity > DUST else 0.0
+        cost_basis, left = 0.0, amount
+        # FIFO takes the oldest lots first, LIFO the newest; emptied lots are dropped
+        while left > DUST and lots:
+            lot = lots[0] if method == 'fifo' else lots[-1]
+            taken = min(lot[2], left)
+            lot[2] -= taken
+            left -= taken
+            cost_basis += taken * lot[3]
+            if lot[2] <= DUST:
+                lots.popleft() if method == 'fifo' else lots.pop()
+        return cost_basis
+
+    @classmethod
+    def get_pnl(cls, method: str = None) -> Dict[str, Any]:
+        """
+        Cost basis, realized and unrealized PnL per coin.
+
+        Args:
+            method: One of Config.COST_BASIS_METHODS, defaults to the first
+
+        Returns:
+            ResponseHandler with data {'method', 'coins': [{coin_id, quantity, cost_basis,
+            average_cost, current_price, market_value, unrealized_pnl, realized_pnl}], 'totals'}
+        """
+        method = method or Config.COST_BASIS_METHODS[0]
+        if method not in Config.COST_BASIS_METHODS:
+            return ResponseHandler.error(f'Unsupported cost basis method: {method}')
+        try:
+            has_prices = DatabaseService.execute_query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'CoinPrices'"
+            )
+            price_join, price = (' LEFT JOIN CoinPrices cp ON cp.Name = s.coin_id', 'cp.CurrentPrice') \
+                if has_prices else ('', 'NULL')
+            coins = []
+            for row in DatabaseService.execute_query(f'''
+                SELECT s.coin_id, s.quantity, s.cost, s.realized_pnl, {price} AS current_price
+                FROM CostBasisState s{price_join}
+                WHERE s.method = ?
+                ORDER BY s.coin_id
+            ''', (method,)):
+                coin_id, quantity, cost, realized, current = row
+                market_value = quantity * current if current is not None else None
+                coins.append({
+                    'coin_id': coin_id,
+                    'quantity': quantity,
+                    'cost_basis': cost,
+                    'average_cost': cost / quantity if quantity > DUST else None,
+                    'current_price': current,
+                    'market_value': market_value,
+                    'unrealized_pnl': market_value - cost if market_value is not None else None,
+                    'realized_pnl': realized
+                })
+            totals = {
+                column: sum(coin[column] or 0.0 for coin in coins)
+                for column in ('cost_basis', 'market_value', 'unrealized_pnl', 'realized_pnl')
+            }
+            return ResponseHandler.success(f'Computed PnL for {len(coins)} coins',
+                                           data={'method': method, 'coins': coins, 'totals': totals})
+        except Exception as e:
+            logger.error(f'Error computing PnL: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to compute PnL: {str(e)}')
+
+    @classmethod
+    def get_transactions(cls, coin_id: str = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Get the most recent ledger transactions.
+
+        Args:
+            coin_id: Only this coin's transactions
+            limit: Maximum transactions returned
+
+        Returns:
+            ResponseHandler with data [LedgerTransaction], newest first
+        """
+        try:
+            where, params = (' WHERE coin_id = ?', (coin_id, limit)) if coin_id else ('', (limit,))
+            transactions = [
+                LedgerTransaction(ts=row['ts'], coin_id=row['coin_id'], side=row['side'], amount=row['amount'],
+                                  price=row['price'], fee=row['fee'], external_id=row['external_id'],
+                                  source=row['source'], id=row['id'])
+                for row in DatabaseService.execute_query(
+                    f'SELECT * FROM LedgerTransaction{where} ORDER BY ts DESC, id DESC LIMIT ?', params
+                )
+            ]
+            return ResponseHandler.success(f'Retrieved {len(transactions)} transactions', data=transactions)
+        except Exception as e:
+            logger.error(f'Error retrieving transactions: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve transactions: {str(e)}')
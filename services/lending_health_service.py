@@ -0,0 +1,179 @@
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from models.analytics import PortfolioArrays
+from services.analytics_service import AnalyticsService
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LendingHealthService:
+    """
+    Health ratios and liquidation prices for every lending pool.
+
+    health_ratio = sum(collateral value * collateral factor) / sum(borrowed value),
+    with collateral factors from ProtocolCollateralConfig (falling back to
+    CollateralPosition's own). All pools are computed in one vectorized pass
+    over the PortfolioArrays lending legs and written back to LendingPool in
+    one transaction, skipping pools whose numbers didn't change.
+
+    The liquidation price of a collateral coin in a pool is the price at which
+    the pool's health ratio reaches 1 with every other price unchanged. A coin
+    that is also borrowed in the same pool moves both sides; coins whose fall
+    alone can't liquidate the pool have no liquidation price. Runs after every
+    price refresh.
+    """
+
+    @staticmethod
+    def compute(arrays: PortfolioArrays) -> Dict[str, Any]:
+        """
+        Pool totals, health ratios and per-coin liquidation prices.
+
+        Args:
+            arrays: Portfolio arrays to compute from
+
+        Returns:
+            {'pools': [(pool, collateral value, weighted collateral, borrowed value, health ratio)],
+             'liquidation': [(pool, coin, liquidation price or None, current price)]}
+        """
+        collateral, borrow = arrays.collateral_mask, arrays.borrow_mask
+        legs = np.flatnonzero(collateral | borrow)
+        if not len(legs):
+            return {'pools': [], 'liquidation': []}
+
+        prices = arrays.leg_prices()[legs]
+        values = arrays.values()[legs]
+        is_collateral = collateral[legs]
+        weighted = np.where(is_collateral, values * np.nan_to_num(arrays.collateral_factors[legs]), 0.0)
+        gross = np.where(is_collateral, values, 0.0)
+        borrowed = np.where(is_collateral, 0.0, -values)
+
+        pool_ids, pool_idx = np.unique(arrays.position_idx[legs], return_inverse=True)
+        pool_weighted = np.bincount(pool_idx, weights=weighted, minlength=len(pool_ids))
+        pool_borrowed = np.bincount(pool_idx, weights=borrowed, minlength=len(pool_ids))
+        pool_collateral = np.bincount(pool_idx, weights=gross, minlength=len(pool_ids))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            health = np.where(pool_borrowed > 0, pool_weighted / pool_borrowed, np.nan)
+
+        # Per (pool, coin): weighted collateral and borrowed value held in that coin
+        coin_count = len(arrays.coins)
+        pairs, pair_idx = np.unique(pool_idx * coin_count + arrays.coin_idx[legs], return_inverse=True)
+        pair_weighted = np.bincount(pair_idx, weights=weighted, minlength=len(pairs))
+        pair_borrowed = np.bincount(pair_idx, weights=borrowed, minlength=len(pairs))
+        pair_price = np.zeros(len(pairs))
+        pair_price[pair_idx] = prices
+        pair_pool, pair_coin = pairs // coin_count, pairs % coin_count
+
+        # Scaling coin c's price by m gives health 1 when
+        # W - w_c + m * w_c = B - b_c + m * b_c, i.e. m = (B - W + w_c - b_c) / (w_c - b_c)
+        slope = pair_weighted - pair_borrowed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            multiplier = (pool_borrowed[pair_pool] - pool_weighted[pair_pool] + slope) / slope
+        reachable = (slope > 0) & (pool_borrowed[pair_pool] > 0) & (multiplier > 0)
+        liquidation = np.where(reachable, pair_price * multiplier, np.nan)
+
+        is_collateral_pair = np.bincount(pair_idx, weights=is_collateral, minlength=len(pairs)) > 0
+        pools = [
+            (arrays.positions[pool_ids[i]], float(pool_collateral[i]), float(pool_weighted[i]),
+             float(pool_borrowed[i]), None if np.isnan(health[i]) else float(health[i]))
+            for i in range(len(pool_ids))
+        ]
+        liquidations = [
+            (arrays.positions[pool_ids[pair_pool[j]]], arrays.coins[pair_coin[j]],
+             None if np.isnan(liquidation[j]) else float(liquidation[j]), float(pair_price[j]))
+            for j in np.flatnonzero(is_collateral_pair)
+        ]
+        return {'pools': pools, 'liquidation': liquidations}
+
+    @classmethod
+    def update_health(cls, source: str = None) -> Dict[str, Any]:
+        """
+        Recompute every lending pool's health and liquidation prices and store them.
+
+        Args:
+            source: What triggered the update, e.g. the refresh task name
+
+        Returns:
+            ResponseHandler with data {'pools': pools computed, 'updated': pools whose row changed}
+        """
+        job = JobService.current()
+        job.stage('lending_health')
+        try:
+            result = cls.compute(AnalyticsService.get_arrays())
+            now = time.time()
+            updated = 0
+            with DatabaseService.transaction():
+                if cls._has_lending_pool_table():
+                    updated = DatabaseService.execute_many('''
+                        UPDATE LendingPool
+                        SET health_ratio = ?, total_collateral_value = ?, total_borrow_value = ?
+                        WHERE position_id = ?
+                        AND (health_ratio IS NOT ? OR total_collateral_value IS NOT ? OR total_borrow_value IS NOT ?)
+                    ''', [
+                        (health, collateral, borrowed, pool, health, collateral, borrowed)
+                        for pool, collateral, _, borrowed, health in result['pools']
+                    ])
+                DatabaseService.execute_query('DELETE FROM LiquidationPrice', fetch=False)
+                DatabaseService.execute_many(
+                    'INSERT INTO LiquidationPrice VALUES (?, ?, ?, ?, ?, ?)',
+                    [
+                        (pool, coin, price, current,
+                         (current - price) / current * 100 if price is not None and current > 0 else None, now)
+                        for pool, coin, price, current in result['liquidation']
+                    ]
+                )
+
+            data = {'pools': len(result['pools']), 'updated': updated}
+            job.add_report(lending_pools=data['pools'])
+            logger.info(f'Updated lending health after {source}: {data}')
+            return ResponseHandler.success(f'Computed health for {data["pools"]} lending pools', data=data)
+        except Exception as e:
+            logger.error(f'Error updating lending health: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to update lending health: {str(e)}')
+
+    @classmethod
+    def get_health(cls) -> Dict[str, Any]:
+        """
+        Get every lending pool with its health ratio and liquidation prices, riskiest first.
+
+        Returns:
+            ResponseHandler with data [{'position_id', 'health_ratio', 'total_collateral_value',
+            'total_borrow_value', 'liquidation_prices': [{coin_id, liquidation_price,
+            current_price, distance_percent}]}]
+        """
+        try:
+            pools = DatabaseService.execute_query('''
+                SELECT position_id, health_ratio, total_collateral_value, total_borrow_value
+                FROM LendingPool
+                ORDER BY health_ratio IS NULL, health_ratio
+            ''') if cls._has_lending_pool_table() else []
+            prices: Dict[str, List[Dict[str, Any]]] = {}
+            for row in DatabaseService.execute_query('''
+                SELECT lending_pool_id, coin_id, liquidation_price, current_price, distance_percent
+                FROM LiquidationPrice
+                ORDER BY lending_pool_id, distance_percent IS NULL, distance_percent
+            '''):
+                prices.setdefault(row[0], []).append({
+                    'coin_id': row[1],
+                    'liquidation_price': row[2],
+                    'current_price': row[3],
+                    'distance_percent': row[4]
+                })
+            data = [
+                {**dict(row), 'liquidation_prices': prices.get(row['position_id'], [])}
+                for row in pools
+            ]
+            return ResponseHandler.success(f'Retrieved {len(data)} lending pools', data=data)
+        except Exception as e:
+            logger.error(f'Error retrieving lending health: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve lending health: {str(e)}')
+
+    @staticmethod
+    def _has_lending_pool_table() -> bool:
+        return bool(DatabaseService.execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'LendingPool'"
+        ))
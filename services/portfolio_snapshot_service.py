@@ -0,0 +1,162 @@
+import time
+from typing import Any, Dict, List, Optional
+from services.database import DatabaseService
+from services.valuation_service import ValuationService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# One column per position type (see models.valuation.POSITION_TYPES)
+SNAPSHOT_COLUMNS = ['ts', 'total', 'wallet', 'staking', 'farming', 'leveraged', 'lending']
+
+
+class PortfolioSnapshotService:
+    """
+    Time series of total portfolio value and per-position-type totals.
+
+    A snapshot is taken after every refresh (see RefreshScheduler.after_refresh)
+    and stored as one row keyed by epoch seconds, so a range read is a
+    rowid range scan. get_series() downsamples any range to a fixed number of
+    points with Largest-Triangle-Three-Buckets or bucket averages so charts
+    stay fast over long histories.
+    """
+
+    @staticmethod
+    def current_totals() -> Dict[str, float]:
+        """Current per-type totals and the portfolio total from the valuation engine"""
+        valuation = ValuationService.get_valuation()
+        totals = {column: valuation.by_type.get(column, 0.0) for column in SNAPSHOT_COLUMNS[2:]}
+        totals['total'] = valuation.total
+        return totals
+
+    @classmethod
+    def take_snapshot(cls, source: str = None, ts: float = None) -> Dict[str, Any]:
+        """
+        Record the current portfolio value.
+
+        Args:
+            source: What triggered the snapshot, e.g. the refresh task name
+            ts: Epoch seconds of the snapshot, defaults to now
+
+        Returns:
+            ResponseHandler with the snapshot as data
+        """
+        try:
+            snapshot = {'ts': int(ts if ts is not None else time.time()), **cls.current_totals()}
+            DatabaseService.execute_query(
+                f'INSERT OR REPLACE INTO PortfolioSnapshot ({", ".join(SNAPSHOT_COLUMNS)}, source) '
+                f'VALUES ({", ".join("?" for _ in SNAPSHOT_COLUMNS)}, ?)',
+                tuple(snapshot[column] for column in SNAPSHOT_COLUMNS) + (source,),
+                fetch=False
+            )
+            logger.info(f'Portfolio snapshot after {source}: total {snapshot["total"]:.2f}')
+            return ResponseHandler.success('Snapshot taken', data=snapshot)
+        except Exception as e:
+            logger.error(f'Error taking portfolio snapshot: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to take snapshot: {str(e)}')
+
+    @classmethod
+    def get_series(cls, start: float = None, end: float = None, points: int = 500,
+                   method: str = 'lttb') -> Dict[str, Any]:
+        """
+        Get the snapshot series for a range, downsampled to at most `points` points.
+
+        Args:
+            start: Epoch seconds, defaults to the first snapshot
+            end: Epoch seconds, defaults to now
+            points: Maximum number of points to return
+            method: 'lttb' keeps the snapshots that best preserve the shape of the
+                    total; 'avg' averages every column over equal time buckets
+
+        Returns:
+            ResponseHandler with data {'method', 'points': [{ts, total, wallet, ...}]}
+        """
+        if method not in ('lttb', 'avg'):
+            return ResponseHandler.error(f'Unsupported downsampling method: {method}')
+        start = int(start) if start is not None else 0
+        end = int(end) if end is not None else int(time.time())
+        points = max(int(points), 3)
+
+        try:
+            if method == 'avg':
+                series = cls._bucket_average(start, end, points)
+            else:
+                rows = DatabaseService.execute_query(
+                    f'SELECT {", ".join(SNAPSHOT_COLUMNS)} FROM PortfolioSnapshot WHERE ts BETWEEN ? AND ? ORDER BY ts',
+                    (start, end)
+                )
+                series = [dict(zip(SNAPSHOT_COLUMNS, row)) for row in rows]
+                series = cls.lttb(series, points)
+            return ResponseHandler.success(
+                f'Retrieved {len(series)} points',
+                data={'method': method, 'points': series}
+            )
+        except Exception as e:
+            logger.error(f'Error retrieving portfolio series: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve portfolio series: {str(e)}')
+
+    @staticmethod
+    def _bucket_average(start: int, end: int, points: int) -> List[Dict[str, float]]:
+        """Average every column over `points` equal-width time buckets"""
+        width = max((end - start) // points + 1, 1)
+        averages = ', '.join(f'AVG({column})' for column in SNAPSHOT_COLUMNS[1:])
+        rows = DatabaseService.execute_query(f'''
+            SELECT CAST(AVG(ts) AS INTEGER), {averages}
+            FROM PortfolioSnapshot
+            WHERE ts BETWEEN ? AND ?
+            GROUP BY (ts - ?) / ?
+            ORDER BY 1
+        ''', (start, end, start, width))
+        return [dict(zip(SNAPSHOT_COLUMNS, row)) for row in rows]
+
+    @staticmethod
+    def lttb(series: List[Dict[str, Any]], threshold: int, x: str = 'ts', y: str = 'total') -> List[Dict[str, Any]]:
+        """
+        Largest-Triangle-Three-Buckets downsampling.
+
+        Keeps the first and last points and, from each of threshold - 2
+        equal-count buckets in between, the point forming the largest triangle
+        with the point kept from the previous bucket and the average of the
+        next bucket.
+
+        Args:
+            series: Points ordered by x
+            threshold: Number of points to keep
+            x: Key of the x value
+            y: Key of the y value
+
+        Returns:
+            The kept points, in order
+        """
+        length = len(series)
+        if threshold >= length or threshold < 3:
+            return list(series)
+
+        sampled = [series[0]]
+        every = (length - 2) / (threshold - 2)
+        a = 0
+        for i in range(threshold - 2):
+            # Average of the next bucket
+            next_start = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, length)
+            next_bucket = series[next_start:next_end]
+            avg_x = sum(point[x] for point in next_bucket) / len(next_bucket)
+            avg_y = sum(point[y] for point in next_bucket) / len(next_bucket)
+
+            # Point in this bucket with the largest triangle
+            bucket_start = int(i * every) + 1
+            bucket_end = int((i + 1) * every) + 1
+            ax, ay = series[a][x], series[a][y]
+            max_area = -1.0
+            chosen = bucket_start
+            for j in range(bucket_start, bucket_end):
+                area = abs((ax - avg_x) * (series[j][y] - ay) - (ax - series[j][x]) * (avg_y - ay))
+                if area > max_area:
+                    max_area = area
+                    chosen = j
+            sampled.append(series[chosen])
+            a = chosen
+
+        sampled.append(series[-1])
+        return sampled
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import List, Set
+
+
+@dataclass(frozen=True)
+class PositionLeg:
+    """
+    One coin held or owed by the rows of a position table.
+
+    Fields are SQL expressions over the table's columns. Values are the
+    stored generated columns, so valuation, analytics, exposure and price
+    tiers all value a leg the same way.
+    """
+    table: str
+    position_column: str  # portfolio position the leg belongs to
+    coin_column: str
+    position_type: str
+    held: str  # coin amount held
+    debt: str  # coin amount owed
+    price: str  # price stored with the position
+    value: str  # stored USD value of the amount held
+    debt_value: str  # stored USD value of the amount owed
+    collateral_factor: str = 'NULL'  # for lending collateral
+
+    @property
+    def amount(self) -> str:
+        """Coin amount net of debt"""
+        return _difference(self.held, self.debt)
+
+    @property
+    def net_value(self) -> str:
+        """Stored USD value net of debt"""
+        return _difference(self.value, self.debt_value)
+
+    @property
+    def gross_amount(self) -> str:
+        """Coin amount held plus owed: a stale price on either side misstates the portfolio"""
+        terms = [f'ABS({side})' for side in (self.held, self.debt) if side != '0']
+        return ' + '.join(terms)
+
+
+def _difference(left: str, right: str) -> str:
+    if right == '0':
+        return left
+    if left == '0':
+        return f'-{right}'
+    return f'{left} - {right}'
+
+
+# Every position leg, one per coin a position table row holds. LP pairs hold
+# both tokens; leveraged farms hold both and owe both; lending pools hold
+# their collateral and owe their borrows.
+POSITION_LEGS = [
+    PositionLeg('Wallet', 'position_id', 'coin_id', 'wallet', 'amount', '0', 'price', 'value', '0'),
+    PositionLeg('Staking', 'position_id', 'coin_id', 'staking', 'amount', '0', 'price', 'value', '0'),
+    PositionLeg('FarmingPool', 'position_id', 'token_a_id', 'farming', 'holdings_a', '0', 'price_a', 'value_a', '0'),
+    PositionLeg('FarmingPool', 'position_id', 'token_b_id', 'farming', 'holdings_b', '0', 'price_b', 'value_b', '0'),
+    PositionLeg('LeveragedFarmingPool', 'position_id', 'token_a_id', 'leveraged',
+                'holdings_a', 'debt_a', 'price_a', 'value_a', 'debt_value_a'),
+    PositionLeg('LeveragedFarmingPool', 'position_id', 'token_b_id', 'leveraged',
+                'holdings_b', 'debt_b', 'price_b', 'value_b', 'debt_value_b'),
+    PositionLeg('CollateralPosition', 'lending_pool_id', 'coin_id', 'lending',
+                'amount', '0', 'price', 'value', '0', 'collateral_factor'),
+    PositionLeg('BorrowPosition', 'lending_pool_id', 'coin_id', 'lending', '0', 'amount', 'price', '0', 'value'),
+]
+
+POSITION_TABLES = sorted({leg.table for leg in POSITION_LEGS})
+
+
+def legs_in(existing: Set[str]) -> List[PositionLeg]:
+    """The legs of the position tables that exist"""
+    return [leg for leg in POSITION_LEGS if leg.table in existing]
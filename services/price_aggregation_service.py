@@ -0,0 +1,244 @@
+import threading
+import time
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from services.database import DatabaseService
+from services.job_service import JobService
+from services.price_history_service import PriceHistoryService
+from config import Config
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PriceAggregationService:
+    """
+    Consolidated coin prices from the quotes of every price source.
+
+    Each source (CoinGecko, and Moralis per chain as 'moralis:<chain>') keeps
+    its latest quote per coin in PriceQuote with the time it was quoted.
+    Quotes are buffered while a refresh runs and written by flush().
+    consolidate() then prices every coin in one vectorized pass: the
+    consolidated price is the weighted median of the coin's quotes, weighted
+    by the source's Config.PRICE_SOURCE_WEIGHTS and halved every
+    Config.PRICE_QUOTE_HALF_LIFE seconds of age. The weight is per source, so
+    Moralis' per-chain quotes of a coin share Moralis' weight. Quotes older than
+    Config.PRICE_QUOTE_MAX_AGE are ignored. Quotes further than
+    Config.PRICE_OUTLIER_THRESHOLD from the median are flagged as outliers;
+    being a median, a single bad quote can't move the price while the other
+    sources agree.
+
+    The result is written to PriceConsensus and, where it changed, to
+    CoinPrices.CurrentPrice and the price history. Refreshes only record
+    quotes, so this is the only writer of both. Runs after every price
+    refresh, before positions are repriced.
+    """
+
+    _buffer: List[Tuple[str, str, float, float]] = []
+    _buffer_lock = threading.Lock()
+
+    @classmethod
+    def record_quote(cls, coin_id: str, source: str, price: float, ts: float = None) -> None:
+        """
+        Buffer a price quote. Quotes are written by flush().
+
+        Args:
+            coin_id: CoinPrices.Name of the coin
+            source: 'coingecko' or 'moralis:<chain>'
+            price: Price in USD; missing or non-positive prices are ignored
+            ts: Epoch seconds the price was quoted at, defaults to now
+        """
+        if price is None or not float(price) > 0:
+            return
+        with cls._buffer_lock:
+            cls._buffer.append((coin_id, source, float(price), ts if ts is not None else time.time()))
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Write buffered quotes in one batch, keeping the newest quote per coin and source.
+
+        Returns:
+            Number of quotes written
+        """
+        with cls._buffer_lock:
+            quotes, cls._buffer = cls._buffer, []
+        if not quotes:
+            return 0
+        try:
+            return DatabaseService.execute_many('''
+                INSERT INTO PriceQuote (coin_id, source, price, quoted_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(coin_id, source) DO UPDATE SET price = excluded.price, quoted_at = excluded.quoted_at
+                WHERE excluded.quoted_at >= PriceQuote.quoted_at
+            ''', quotes)
+        except Exception as e:
+            logger.error(f'Failed to record price quotes: {str(e)}', exc_info=True)
+            return 0
+
+    @staticmethod
+    def compute(coin_idx: np.ndarray, prices: np.ndarray, ages: np.ndarray, base_weights: np.ndarray,
+                coin_count: int, source_idx: np.ndarray = None) -> Dict[str, np.ndarray]:
+        """
+        Consolidated price of every coin from its quotes.
+
+        Args:
+            coin_idx: Per quote, index of its coin
+            prices: Per quote, price in USD
+            ages: Per quote, seconds since it was quoted
+            base_weights: Per quote, weight of its source
+            coin_count: Number of coins
+            source_idx: Per quote, index of its source; a source's usable quotes of
+                one coin share its weight. None if every source quotes a coin once
+
+        Returns:
+            {'price': per coin weighted median (NaN without usable quotes),
+             'spread_percent': per coin range of the non-outlier quotes as a percent of the price,
+             'weight': per quote weight, 'outlier': per quote outlier flag}
+        """
+        usable = (ages <= Config.PRICE_QUOTE_MAX_AGE) & (prices > 0)
+        weights = np.where(usable, base_weights * np.exp2(-np.maximum(ages, 0) / Config.PRICE_QUOTE_HALF_LIFE), 0.0)
+        if source_idx is not None and len(source_idx):
+            group = coin_idx * (source_idx.max() + 1) + source_idx
+            shares = np.bincount(group, weights=usable)
+            weights = weights / np.maximum(shares[group], 1)
+
+        # Weighted median: sort each coin's quotes by price and take the first one
+        # at which the running weight reaches half the coin's total
+        order = np.lexsort((prices, coin_idx))
+        coins, sorted_prices, sorted_weights = coin_idx[order], prices[order], weights[order]
+        totals = np.bincount(coins, weights=sorted_weights, minlength=coin_count)
+        running = np.cumsum(sorted_weights)
+        before = np.concatenate(([0.0], running))[np.searchsorted(coins, np.arange(coin_count))]
+        within = running - before[coins]
+        reached = np.flatnonzero((sorted_weights > 0) & (within >= totals[coins] * (0.5 - 1e-12)))
+        median = np.full(coin_count, np.nan)
+        found, first = np.unique(coins[reached], return_index=True)
+        median[found] = sorted_prices[reached[first]]
+
+        quote_median = median[coin_idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            outlier = usable & (np.abs(prices / quote_median - 1) > Config.PRICE_OUTLIER_THRESHOLD)
+        inliers = usable & ~outlier
+        high = np.full(coin_count, -np.inf)
+        low = np.full(coin_count, np.inf)
+        np.maximum.at(high, coin_idx[inliers], prices[inliers])
+        np.minimum.at(low, coin_idx[inliers], prices[inliers])
+        with np.errstate(invalid='ignore'):
+            spread = np.where(np.isfinite(high), (high - low) / median * 100, np.nan)
+        return {'price': median, 'spread_percent': spread, 'weight': weights, 'outlier': outlier}
+
+    @classmethod
+    def consolidate(cls, coins: Iterable[str] = None, now: float = None) -> Dict[str, Any]:
+        """
+        Flush buffered quotes and reprice coins from their quotes.
+
+        Args:
+            coins: Coin names to consolidate, None for every coin with quotes
+            now: Epoch seconds to age quotes against, defaults to now
+
+        Returns:
+            ResponseHandler with data {'coins': coins consolidated, 'updated': CoinPrices rows changed,
+            'outliers': outlier quotes, 'prices': {coin: consolidated price}}
+        """
+        try:
+            cls.flush()
+            now = time.time() if now is None else now
+            query = 'SELECT coin_id, source, price, quoted_at, outlier FROM PriceQuote'
+            params = ()
+            if coins is not None:
+                query += ' WHERE coin_id IN (SELECT value FROM json_each(?))'
+                params = (json.dumps(list(coins)),)
+            rows = DatabaseService.execute_query(query, params)
+            if not rows:
+                return ResponseHandler.success('No price quotes to consolidate',
+                                               data={'coins': 0, 'updated': 0, 'outliers': 0, 'prices': {}})
+
+            names, coin_idx = np.unique([row[0] for row in rows], return_inverse=True)
+            # 'moralis:<chain>' quotes all belong to the moralis source
+            sources, source_idx = np.unique([row[1].split(':')[0] for row in rows], return_inverse=True)
+            weights = np.array([Config.PRICE_SOURCE_WEIGHTS.get(source, 0.0) for source in sources], dtype=float)
+            result = cls.compute(
+                coin_idx,
+                np.array([row[2] for row in rows], dtype=float),
+                now - np.array([row[3] for row in rows], dtype=float),
+                weights[source_idx],
+                len(names),
+                source_idx
+            )
+            outlier = result['outlier']
+            quote_counts = np.bincount(coin_idx, weights=result['weight'] > 0, minlength=len(names))
+            outlier_counts = np.bincount(coin_idx, weights=outlier, minlength=len(names))
+            priced = np.flatnonzero(~np.isnan(result['price']))
+            prices = dict(zip(names[priced].tolist(), result['price'][priced].tolist()))
+
+            with DatabaseService.unit_of_work():
+                DatabaseService.execute_many(
+                    'UPDATE PriceQuote SET outlier = ? WHERE coin_id = ? AND source = ? AND outlier != ?',
+                    [(int(flag), row[0], row[1], int(flag)) for row, flag in zip(rows, outlier.tolist())
+                     if int(flag) != row[4]]
+                )
+                DatabaseService.execute_many('''
+                    INSERT OR REPLACE INTO PriceConsensus (coin_id, price, quotes, outliers, spread_percent, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(names[i], result['price'][i], int(quote_counts[i]), int(outlier_counts[i]),
+                       float(np.nan_to_num(result['spread_percent'][i])), now) for i in priced.tolist()])
+                changed = [row[0] for row in DatabaseService.execute_query(
+                    '''SELECT c.Name FROM CoinPrices c JOIN json_each(?) p ON c.Name = p.key
+                       WHERE c.CurrentPrice IS NOT p.value''',
+                    (json.dumps(prices),)
+                )]
+                DatabaseService.execute_many(
+                    'UPDATE CoinPrices SET CurrentPrice = ? WHERE Name = ?',
+                    [(prices[name], name) for name in changed]
+                )
+            for name in changed:
+                PriceHistoryService.record(name, prices[name], now)
+            PriceHistoryService.flush()
+
+            flagged = int(outlier.sum())
+            if flagged:
+                logger.warning(f'Flagged {flagged} outlier price quotes')
+            logger.info(f'Consolidated {len(prices)} coin prices, {len(changed)} changed')
+            JobService.current().add_report(consolidated_prices=len(prices), price_changes=len(changed),
+                                            outlier_quotes=flagged)
+            return ResponseHandler.success('Prices consolidated', data={
+                'coins': len(prices), 'updated': len(changed), 'outliers': flagged, 'prices': prices
+            })
+        except Exception as e:
+            logger.error(f'Error consolidating prices: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to consolidate prices: {str(e)}')
+
+    @classmethod
+    def consolidate_prices(cls, source: str = 'manual') -> Dict[str, Any]:
+        """Refresh hook: consolidate every coin's quotes after a price refresh"""
+        logger.debug(f'Consolidating prices after {source} refresh')
+        return cls.consolidate()
+
+    @classmethod
+    def get_quotes(cls, coin_id: str) -> Dict[str, Any]:
+        """
+        Every source's quote of a coin with its consolidated price.
+
+        Returns:
+            ResponseHandler with data {'coin_id', 'consensus': {...} or None,
+            'quotes': [{'source', 'price', 'quoted_at', 'outlier'}]}
+        """
+        try:
+            quotes = DatabaseService.execute_query(
+                'SELECT source, price, quoted_at, outlier FROM PriceQuote WHERE coin_id = ? ORDER BY source',
+                (coin_id,)
+            )
+            consensus = DatabaseService.execute_query(
+                'SELECT price, quotes, outliers, spread_percent, updated_at FROM PriceConsensus WHERE coin_id = ?',
+                (coin_id,)
+            )
+            return ResponseHandler.success('Price quotes retrieved', data={
+                'coin_id': coin_id,
+                'consensus': dict(consensus[0]) if consensus else None,
+                'quotes': [dict(row, outlier=bool(row['outlier'])) for row in quotes]
+            })
+        except Exception as e:
+            logger.error(f'Error retrieving price quotes for {coin_id}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve price quotes: {str(e)}')
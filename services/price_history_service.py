@@ -0,0 +1,274 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+RAW = 0  # resolution of unaggregated samples
+HOUR = 3600
+DAY = 86400
+
+
+class PriceHistoryService:
+    """
+    Append-only price history with hourly and daily OHLC rollups.
+
+    Samples are stored as (integer coin id, epoch seconds, price) in a
+    WITHOUT ROWID table clustered on (coin_id, ts), so a coin's range is one
+    contiguous index scan. Price writes only append to an in-memory buffer;
+    the buffer is flushed with a single executemany after each refresh, so
+    live writes to CoinPrices don't pay for history. rollup() aggregates new
+    raw samples into 1h buckets and 1h buckets into 1d buckets, and prune()
+    applies Config.PRICE_HISTORY_RETENTION per resolution.
+    """
+
+    _buffer: List[Tuple[str, float, int]] = []
+    _buffer_lock = threading.Lock()
+    _coin_ids: Dict[str, int] = {}
+    _coin_ids_pool: Optional[object] = None  # pool _coin_ids were read through
+
+    @classmethod
+    def record(cls, name: str, price: float, ts: float = None) -> None:
+        """
+        Buffer a price sample. Samples are written by flush().
+
+        Args:
+            name: CoinPrices.Name of the coin
+            price: Price in USD
+            ts: Epoch seconds of the sample, defaults to now
+        """
+        if price is None:
+            return
+        with cls._buffer_lock:
+            cls._buffer.append((name, float(price), int(ts if ts is not None else time.time())))
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Write buffered samples in one batch.
+
+        Returns:
+            Number of samples written
+        """
+        with cls._buffer_lock:
+            samples, cls._buffer = cls._buffer, []
+        if not samples:
+            return 0
+        try:
+            coin_ids = cls._get_coin_ids({name for name, _, _ in samples})
+            written = DatabaseService.execute_many(
+                'INSERT OR REPLACE INTO PriceHistory (coin_id, ts, price) VALUES (?, ?, ?)',
+                [(coin_ids[name], ts, price) for name, price, ts in samples]
+            )
+            logger.info(f'Recorded {len(samples)} price history samples')
+            return written
+        except Exception as e:
+            logger.error(f'Failed to record price history: {str(e)}', exc_info=True)
+            return 0
+
+    @classmethod
+    def _get_coin_ids(cls, names) -> Dict[str, int]:
+        """Map coin names to integer ids, assigning ids to new coins"""
+        if cls._coin_ids_pool is not DatabaseService.get_pool():
+            cls._coin_ids, cls._coin_ids_pool = {}, DatabaseService.get_pool()
+        missing = [name for name in names if name not in cls._coin_ids]
+        if missing:
+            DatabaseService.execute_many(
+                'INSERT OR IGNORE INTO PriceHistoryCoin (name) VALUES (?)',
+                [(name,) for name in missing]
+            )
+            for coin_id, name in DatabaseService.execute_query('SELECT id, name FROM PriceHistoryCoin'):
+                cls._coin_ids[name] = coin_id
+        return cls._coin_ids
+
+    @classmethod
+    def rollup(cls) -> Dict[str, Any]:
+        """
+        Aggregate new raw samples into 1h OHLC buckets and 1h buckets into 1d.
+
+        Only buckets from each resolution's watermark onwards are rebuilt, so
+        the cost depends on new data, not on the size of the history.
+
+        Returns:
+            ResponseHandler with data {resolution: buckets written}
+        """
+        job = JobService.current()
+        try:
+            written = {}
+            with DatabaseService.transaction():
+                job.stage('rollup_hourly')
+                written[HOUR] = cls._rollup_level(HOUR, cls._hourly_from_raw)
+                job.stage('rollup_daily')
+                written[DAY] = cls._rollup_level(DAY, cls._daily_from_hourly)
+            job.add_report(hourly_buckets=written[HOUR], daily_buckets=written[DAY])
+            logger.info(f'Rolled up {written[HOUR]} hourly and {written[DAY]} daily price buckets')
+            return ResponseHandler.success('Price history rolled up', data=written)
+        except Exception as e:
+            logger.error(f'Error rolling up price history: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to roll up price history: {str(e)}')
+
+    @classmethod
+    def _rollup_level(cls, resolution: int, query: str) -> int:
+        result = DatabaseService.execute_query(
+            'SELECT bucket FROM PriceHistoryWatermark WHERE resolution = ?', (resolution,)
+        )
+        since = result[0][0] if result else 0
+        DatabaseService.execute_query(query, {'resolution': resolution, 'since': since}, fetch=False)
+        written = DatabaseService.execute_query('SELECT changes()')[0][0]
+        latest = DatabaseService.execute_query(
+            'SELECT MAX(bucket) FROM PriceHistoryRollup WHERE coin_id IN (SELECT id FROM PriceHistoryCoin) '
+            'AND resolution = ? AND bucket >= ?',
+            (resolution, since)
+        )[0][0]
+        if latest is not None:
+            DatabaseService.execute_query(
+                'INSERT OR REPLACE INTO PriceHistoryWatermark (resolution, bucket) VALUES (?, ?)',
+                (resolution, latest), fetch=False
+            )
+        return written
+
+    # Buckets are rebuilt whole from their first sample, so a bucket that was
+    # partial at the last rollup is completed rather than duplicated. Open and
+    # close come from the first and last samples through primary key lookups.
+    _hourly_from_raw = '''
+        INSERT OR REPLACE INTO PriceHistoryRollup (coin_id, resolution, bucket, open, high, low, close, samples)
+        SELECT g.coin_id, :resolution, g.bucket,
+               (SELECT price FROM PriceHistory WHERE coin_id = g.coin_id AND ts = g.first_ts),
+               g.high, g.low,
+               (SELECT price FROM PriceHistory WHERE coin_id = g.coin_id AND ts = g.last_ts),
+               g.samples
+        FROM (
+            SELECT h.coin_id, (h.ts / :resolution) * :resolution AS bucket,
+                   MIN(h.ts) AS first_ts, MAX(h.ts) AS last_ts,
+                   MAX(h.price) AS high, MIN(h.price) AS low, COUNT(*) AS samples
+            FROM PriceHistoryCoin c
+            JOIN PriceHistory h ON h.coin_id = c.id AND h.ts >= :since
+            GROUP BY h.coin_id, bucket
+        ) g
+    '''
+
+    _daily_from_hourly = '''
+        INSERT OR REPLACE INTO PriceHistoryRollup (coin_id, resolution, bucket, open, high, low, close, samples)
+        SELECT g.coin_id, :resolution, g.bucket,
+               (SELECT open FROM PriceHistoryRollup WHERE coin_id = g.coin_id AND resolution = 3600 AND bucket = g.first_bucket),
+               g.high, g.low,
+               (SELECT close FROM PriceHistoryRollup WHERE coin_id = g.coin_id AND resolution = 3600 AND bucket = g.last_bucket),
+               g.samples
+        FROM (
+            SELECT r.coin_id, (r.bucket / :resolution) * :resolution AS bucket,
+                   MIN(r.bucket) AS first_bucket, MAX(r.bucket) AS last_bucket,
+                   MAX(r.high) AS high, MIN(r.low) AS low, SUM(r.samples) AS samples
+            FROM PriceHistoryCoin c
+            JOIN PriceHistoryRollup r ON r.coin_id = c.id AND r.resolution = 3600 AND r.bucket >= :since
+            GROUP BY r.coin_id, (r.bucket / :resolution) * :resolution
+        ) g
+    '''
+
+    @classmethod
+    def prune(cls, now: float = None) -> Dict[str, Any]:
+        """
+        Delete history older than Config.PRICE_HISTORY_RETENTION.
+
+        Raw samples are only deleted once they have been rolled up.
+
+        Returns:
+            ResponseHandler with data {resolution: rows deleted}
+        """
+        now = now if now is not None else time.time()
+        try:
+            deleted = {}
+            with DatabaseService.transaction():
+                for resolution, retention in Config.PRICE_HISTORY_RETENTION.items():
+                    if retention is None:
+                        continue
+                    cutoff = int(now - retention)
+                    if resolution == RAW:
+                        watermark = DatabaseService.execute_query(
+                            'SELECT bucket FROM PriceHistoryWatermark WHERE resolution = ?', (HOUR,)
+                        )
+                        cutoff = min(cutoff, watermark[0][0] if watermark else 0)
+                        DatabaseService.execute_query(
+                            'DELETE FROM PriceHistory WHERE coin_id IN (SELECT id FROM PriceHistoryCoin) AND ts < ?',
+                            (cutoff,), fetch=False
+                        )
+                    else:
+                        DatabaseService.execute_query(
+                            'DELETE FROM PriceHistoryRollup WHERE coin_id IN (SELECT id FROM PriceHistoryCoin) '
+                            'AND resolution = ? AND bucket < ?',
+                            (resolution, cutoff), fetch=False
+                        )
+                    deleted[resolution] = DatabaseService.execute_query('SELECT changes()')[0][0]
+            logger.info(f'Pruned price history: {deleted}')
+            return ResponseHandler.success('Price history pruned', data=deleted)
+        except Exception as e:
+            logger.error(f'Error pruning price history: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to prune price history: {str(e)}')
+
+    @classmethod
+    def maintain(cls) -> Dict[str, Any]:
+        """Roll up and prune the history; scheduled as a background job"""
+        cls.flush()
+        result = cls.rollup()
+        if not result['success']:
+            return result
+        JobService.current().stage('prune')
+        pruned = cls.prune()
+        if not pruned['success']:
+            return pruned
+        return ResponseHandler.success('Price history maintained', data={'rollup': result['data'], 'pruned': pruned['data']})
+
+    @classmethod
+    def get_history(cls, name: str, start: float = None, end: float = None,
+                    resolution: int = None) -> Dict[str, Any]:
+        """
+        Get a coin's price history over a time range.
+
+        Args:
+            name: CoinPrices.Name of the coin
+            start: Epoch seconds, defaults to end minus one day
+            end: Epoch seconds, defaults to now
+            resolution: 0 for raw samples, 3600 or 86400 for OHLC buckets;
+                        picked from the range length when omitted
+
+        Returns:
+            ResponseHandler with data {'resolution', 'points'}; raw points are
+            {'ts', 'price'}, rollup points {'ts', 'open', 'high', 'low', 'close'}
+        """
+        end = int(end if end is not None else time.time())
+        start = int(start if start is not None else end - DAY)
+        if resolution is None:
+            span = end - start
+            resolution = RAW if span <= 2 * DAY else HOUR if span <= 90 * DAY else DAY
+        if resolution not in (RAW, HOUR, DAY):
+            return ResponseHandler.error(f'Unsupported resolution: {resolution}')
+
+        try:
+            if resolution == RAW:
+                rows = DatabaseService.execute_query('''
+                    SELECT h.ts, h.price FROM PriceHistory h
+                    JOIN PriceHistoryCoin c ON c.id = h.coin_id
+                    WHERE c.name = ? AND h.ts BETWEEN ? AND ?
+                    ORDER BY h.ts
+                ''', (name, start, end))
+                points = [{'ts': ts, 'price': price} for ts, price in rows]
+            else:
+                rows = DatabaseService.execute_query('''
+                    SELECT r.bucket, r.open, r.high, r.low, r.close FROM PriceHistoryRollup r
+                    JOIN PriceHistoryCoin c ON c.id = r.coin_id
+                    WHERE c.name = ? AND r.resolution = ? AND r.bucket BETWEEN ? AND ?
+                    ORDER BY r.bucket
+                ''', (name, resolution, start - start % resolution, end))
+                points = [{'ts': bucket, 'open': o, 'high': h, 'low': l, 'close': c}
+                          for bucket, o, h, l, c in rows]
+            return ResponseHandler.success(
+                f'Retrieved {len(points)} points for {name}',
+                data={'resolution': resolution, 'points': points}
+            )
+        except Exception as e:
+            logger.error(f'Error retrieving price history for {name}: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to retrieve price history: {str(e)}')
@@ -0,0 +1,186 @@
+import heapq
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+from config import Config
+from services.database import DatabaseService
+from services.coin_gecko import CoinGeckoService
+from services.coin_price_service import CoinPriceService
+from services.job_service import JobService
+from services.position_legs import legs_in
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+@dataclass
+class CoinTier:
+    """Refresh tier and priority of one coin"""
+    name: str
+    api_id: str
+    tier: int  # 1 = held, 2 = volatile, 3 = everything else
+    held: float  # coin amount held or owed across all positions
+    exposure: float  # USD value held across all positions
+    volatility: float  # absolute 1h price change in percent
+    age: Optional[float]  # seconds since the last refresh, None if never refreshed
+    priority: float = 0.0  # higher refreshes first within a tier
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class PriceTierService:
+    """
+    Tiered price refresh that spends the API budget where it matters most.
+
+    Coins held in any position table are tier 1 and refresh most often.
+    Coins moving more than Config.PRICE_TIER_VOLATILE_PCT in the last hour
+    are tier 2. Everything else (the rest of the top 500 and coins we track
+    but no longer hold) is tier 3. A coin is due once it is older than its
+    tier's interval; due coins go through a priority queue ordered by tier,
+    then by expected change in portfolio value (exposure x volatility x
+    overdue factor), and the first Config.PRICE_TIER_BUDGET coins are fetched.
+    """
+
+    @staticmethod
+    def get_coin_tiers(now: float = None) -> List[CoinTier]:
+        """
+        Classify every coin with an API ID into a refresh tier.
+
+        Args:
+            now: time.time() to measure coin age against
+
+        Returns:
+            List of CoinTier, unordered
+        """
+        now = now if now is not None else time.time()
+        tiers = []
+        for name, api_id, change_1h, last_updated, held, exposure in DatabaseService.execute_query(
+                PriceTierService._exposure_query()):
+            volatility = abs(change_1h or 0)
+            # Held coins are tier 1 even without a price yet; exposure only orders them
+            if held > 0:
+                tier = 1
+            elif volatility >= Config.PRICE_TIER_VOLATILE_PCT:
+                tier = 2
+            else:
+                tier = 3
+            tiers.append(CoinTier(
+                name=name,
+                api_id=api_id,
+                tier=tier,
+                held=held,
+                exposure=exposure,
+                volatility=volatility,
+                age=now - last_updated if last_updated is not None else None
+            ))
+        return tiers
+
+    @staticmethod
+    def plan_refresh(budget: int = None, now: float = None) -> List[CoinTier]:
+        """
+        Pick the due coins to refresh this run, most important first.
+
+        Args:
+            budget: Maximum number of coins to refresh, defaults to Config.PRICE_TIER_BUDGET
+            now: time.time() to measure coin age against
+
+        Returns:
+            List of CoinTier in refresh order
+        """
+        budget = budget if budget is not None else Config.PRICE_TIER_BUDGET
+        queue = []
+        for coin in PriceTierService.get_coin_tiers(now):
+            interval = Config.PRICE_TIER_INTERVALS[coin.tier]
+            if coin.age is not None and coin.age < interval:
+                continue
+            # Never-refreshed coins are treated as one full interval overdue
+            overdue = coin.age / interval if coin.age is not None else 2.0
+            if coin.tier == 1:
+                # Expected USD move; held stablecoins still get a small floor
+                coin.priority = coin.exposure * max(coin.volatility, 0.1) / 100 * overdue
+            elif coin.tier == 2:
+                coin.priority = coin.volatility * overdue
+            else:
+                coin.priority = overdue
+            heapq.heappush(queue, (coin.tier, -coin.priority, coin.name, coin))
+
+        plan = []
+        while queue and len(plan) < budget:
+            plan.append(heapq.heappop(queue)[-1])
+        return plan
+
+    @staticmethod
+    def refresh_due_prices(budget: int = None) -> Dict[str, Any]:
+        """
+        Refresh the highest-priority due coins in batched API calls.
+
+        Args:
+            budget: Maximum number of coins to refresh, defaults to Config.PRICE_TIER_BUDGET
+
+        Returns:
+            ResponseHandler with data {'planned', 'updated', 'by_tier'}
+        """
+        job = JobService.current()
+        job.stage('plan_refresh')
+        plan = PriceTierService.plan_refresh(budget)
+        by_tier = {tier: sum(1 for coin in plan if coin.tier == tier) for tier in (1, 2, 3)}
+        logger.info(f'Planned tiered refresh of {len(plan)} coins (tier 1: {by_tier[1]}, '
+                    f'tier 2: {by_tier[2]}, tier 3: {by_tier[3]})')
+        if not plan:
+            job.add_report(planned=0, updated=0)
+            return ResponseHandler.success('No coins due for refresh', data={'planned': 0, 'updated': 0, 'by_tier': by_tier})
+
+        job.stage('fetch_prices')
+        names_by_api_id = {coin.api_id: coin.name for coin in plan}
+        response = CoinGeckoService.fetch_coins_by_ids(names_by_api_id)
+        if not response['success']:
+            logger.error('Failed to fetch tiered coin prices from CoinGecko')
+            return ResponseHandler.error('Failed to fetch coin prices')
+
+        coins = response['data']
+        updated_count = 0
+        job.stage('update_prices', total=len(coins))
+        with DatabaseService.unit_of_work():
+            for coin_data in coins:
+                try:
+                    coin = CoinPriceService._coin_from_market_data(coin_data)
+                    # Keep the stored name so positions keep pointing at this row
+                    coin.Name = names_by_api_id.get(coin_data['id'], coin.Name)
+                    with DatabaseService.transaction():
+                        CoinPriceService._update_coin_in_db(coin)
+                    updated_count += 1
+                except KeyError as e:
+                    logger.error(f'Failed to process coin data for {coin_data.get("name", "Unknown")}: Missing key {str(e)}')
+                except Exception as e:
+                    logger.error(f'Failed to update price for {coin_data.get("name", "Unknown")}: {str(e)}')
+                job.advance()
+
+        logger.info(f'Tiered refresh updated {updated_count} of {len(plan)} planned coins')
+        job.add_report(planned=len(plan), updated=updated_count, by_tier=by_tier)
+        return ResponseHandler.success(
+            f'Refreshed {updated_count} coins',
+            data={'planned': len(plan), 'updated': updated_count, 'by_tier': by_tier}
+        )
+
+    @staticmethod
+    def _exposure_query() -> str:
+        """Per-coin amount held and USD exposure over the position tables that exist"""
+        existing = {row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        # Both legs of LP and leveraged positions count, and debt counts as much as holdings
+        legs = [f'SELECT {leg.coin_column}, {leg.gross_amount} FROM {leg.table}' for leg in legs_in(existing)]
+        held = '\n            UNION ALL '.join(legs) or 'SELECT NULL, 0'
+        return f'''
+            WITH held(coin_id, amount) AS (
+                {held}
+            )
+            SELECT c.Name, c.ApiId, c.PriceChangePercentage1h, c.LastUpdated,
+                   COALESCE(SUM(ABS(h.amount)), 0) AS held,
+                   COALESCE(SUM(ABS(h.amount)), 0) * COALESCE(c.CurrentPrice, 0) AS exposure
+            FROM CoinPrices c
+            LEFT JOIN held h ON h.coin_id = c.Name
+            WHERE c.ApiId IS NOT NULL AND c.ApiId != ''
+            GROUP BY c.Name
+        '''
@@ -0,0 +1,272 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from services.job_service import JobService
+from config import Config
+from utils.logging_config import setup_logger
+from utils.response import ResponseHandler
+
+logger = setup_logger(__name__)
+
+@dataclass
+class RefreshTask:
+    """A refresh that runs on an interval and on demand"""
+    name: str
+    func: Callable[[], Any]
+    interval: Optional[float]  # seconds between runs, None for on-demand only
+    next_run: Optional[float] = None  # time.monotonic() of the next scheduled run
+    queued: bool = False
+    job_id: Optional[str] = None  # Job of the queued run
+    running: bool = False
+    running_job_id: Optional[str] = None  # Job of the run in progress
+    started: Optional[float] = None  # time.monotonic() the run in progress started
+    last_started: Optional[datetime] = None
+    last_finished: Optional[datetime] = None
+    last_result: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'interval': self.interval,
+            'queued': self.queued,
+            'job_id': self.job_id,
+            'running': self.running,
+            'running_job_id': self.running_job_id,
+            'last_started': self.last_started.isoformat() if self.last_started else None,
+            'last_finished': self.last_finished.isoformat() if self.last_finished else None,
+            'last_result': self.last_result
+        }
+
+
+class RefreshScheduler:
+    """
+    Runs refresh tasks on a background thread instead of inside HTTP requests.
+
+    Tasks run one at a time on a single worker, so refreshes never overlap
+    each other. Each task's first scheduled run is delayed by a random jitter
+    so restarts don't all hit the APIs at once. Triggering a task that is
+    already queued is a no-op. Triggering one that started less than
+    Config.REFRESH_COALESCE_WINDOW seconds ago joins that run, so concurrent
+    callers share one execution and its job; triggering one that has been
+    running longer queues exactly one more run. Every run is recorded as a job (see JobService)
+    whose progress can be polled while it runs. Hooks registered with
+    after_refresh() run in the same job after each successful run.
+    """
+
+    _tasks: Dict[str, RefreshTask] = {}
+    _hooks: List[Tuple[Callable[[str], Any], Optional[Set[str]]]] = []
+    _condition = threading.Condition()
+    _thread: Optional[threading.Thread] = None
+    _stopping: bool = False
+    _jitter: Optional[float] = None  # jitter of the last start(), None for Config.REFRESH_JITTER
+
+    @classmethod
+    def register(cls, name: str, func: Callable[[], Any], interval: Optional[float] = None) -> None:
+        """
+        Register a refresh task.
+
+        Args:
+            name: Task name used by trigger()
+            func: Callable that performs the refresh and returns a ResponseHandler dict
+            interval: Seconds between scheduled runs, None to only run when triggered
+        """
+        with cls._condition:
+            cls._tasks[name] = RefreshTask(name=name, func=func, interval=interval)
+
+    @classmethod
+    def after_refresh(cls, hook: Callable[[str], Any], tasks: Iterable[str] = None) -> None:
+        """
+        Run a hook after every successful run of the given tasks.
+
+        Hooks run in registration order on the worker thread, inside the
+        task's job, and are called with the task name. A failing hook is
+        logged and doesn't stop the hooks after it.
+
+        Args:
+            hook: Callable taking the task name
+            tasks: Task names to hook, None for every task
+        """
+        with cls._condition:
+            cls._hooks.append((hook, set(tasks) if tasks is not None else None))
+
+    @classmethod
+    def init_app(cls, app) -> None:
+        """
+        Start the worker with the first request the app serves.
+
+        Works under any server. With the debug reloader, the watcher process
+        imports the app too but never serves a request, so it never schedules.
+        """
+        app.before_request(cls._ensure_started)
+
+    @classmethod
+    def _ensure_started(cls) -> None:
+        if not (cls._thread and cls._thread.is_alive()):
+            cls.start()
+
+    @classmethod
+    def start(cls, jitter: float = None) -> None:
+        """
+        Start the worker thread if it isn't already running.
+
+        Args:
+            jitter: Maximum random delay in seconds before each task's first scheduled run,
+                defaults to that of the last start or Config.REFRESH_JITTER
+        """
+        with cls._condition:
+            if cls._thread and cls._thread.is_alive():
+                return
+            cls._stopping = False
+            if jitter is None:
+                jitter = cls._jitter if cls._jitter is not None else Config.REFRESH_JITTER
+            cls._jitter = jitter
+            now = time.monotonic()
+            for task in cls._tasks.values():
+                if task.interval:
+                    task.next_run = now + random.uniform(0, jitter)
+            cls._thread = threading.Thread(target=cls._run, name='refresh-scheduler', daemon=True)
+            cls._thread.start()
+        logger.info(f'Started refresh scheduler with tasks: {", ".join(cls._tasks)}')
+
+    @classmethod
+    def stop(cls, timeout: float = None) -> None:
+        """Stop the worker thread after the current task finishes"""
+        with cls._condition:
+            cls._stopping = True
+            cls._condition.notify_all()
+            thread = cls._thread
+        if thread:
+            thread.join(timeout)
+        cls._thread = None
+
+    @classmethod
+    def trigger(cls, name: str) -> Dict[str, Any]:
+        """
+        Queue a task to run as soon as the worker is free.
+
+        Returns:
+            ResponseHandler success with data {'job_id'} if queued (or already queued),
+            {'job_id', 'joined': True} if it joined the run in progress,
+            error for an unknown task
+        """
+        with cls._condition:
+            task = cls._tasks.get(name)
+            if not task:
+                return ResponseHandler.error(f'Unknown refresh task: {name}')
+            if task.queued:
+                return ResponseHandler.success(f'Refresh {name} is already queued', data={'job_id': task.job_id})
+            if (task.running and task.running_job_id
+                    and time.monotonic() - task.started < Config.REFRESH_COALESCE_WINDOW):
+                return ResponseHandler.success(f'Refresh {name} is already running',
+                                               data={'job_id': task.running_job_id, 'joined': True})
+
+        job = JobService.create_job(name)
+        if not job['success']:
+            return job
+        job_id = job['data']['job_id']
+        if not job['data']['created']:
+            return ResponseHandler.success(f'Refresh {name} is already queued', data={'job_id': job_id})
+
+        with cls._condition:
+            task.queued = True
+            task.job_id = job_id
+            cls._condition.notify_all()
+
+        cls.start()
+        return ResponseHandler.success(f'Refresh {name} queued', data={'job_id': job_id})
+
+    @classmethod
+    def status(cls) -> Dict[str, Dict[str, Any]]:
+        """Get the state of every registered task"""
+        with cls._condition:
+            return {name: task.to_dict() for name, task in cls._tasks.items()}
+
+    @classmethod
+    def reset(cls) -> None:
+        """Stop the worker and forget all tasks"""
+        cls.stop()
+        with cls._condition:
+            cls._tasks = {}
+            cls._hooks = []
+            cls._jitter = None
+
+    @classmethod
+    def _next_due(cls) -> Optional[RefreshTask]:
+        """Pick the next task to run, or None if nothing is due yet"""
+        now = time.monotonic()
+        for task in cls._tasks.values():
+            if task.queued:
+                return task
+        due = [task for task in cls._tasks.values() if task.next_run is not None and task.next_run <= now]
+        return min(due, key=lambda task: task.next_run) if due else None
+
+    @classmethod
+    def _wait_timeout(cls) -> Optional[float]:
+        """Seconds until the next scheduled run, None if nothing is scheduled"""
+        scheduled = [task.next_run for task in cls._tasks.values() if task.next_run is not None]
+        if not scheduled:
+            return None
+        return max(0, min(scheduled) - time.monotonic())
+
+    @classmethod
+    def _run_task(cls, task: RefreshTask) -> Any:
+        """Run a task and, if it succeeded, its hooks"""
+        result = task.func()
+        if isinstance(result, dict) and not result.get('success'):
+            return result
+        with cls._condition:
+            hooks = [hook for hook, tasks in cls._hooks if tasks is None or task.name in tasks]
+        for hook in hooks:
+            hook_name = getattr(hook, '__qualname__', repr(hook))
+            JobService.current().stage(f'hook:{hook_name}')
+            try:
+                hook(task.name)
+            except Exception as e:
+                logger.error(f'Hook {hook_name} failed after {task.name}: {str(e)}', exc_info=True)
+        return result
+
+    @classmethod
+    def _run(cls) -> None:
+        """Worker loop"""
+        while True:
+            with cls._condition:
+                task = cls._next_due()
+                while task is None and not cls._stopping:
+                    cls._condition.wait(cls._wait_timeout())
+                    task = cls._next_due()
+                if cls._stopping:
+                    return
+                job_id = task.job_id
+                task.queued = False
+                task.job_id = None
+                task.running = True
+                task.running_job_id = job_id
+                task.started = time.monotonic()
+                task.last_started = datetime.utcnow()
+
+            logger.info(f'Running refresh task {task.name}')
+            try:
+                if job_id is None:
+                    # Scheduled run; skip it if a run is already queued elsewhere
+                    job = JobService.create_job(task.name)
+                    if not job['success'] or not job['data']['created']:
+                        raise RuntimeError(job.get('message') or job.get('error'))
+                    job_id = job['data']['job_id']
+                    with cls._condition:
+                        task.running_job_id = job_id
+                result = JobService.run_job(job_id, task.name, lambda: cls._run_task(task))
+            except Exception as e:
+                logger.error(f'Refresh task {task.name} failed: {str(e)}', exc_info=True)
+                result = ResponseHandler.error(str(e))
+
+            with cls._condition:
+                task.running = False
+                task.running_job_id = None
+                task.last_finished = datetime.utcnow()
+                task.last_result = result if isinstance(result, dict) else None
+                if task.interval:
+                    task.next_run = time.monotonic() + task.interval
+            logger.info(f'Finished refresh task {task.name}')
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Position tables priced by a single coin
+SINGLE_COIN_TABLES = ['Wallet', 'Staking', 'CollateralPosition', 'BorrowPosition']
+# Position tables priced by a token pair
+PAIR_TABLES = ['FarmingPool', 'LeveragedFarmingPool']
+
+SINGLE_COIN_UPDATE = '''
+    UPDATE {table} SET price = c.CurrentPrice
+    FROM CoinPrices c
+    WHERE c.Name = {table}.coin_id
+    AND c.CurrentPrice IS NOT NULL
+    AND {table}.price IS NOT c.CurrentPrice
+'''
+
+# A pair is repriced if either leg changed; a leg whose coin has no price keeps its old one
+PAIR_UPDATE = '''
+    UPDATE {table} SET price_a = n.price_a, price_b = n.price_b
+    FROM (
+        SELECT p.position_id,
+               COALESCE(a.CurrentPrice, p.price_a) AS price_a,
+               COALESCE(b.CurrentPrice, p.price_b) AS price_b
+        FROM {table} p
+        LEFT JOIN CoinPrices a ON a.Name = p.token_a_id
+        LEFT JOIN CoinPrices b ON b.Name = p.token_b_id
+    ) n
+    WHERE n.position_id = {table}.position_id
+    AND ({table}.price_a IS NOT n.price_a OR {table}.price_b IS NOT n.price_b)
+'''
+
+
+class RepricingService:
+    """
+    Copies current CoinPrices into the price columns of the position tables.
+
+    Each table is repriced with one set-based UPDATE joined to CoinPrices
+    that only touches rows whose price actually differs, so the STORED
+    generated value columns are recomputed (and the change log records)
+    just for positions whose coin moved. Runs after every price refresh.
+    """
+
+    @staticmethod
+    def reprice_positions(source: str = None) -> Dict[str, Any]:
+        """
+        Reprice every position table from CoinPrices in one transaction.
+
+        Args:
+            source: What triggered the repricing, e.g. the refresh task name
+
+        Returns:
+            ResponseHandler with data {table: rows repriced}
+        """
+        job = JobService.current()
+        job.stage('reprice_positions')
+        try:
+            tables = RepricingService._existing_tables()
+            repriced = {}
+            with DatabaseService.transaction():
+                for table in SINGLE_COIN_TABLES + PAIR_TABLES:
+                    if table not in tables:
+                        continue
+                    template = PAIR_UPDATE if table in PAIR_TABLES else SINGLE_COIN_UPDATE
+                    DatabaseService.execute_query(template.format(table=table), fetch=False)
+                    repriced[table] = DatabaseService.execute_query('SELECT changes()')[0][0]
+            total = sum(repriced.values())
+            job.add_report(repriced_positions=total)
+            logger.info(f'Repriced {total} positions after {source}: {repriced}')
+            return ResponseHandler.success(f'Repriced {total} positions', data=repriced)
+        except Exception as e:
+            logger.error(f'Error repricing positions: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to reprice positions: {str(e)}')
+
+    @staticmethod
+    def _existing_tables() -> List[str]:
+        return [row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )]
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config import Config
+from models.analytics import ReturnArrays
+from services.analytics_service import AnalyticsService
+from services.database import DatabaseService
+from services.price_history_service import PriceHistoryService, HOUR, DAY
+from utils.response import ResponseHandler, finite_or_none
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+YEAR = 365 * DAY
+
+
+class RiskService:
+    """
+    Risk analytics from the stored price history.
+
+    Hourly or daily closes from PriceHistoryRollup are loaded for the held
+    coins into one aligned (buckets x coins) matrix and turned into
+    ReturnArrays, so realized volatility, the correlation matrix and the
+    historical-simulation VaR are whole-array operations. Results are cached
+    per data version and rollup watermark; a new price refresh or rollup
+    recomputes them on the next request.
+    """
+
+    _cache: Optional[Tuple[tuple, Dict[str, Any]]] = None  # (cache key, result data)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_risk(cls, resolution: int = HOUR, days: int = 365,
+                 confidence: List[float] = None) -> Dict[str, Any]:
+        """
+        Volatility, correlation and VaR of the held coins.
+
+        Args:
+            resolution: 3600 for hourly or 86400 for daily returns
+            days: Days of history to use
+            confidence: VaR confidence levels in percent, defaults to Config.RISK_VAR_CONFIDENCE
+
+        Returns:
+            ResponseHandler with data {'resolution', 'days', 'coins', 'observations',
+            'volatility': {coin: annualized volatility}, 'correlation': [[...]] in coins order,
+            'exposures': {coin: value}, 'var': {confidence: {'var', 'expected_shortfall'}}}
+        """
+        confidence = sorted(confidence or Config.RISK_VAR_CONFIDENCE)
+        if resolution not in (HOUR, DAY):
+            return ResponseHandler.error(f'Unsupported resolution: {resolution}')
+        if days <= 0:
+            return ResponseHandler.error('days must be positive')
+        if not all(0 < level < 100 for level in confidence):
+            return ResponseHandler.error('Confidence levels must be between 0 and 100')
+        try:
+            key = (DatabaseService.get_pool(), DatabaseService.data_version(), cls._watermark(resolution),
+                   resolution, days, tuple(confidence))
+            with cls._lock:
+                cached = cls._cache
+            if cached and cached[0] == key:
+                return ResponseHandler.success('Risk analytics computed', data=cached[1])
+
+            arrays = AnalyticsService.get_arrays()
+            exposures = dict(zip(arrays.coins, arrays.group_sum(arrays.values(), 'coin').tolist()))
+            held = [coin for coin, value in exposures.items() if value != 0]
+            returns = cls.load_returns(held, resolution, time.time() - days * DAY)
+            data = cls.compute(returns, [exposures[coin] for coin in returns.coins], YEAR / resolution, confidence)
+            data.update({'resolution': resolution, 'days': days})
+
+            if not DatabaseService.has_uncommitted_writes():
+                with cls._lock:
+                    cls._cache = (key, data)
+            logger.info(f'Computed risk over {len(returns.coins)} coins and {len(returns.buckets)} returns')
+            return ResponseHandler.success('Risk analytics computed', data=data)
+        except Exception as e:
+            logger.error(f'Error computing risk analytics: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to compute risk analytics: {str(e)}')
+
+    @staticmethod
+    def load_returns(coins: List[str], resolution: int, since: float) -> ReturnArrays:
+        """
+        Load closes of the given coins into an aligned price matrix and take returns.
+
+        Args:
+            coins: CoinPrices names
+            resolution: Rollup resolution in seconds
+            since: Epoch seconds of the first bucket
+
+        Returns:
+            ReturnArrays over the coins that have history
+        """
+        names = {coin_id: name for coin_id, name in DatabaseService.execute_query(
+            'SELECT id, name FROM PriceHistoryCoin WHERE name IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(coins)),)
+        )}
+        rows = DatabaseService.execute_query('''
+            SELECT coin_id, bucket, close FROM PriceHistoryRollup
+            WHERE coin_id IN (SELECT value FROM json_each(?)) AND resolution = ? AND bucket >= ?
+        ''', (json.dumps(list(names)), resolution, int(since - since % resolution))) if names else []
+        if not rows:
+            return ReturnArrays(coins=[], buckets=np.array([], dtype=np.int64), returns=np.zeros((0, 0)))
+
+        columns = np.array(rows, dtype=float)
+        coin_ids, coin_idx = np.unique(columns[:, 0].astype(np.int64), return_inverse=True)
+        grid, bucket_idx = np.unique(columns[:, 1].astype(np.int64), return_inverse=True)
+        prices = np.full((len(grid), len(coin_ids)), np.nan)
+        prices[bucket_idx, coin_idx] = columns[:, 2]
+        labels = [names[coin_id] for coin_id in coin_ids.tolist()]
+        return ReturnArrays.from_prices(labels, grid, prices)
+
+    @classmethod
+    def compute(cls, returns: ReturnArrays, exposures: List[float], periods_per_year: float,
+                confidence: List[float]) -> Dict[str, Any]:
+        """
+        Volatility, correlation and historical VaR from aligned returns.
+
+        VaR at c% is the loss the current exposures would have exceeded in only
+        (100 - c)% of the historical periods; expected shortfall is the average
+        loss beyond it. Both are for one period of the return resolution.
+
+        Args:
+            returns: Aligned returns
+            exposures: Current net value per coin in returns.coins order
+            periods_per_year: Returns per year, for annualizing volatility
+            confidence: Confidence levels in percent
+
+        Returns:
+            Dict of the analytics, JSON ready
+        """
+        volatility = returns.volatility(periods_per_year)
+        correlation = returns.correlation(min_periods=Config.RISK_MIN_OBSERVATIONS)
+        pnl = returns.pnl(exposures)
+        var = {}
+        for level in confidence:
+            if len(pnl) < Config.RISK_MIN_OBSERVATIONS:
+                var[f'{level:g}'] = {'var': None, 'expected_shortfall': None}
+                continue
+            cutoff = np.percentile(pnl, 100 - level)
+            var[f'{level:g}'] = {
+                'var': float(max(-cutoff, 0.0)),
+                'expected_shortfall': float(max(-pnl[pnl <= cutoff].mean(), 0.0))
+            }
+        return {
+            'coins': returns.coins,
+            'observations': dict(zip(returns.coins, returns.observations.tolist())),
+            'volatility': {coin: finite_or_none(value) for coin, value in zip(returns.coins, volatility)},
+            'correlation': [[finite_or_none(value) for value in row] for row in correlation],
+            'exposures': dict(zip(returns.coins, [float(value) for value in exposures])),
+            'var': var
+        }
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached result"""
+        with cls._lock:
+            cls._cache = None
+
+    @staticmethod
+    def _watermark(resolution: int) -> int:
+        rows = DatabaseService.execute_query(
+            'SELECT bucket FROM PriceHistoryWatermark WHERE resolution = ?', (resolution,)
+        )
+        return rows[0][0] if rows else 0
@@ -0,0 +1,157 @@
+from typing import Any, Dict, List, Set, Tuple
+import numpy as np
+from models.analytics import PortfolioArrays
+from services.analytics_service import AnalyticsService
+from utils.response import ResponseHandler, finite_or_none
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Shock key applied to every coin a scenario doesn't name
+OTHER_COINS = '*'
+
+
+class ScenarioService:
+    """
+    What-if valuation of the portfolio under price shocks.
+
+    A scenario is a set of percent price moves per coin, e.g.
+    {'name': 'ETH -30%', 'shocks': {'Ethereum': -30}}; coins it doesn't
+    name keep their price unless it has an OTHER_COINS ('*') shock. All
+    scenarios are evaluated at once over the PortfolioArrays: one
+    (scenarios x coins) multiplier matrix is gathered onto the legs, and
+    position values, lending health ratios (collateral factors from
+    ProtocolCollateralConfig) and leveraged net values are grouped sums of
+    the resulting (scenarios x legs) matrix.
+    """
+
+    @staticmethod
+    def shock_matrix(arrays: PortfolioArrays, scenarios: List[Dict[str, Any]]) -> Tuple[np.ndarray, Set[str]]:
+        """
+        Price multipliers per scenario and coin.
+
+        Args:
+            arrays: Portfolio arrays the coins are taken from
+            scenarios: Scenarios with 'shocks' {coin: percent move}
+
+        Returns:
+            (multipliers of shape (scenarios, coins), coins shocked that aren't held)
+        """
+        coin_index = {coin: i for i, coin in enumerate(arrays.coins)}
+        multipliers = np.ones((len(scenarios), len(arrays.coins)))
+        rows, columns, moves = [], [], []
+        unknown = set()
+        for row, scenario in enumerate(scenarios):
+            shocks = scenario.get('shocks', {})
+            if OTHER_COINS in shocks:
+                multipliers[row, :] = 1 + float(shocks[OTHER_COINS]) / 100
+            for coin, move in shocks.items():
+                if coin == OTHER_COINS:
+                    continue
+                if coin not in coin_index:
+                    unknown.add(coin)
+                    continue
+                rows.append(row)
+                columns.append(coin_index[coin])
+                moves.append(float(move))
+        multipliers[rows, columns] = 1 + np.array(moves) / 100
+        # A price can fall to zero but not below
+        return np.maximum(multipliers, 0.0), unknown
+
+    @classmethod
+    def run_scenarios(cls, scenarios: List[Dict[str, Any]], detail: bool = True) -> Dict[str, Any]:
+        """
+        Value the portfolio under each scenario.
+
+        Args:
+            scenarios: [{'name': str, 'shocks': {coin: percent move}}]
+            detail: Include per-position PnL, per-pool health ratios and per-farm
+                    net values; without it only the scenario totals are returned,
+                    which is what large grids of scenarios want
+
+        Returns:
+            ResponseHandler with data {'base_total', 'unknown_coins', 'scenarios': [...]}
+        """
+        error = cls._validate(scenarios)
+        if error:
+            return ResponseHandler.error(error)
+        try:
+            arrays = AnalyticsService.get_arrays()
+            multipliers, unknown = cls.shock_matrix(arrays, scenarios)
+
+            base_values = arrays.values()
+            values = base_values * multipliers[:, arrays.coin_idx]
+
+            base_positions = arrays.group_sum(base_values, 'position')
+            positions = arrays.group_sum(values, 'position')
+            base_total = float(base_positions.sum())
+            totals = positions.sum(axis=1)
+
+            pools = arrays.lending_pools
+            base_health = arrays.health_ratios(base_values)[pools]
+            health = arrays.health_ratios(values)[:, pools]
+            # Pools without borrows have no health ratio (NaN) and never count as liquidatable
+            with np.errstate(invalid='ignore'):
+                liquidatable = (health < 1).sum(axis=1)
+            min_health = np.where(np.isnan(health), np.inf, health).min(axis=1, initial=np.inf)
+
+            farms = cls._positions_of_type(arrays, 'leveraged')
+            farm_values = positions[:, farms]
+
+            results = []
+            for row, scenario in enumerate(scenarios):
+                result = {
+                    'name': scenario.get('name', f'scenario_{row}'),
+                    'total': float(totals[row]),
+                    'pnl': float(totals[row] - base_total),
+                    'pnl_percent': float((totals[row] - base_total) / base_total * 100) if base_total > 0 else 0.0,
+                    'leveraged_net_value': float(farm_values[row].sum()),
+                    'min_health_ratio': finite_or_none(min_health[row]),
+                    'liquidatable_pools': int(liquidatable[row])
+                }
+                if detail:
+                    result['positions'] = {
+                        arrays.positions[i]: {'value': float(positions[row, i]), 'pnl': float(positions[row, i] - base_positions[i])}
+                        for i in range(len(arrays.positions))
+                    }
+                    result['lending'] = {
+                        arrays.positions[pool]: {
+                            'health_ratio': finite_or_none(health[row, j]),
+                            'base_health_ratio': finite_or_none(base_health[j]),
+                            'change': finite_or_none(health[row, j] - base_health[j])
+                        }
+                        for j, pool in enumerate(pools)
+                    }
+                    result['leveraged'] = {
+                        arrays.positions[farm]: float(farm_values[row, j]) for j, farm in enumerate(farms)
+                    }
+                results.append(result)
+
+            logger.info(f'Ran {len(scenarios)} scenarios over {arrays.size} position legs')
+            return ResponseHandler.success(
+                f'Ran {len(scenarios)} scenarios',
+                data={'base_total': base_total, 'unknown_coins': sorted(unknown), 'scenarios': results}
+            )
+        except Exception as e:
+            logger.error(f'Error running scenarios: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to run scenarios: {str(e)}')
+
+    @staticmethod
+    def _validate(scenarios) -> str:
+        """Error message for a malformed scenario list, or an empty string"""
+        if not isinstance(scenarios, list) or not scenarios:
+            return 'scenarios must be a non-empty list'
+        for scenario in scenarios:
+            shocks = scenario.get('shocks') if isinstance(scenario, dict) else None
+            if not isinstance(shocks, dict):
+                return 'Every scenario needs a shocks mapping of coin to percent move'
+            if not all(isinstance(move, (int, float)) and not isinstance(move, bool) for move in shocks.values()):
+                return 'Shocks must be numbers (percent moves)'
+        return ''
+
+    @staticmethod
+    def _positions_of_type(arrays: PortfolioArrays, position_type: str) -> np.ndarray:
+        """Indices into positions of the positions of one type"""
+        if position_type not in arrays.types:
+            return np.array([], dtype=np.intp)
+        return np.unique(arrays.position_idx[arrays.type_idx == arrays.types.index(position_type)])
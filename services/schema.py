@@ -0,0 +1,278 @@
+"""
+Tables the app creates and migrates itself.
+
+DatabaseService.initialize() applies the schema on every start, before the
+read replica is copied, so services and read-only routes can assume their
+tables exist and never run DDL.
+"""
+from sqlite3 import Connection
+from typing import List
+
+# Stored per farming position in FarmingAnalytics, after position_id, position_type, token_a_id and token_b_id
+FARMING_METRIC_COLUMNS = [
+    'lp_value', 'debt_value', 'net_value', 'hodl_value', 'no_fee_value', 'il_value', 'il_percent',
+    'fee_value', 'fee_percent', 'pnl_vs_hodl', 'days_held', 'apr'
+]
+
+_farming_metrics = ',\n        '.join(f'{column} REAL' for column in FARMING_METRIC_COLUMNS)
+
+SCHEMA = f'''
+-- Jobs (JobService); at most one queued and one running job per name
+CREATE TABLE IF NOT EXISTS Job (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL CHECK(status IN ('queued', 'running', 'succeeded', 'failed')),
+    stage TEXT,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    stages TEXT,
+    report TEXT,
+    error TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_queued ON Job(name) WHERE status = 'queued';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_running ON Job(name) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_job_created ON Job(created_at);
+
+-- Price history (PriceHistoryService)
+CREATE TABLE IF NOT EXISTS PriceHistoryCoin (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS PriceHistory (
+    coin_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (coin_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS PriceHistoryRollup (
+    coin_id INTEGER NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (coin_id, resolution, bucket)
+) WITHOUT ROWID;
+-- Start of the last (possibly partial) bucket rolled up per resolution
+CREATE TABLE IF NOT EXISTS PriceHistoryWatermark (
+    resolution INTEGER PRIMARY KEY,
+    bucket INTEGER NOT NULL
+);
+
+-- On-chain decimals per coin, the scale of its fixed-point amounts (WalletService)
+CREATE TABLE IF NOT EXISTS CoinDecimals (
+    coin_id TEXT PRIMARY KEY,
+    decimals INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Price quotes per source and their consensus (PriceAggregationService)
+CREATE TABLE IF NOT EXISTS PriceQuote (
+    coin_id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    price REAL NOT NULL,
+    quoted_at REAL NOT NULL,
+    outlier INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (coin_id, source)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS PriceConsensus (
+    coin_id TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    quotes INTEGER NOT NULL,
+    outliers INTEGER NOT NULL,
+    spread_percent REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Exchange rates (FxService)
+CREATE TABLE IF NOT EXISTS FxRate (
+    currency TEXT PRIMARY KEY,
+    per_usd REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Exposure per coin and position (ExposureService)
+CREATE TABLE IF NOT EXISTS CoinExposure (
+    Token TEXT PRIMARY KEY,
+    TotalValue REAL,
+    WalletValue REAL,
+    StakedValue REAL,
+    LPValue REAL,
+    LendingBorrowingValue REAL,
+    LeverageFarmValue REAL,
+    FOREIGN KEY (Token) REFERENCES CoinPrices(Name)
+);
+CREATE TABLE IF NOT EXISTS CoinGroup (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    is_aggregate BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS PositionExposure (
+    id TEXT PRIMARY KEY,
+    position_id TEXT NOT NULL,
+    coin_id TEXT NOT NULL,
+    position_value REAL NOT NULL,
+    position_percent REAL NOT NULL,
+    type_percent REAL NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (position_id) REFERENCES Position(id),
+    FOREIGN KEY (coin_id) REFERENCES CoinGroup(id)
+);
+CREATE INDEX IF NOT EXISTS idx_position_exposure_coin ON PositionExposure(coin_id);
+CREATE INDEX IF NOT EXISTS idx_position_exposure_position ON PositionExposure(position_id);
+CREATE INDEX IF NOT EXISTS idx_coin_exposure_total ON CoinExposure(TotalValue);
+CREATE TABLE IF NOT EXISTS ExposureWatermark (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+-- Lending pool liquidation prices (LendingHealthService)
+CREATE TABLE IF NOT EXISTS LiquidationPrice (
+    lending_pool_id TEXT NOT NULL,
+    coin_id TEXT NOT NULL,
+    liquidation_price REAL,
+    current_price REAL NOT NULL,
+    distance_percent REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (lending_pool_id, coin_id)
+) WITHOUT ROWID;
+
+-- LP metrics (FarmingAnalyticsService)
+CREATE TABLE IF NOT EXISTS FarmingAnalytics (
+    position_id TEXT PRIMARY KEY,
+    position_type TEXT NOT NULL,
+    token_a_id TEXT NOT NULL,
+    token_b_id TEXT NOT NULL,
+    {_farming_metrics},
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Portfolio value over time (PortfolioSnapshotService)
+CREATE TABLE IF NOT EXISTS PortfolioSnapshot (
+    ts INTEGER PRIMARY KEY,
+    total REAL NOT NULL,
+    wallet REAL NOT NULL DEFAULT 0,
+    staking REAL NOT NULL DEFAULT 0,
+    farming REAL NOT NULL DEFAULT 0,
+    leveraged REAL NOT NULL DEFAULT 0,
+    lending REAL NOT NULL DEFAULT 0,
+    source TEXT
+);
+
+-- Price and value alerts (AlertService)
+CREATE TABLE IF NOT EXISTS AlertRule (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    reference_price REAL,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    note TEXT,
+    created_at REAL NOT NULL,
+    last_fired_at REAL
+);
+CREATE TABLE IF NOT EXISTS AlertLevel (
+    subject TEXT NOT NULL,
+    direction TEXT NOT NULL CHECK (direction IN ('up', 'down')),
+    level REAL NOT NULL,
+    rule_id INTEGER NOT NULL,
+    PRIMARY KEY (subject, direction, level, rule_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_alert_level_rule ON AlertLevel(rule_id);
+CREATE TABLE IF NOT EXISTS AlertState (
+    subject TEXT PRIMARY KEY,
+    value REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS AlertEvent (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id INTEGER,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    level REAL NOT NULL,
+    previous_value REAL NOT NULL,
+    value REAL NOT NULL,
+    message TEXT NOT NULL,
+    fired_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_alert_event_pending ON AlertEvent(id) WHERE status = 'pending';
+
+-- Transactions, cost lots and realized trades (LedgerService)
+CREATE TABLE IF NOT EXISTS LedgerTransaction (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    external_id TEXT UNIQUE,
+    ts REAL NOT NULL,
+    coin_id TEXT NOT NULL,
+    side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+    amount REAL NOT NULL CHECK (amount > 0),
+    price REAL NOT NULL,
+    fee REAL NOT NULL DEFAULT 0,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_coin_ts ON LedgerTransaction(coin_id, ts, id);
+CREATE TABLE IF NOT EXISTS CostLot (
+    method TEXT NOT NULL,
+    coin_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    tx_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    cost_per_unit REAL NOT NULL,
+    PRIMARY KEY (method, coin_id, ts, tx_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS CostBasisState (
+    method TEXT NOT NULL,
+    coin_id TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    cost REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    last_tx_id INTEGER NOT NULL,
+    PRIMARY KEY (method, coin_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS RealizedTrade (
+    method TEXT NOT NULL,
+    tx_id INTEGER NOT NULL,
+    coin_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    amount REAL NOT NULL,
+    proceeds REAL NOT NULL,
+    cost_basis REAL NOT NULL,
+    pnl REAL NOT NULL,
+    PRIMARY KEY (method, tx_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS LedgerWatermark (
+    method TEXT PRIMARY KEY,
+    last_tx_id INTEGER NOT NULL
+);
+'''
+
+
+def _columns(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _migrate_coin_prices(conn: Connection) -> None:
+    """Add LastUpdated (epoch seconds of the last price write) to CoinPrices from before it existed"""
+    columns = _columns(conn, 'CoinPrices')
+    if not columns:
+        return
+    if 'LastUpdated' not in columns:
+        conn.execute('ALTER TABLE CoinPrices ADD COLUMN LastUpdated REAL')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_coinprices_last_updated ON CoinPrices(LastUpdated)')
+
+
+def apply_schema(conn: Connection) -> None:
+    """Create the app's tables and indexes if they don't exist and migrate older tables"""
+    conn.executescript(SCHEMA)
+    _migrate_coin_prices(conn)
+    conn.commit()
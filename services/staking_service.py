@@ -1,5 +1,6 @@
 from services.database import DatabaseService
 from services.coin_price_service import CoinPriceService
+from services.valuation_service import ValuationService
 from services.position_metadata_service import PositionMetadataService
 from utils.logging_config import setup_logger, log_function_call
 from utils.response import ResponseHandler
@@ -19,10 +20,6 @@ class StakedPosition:
     project: str
     chain: str
     
-    def calculate_percent_of_total(self, total_value):
-        """Calculate what percentage of the total portfolio this position represents"""
-        return (self.value / total_value * 100) if total_value > 0 else 0
-    
 
 class StakingService:
     @staticmethod
@@ -82,11 +79,11 @@ class StakingService:
         Add a new staked position and create associated metadata.
 
         Args:
-            pool: Unique identifier for the staking position
+            pool: Unique name of the staking pool; the position id is staking_<pool>
             token: name of token (must exist in CoinPrices)
-            price: price of token
             holdings: number of tokens
-            project: project where tokens are staked
+            deposited_amount: number of tokens originally deposited
+            project: project where tokens are staked (Protocol name)
             chain: chain project is on
 
         Returns:
@@ -96,34 +93,38 @@ class StakingService:
         try:
             # Verify token exists and get current price
             coin_result = CoinPriceService.find_coin_by_name(token)
-            if not coin_result['succes']:
+            if not coin_result['success']:
                 return ResponseHandler.error(f'Token {token} not found in database')
             
             name = coin_result['data'][0]
             coin_info_result = CoinPriceService.find_token(name)
-            if not coin_info_result:
+            if not coin_info_result['success']:
                 return ResponseHandler.error(f'Price not found for token {token}')
-            coin_info = coin_info_result['data']
-            coin_name = coin_info[1]
-            price = coin_info[2]
-
-            query = '''
-                INSERT INTO Staking (Pool, Token, Price, Holdings, DepositedAmount, Project, Chain)
-                VALUES (?, ?, ?, ?, ?, ?)
-            '''
-            DatabaseService.execute_query(query, (pool, coin_name, price, holdings, deposited_amount, project, chain))
-
-            metadata_result = PositionMetadataService.create_or_update_metadata(
-                position_type='Staking',
-                position_id=pool,
-                protocol=project,
-                chain=chain
-            )
+            price = coin_info_result['data'][2]
+            position_id = f'staking_{pool}'
+
+            # Position, staking row and metadata are written together or not at all
+            with DatabaseService.transaction():
+                DatabaseService.execute_query('''
+                    INSERT INTO Position (id, protocol_id, position_type, total_value)
+                    VALUES (?, ?, 'staking', ?)
+                ''', (position_id, project, holdings * price))
+                DatabaseService.execute_query('''
+                    INSERT INTO Staking (position_id, coin_id, amount, price, deposited_amount)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (position_id, name, holdings, price, deposited_amount))
+
+                metadata_result = PositionMetadataService.create_or_update_metadata(
+                    position_type='Staking',
+                    position_id=position_id,
+                    protocol=project,
+                    chain=chain
+                )
 
-            if not metadata_result['success']:
-                raise Exception(f'Failed to create position metadata: {metadata_result['error']}')
+                if not metadata_result['success']:
+                    raise Exception(f'Failed to create position metadata: {metadata_result["error"]}')
 
-            logger.info(f'Added staked position for {pool} with metadata')
+            logger.info(f'Added staked position {position_id} with metadata')
             return ResponseHandler.success('Staked position added successfully')
         except Exception as e:
             logger.error(f'Error adding staked position for {token}: {str(e)}')
@@ -196,7 +197,5 @@ class StakingService:
     @log_function_call(logger)
     def calculate_total_staking_value():
         """Calculate total value of all stked positions."""
-        query = 'SELECT COALESCE(SUM(Value), 0) FROM Staking'
-        result = DatabaseService.execute_query(query)
-        return result[0][0] if result else 0
+        return ValuationService.get_valuation().by_type['staking']
 
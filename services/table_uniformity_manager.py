@@ -3,23 +3,33 @@ from services.database import DatabaseService
 class TableUniformityManager:
     @staticmethod
     def update_coin_display_name(old_display_name, new_display_name):
+        '''
+        Renames a coin's display name in every position column that stores it, in one transaction.
+
+        Positions reference coins by CoinPrices.Name, but some were imported
+        with the display name instead; only those are renamed. A value that is
+        also some coin's Name is that coin's key and is left alone. Any
+        database error rolls back every table.
+        '''
         tables_to_update = [
-            ('Wallet', 'Token'),
-            ('Staking', 'Token'),
-            ('Farming', 'TokenA'),
-            ('Farming', 'TokenB'),
-            ('LeveragedFarming', 'TokenA'),
-            ('LeveragedFarming', 'TokenB'),
-            ('LendingBorrowing', 'Asset')
+            ('Wallet', 'coin_id'),
+            ('Staking', 'coin_id'),
+            ('FarmingPool', 'token_a_id'),
+            ('FarmingPool', 'token_b_id'),
+            ('LeveragedFarmingPool', 'token_a_id'),
+            ('LeveragedFarmingPool', 'token_b_id'),
+            ('CollateralPosition', 'coin_id'),
+            ('BorrowPosition', 'coin_id')
         ]
     
-        for table, column in tables_to_update:
-            query = f'''
-                UPDATE {table}
-                SET {column} = ?
-                WHERE {column} = ?
-            '''
-            DatabaseService.execute_query(query, (new_display_name, old_display_name))
+        with DatabaseService.transaction():
+            for table, column in tables_to_update:
+                query = f'''
+                    UPDATE {table}
+                    SET {column} = ?
+                    WHERE {column} = ? AND {column} NOT IN (SELECT Name FROM CoinPrices)
+                '''
+                DatabaseService.execute_query(query, (new_display_name, old_display_name), fetch=False)
     
     @staticmethod
     def update_coin_names_in_all_tables(updates):
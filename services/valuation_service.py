@@ -0,0 +1,126 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+from models.valuation import PortfolioValuation, PositionValue
+from services.database import DatabaseService
+from services.fx_service import FxService, BASE_CURRENCY
+from services.position_legs import legs_in
+from utils.response import ResponseHandler
+from utils.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# Keys of PortfolioValuation.to_dict() that hold USD values
+VALUATION_FIELDS = ['total', 'gross_total', 'debt_total', 'by_type', 'by_chain', 'by_protocol']
+
+
+class ValuationService:
+    """
+    One valuation of every position, computed in a single query and pass.
+
+    Positions are valued from the stored values of their legs (see
+    POSITION_LEGS) net of debt: leveraged farms at holdings minus debt,
+    lending pools at collateral minus borrows (falling back to LendingPool's
+    stored totals for pools without collateral or borrow positions). Totals per type, chain and protocol are accumulated in the same
+    pass. The result is cached per DatabaseService.data_version(), so every
+    page rendered between two writes shares one computation. A valuation
+    that sees uncommitted writes is not cached.
+    """
+
+    _cache: Optional[Tuple[object, int, PortfolioValuation]] = None  # (pool, data version, valuation)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_valuation(cls, use_cache: bool = True) -> PortfolioValuation:
+        """
+        Value the whole portfolio.
+
+        Args:
+            use_cache: Reuse the valuation computed at the current data version
+
+        Returns:
+            PortfolioValuation
+        """
+        pool = DatabaseService.get_pool()
+        version = DatabaseService.data_version()
+        cacheable = not DatabaseService.has_uncommitted_writes()
+        if use_cache and cacheable:
+            with cls._lock:
+                cached = cls._cache
+            if cached and cached[0] is pool and cached[1] == version:
+                return cached[2]
+
+        valuation = PortfolioValuation(data_version=version)
+        for position_id, position_type, protocol, chain, gross, debt in DatabaseService.execute_query(cls._valuation_query()):
+            valuation.add(PositionValue(
+                position_id=position_id,
+                position_type=position_type,
+                protocol=protocol,
+                chain=chain,
+                gross_value=gross or 0.0,
+                debt_value=debt or 0.0
+            ))
+        logger.debug(f'Valued {len(valuation.positions)} positions at data version {version}: {valuation.total:.2f}')
+
+        if cacheable:
+            with cls._lock:
+                cls._cache = (pool, version, valuation)
+        return valuation
+
+    @classmethod
+    def get_summary(cls, include_positions: bool = False, currency: str = BASE_CURRENCY) -> Dict[str, Any]:
+        """
+        Get the valuation as a ResponseHandler dict
+
+        Args:
+            include_positions: Include every position's value
+            currency: Currency to report values in, one of Config.FX_CURRENCIES
+        """
+        try:
+            data = cls.get_valuation().to_dict(include_positions)
+            data = FxService.convert_fields(data, currency, VALUATION_FIELDS, ['gross_value', 'debt_value', 'value'])
+            return ResponseHandler.success('Portfolio valued', data=data)
+        except Exception as e:
+            logger.error(f'Error valuing portfolio: {str(e)}', exc_info=True)
+            return ResponseHandler.error(f'Failed to value portfolio: {str(e)}')
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the cached valuation"""
+        with cls._lock:
+            cls._cache = None
+
+    @staticmethod
+    def _valuation_query() -> str:
+        """Every position's legs summed, joined to its protocol and chain"""
+        existing = {row[0] for row in DatabaseService.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )}
+        legs = [
+            f"SELECT {leg.position_column}, '{leg.position_type}', {leg.value}, {leg.debt_value} FROM {leg.table}"
+            for leg in legs_in(existing)
+        ] or ["SELECT NULL, NULL, 0, 0 WHERE 0"]
+        pools = ''
+        if 'LendingPool' in existing:
+            pools = """
+                UNION ALL SELECT position_id, 'lending', COALESCE(total_collateral_value, 0), COALESCE(total_borrow_value, 0)
+                FROM LendingPool WHERE position_id NOT IN (SELECT position_id FROM legs WHERE position_type = 'lending')"""
+        joins = ''
+        protocol, chain = "'unknown'", "'unknown'"
+        if 'Position' in existing:
+            joins += ' LEFT JOIN Position p ON p.id = v.position_id'
+            protocol = "COALESCE(p.protocol_id, 'unknown')"
+            if 'Protocol' in existing:
+                joins += ' LEFT JOIN Protocol pr ON pr.name = p.protocol_id'
+                chain = "COALESCE(pr.chain_id, 'unknown')"
+        union = '\n            UNION ALL '.join(legs)
+        return f'''
+            WITH legs(position_id, position_type, gross_value, debt_value) AS (
+                {union}
+            ),
+            valued(position_id, position_type, gross_value, debt_value) AS (
+                SELECT position_id, position_type, SUM(gross_value), SUM(debt_value)
+                FROM legs GROUP BY position_id, position_type{pools}
+            )
+            SELECT v.position_id, v.position_type, {protocol}, {chain}, v.gross_value, v.debt_value
+            FROM valued v{joins}
+        '''
@@ -1,8 +1,12 @@
 from services.database import DatabaseService
 from services.moralis_service import MoralisService
+from services.job_service import JobService
+from services.valuation_service import ValuationService
+from services.price_aggregation_service import PriceAggregationService
 from utils.response import ResponseHandler
 from utils.logging_config import setup_logger, log_function_call
 from models.wallet import WalletItem
+from models.amount import FixedAmount
 from config import Config
 import json, uuid
 from collections import defaultdict
@@ -28,7 +32,6 @@ class TokenDiscovery:
 
 
 class WalletService:
-
     
     @staticmethod
     @log_function_call(logger)
@@ -41,6 +44,7 @@ class WalletService:
         wallet_address = Config.WALLET_ADDRESS
         aggregated_data = defaultdict(lambda: {
             'balance': 0,
+            'decimals': 0,
             'price': 0,
             'symbol': '',
             'alternate_names': set(),
@@ -53,7 +57,10 @@ class WalletService:
         new_tokens: List[TokenDiscovery] = []
         zero_price_tokens: List[TokenError] = []
 
+        job = JobService.current()
+        job.stage('fetch_wallet_balances', total=len(Config.CHAINS_TO_QUERY))
         for chain in Config.CHAINS_TO_QUERY:
+            job.advance()
             logger.info(f'Fetching wallet data for chain: {chain}')
             response = MoralisService.get_wallet_balances_and_prices(wallet_address, chain)
 
@@ -78,8 +85,8 @@ class WalletService:
 
                 
                 try:
-                    balance = float(token.get('balance_formatted',0))
-                    price = float(token.get('usd_price', 0))
+                    balance = WalletService._parse_balance(token)
+                    price = float(token.get('usd_price') or 0)
                     symbol = token.get('symbol', '')
 
                     # Resolve token identity
@@ -91,10 +98,11 @@ class WalletService:
                         alt_names_set = set(json.loads(alt_names)) if alt_names else set()
                         alt_names_set.add(moralis_name)
 
-                        # Update token info
+                        # Update token info; the price is consolidated from every source's quote below
                         aggregated_data[name].update({
                             'balance': aggregated_data[name]['balance'] + balance,
-                            'price': max(aggregated_data[name]['price'], price),
+                            'decimals': max(aggregated_data[name]['decimals'], balance.decimals),
+                            'price': aggregated_data[name]['price'] or price,
                             'display_name': display_name,
                             'api_id': api_id or token_address,
                             'alternate_names': alt_names_set,
@@ -102,6 +110,7 @@ class WalletService:
                         })
                     else:
                         # New token discovery
+                        name = moralis_name
                         new_tokens.append(TokenDiscovery(
                             chain=chain,
                             name=moralis_name,
@@ -112,6 +121,7 @@ class WalletService:
 
                         aggregated_data[moralis_name].update({
                             'balance': balance,
+                            'decimals': balance.decimals,
                             'price': price,
                             'display_name': moralis_name,
                             'api_id': token_address,
@@ -119,6 +129,10 @@ class WalletService:
                             'symbol': symbol
                         })
 
+                    # Each chain's Moralis price is a separate quote; consolidate() splits
+                    # the Moralis weight between them
+                    PriceAggregationService.record_quote(name, f'moralis:{chain}', price)
+
                     if price == 0:
                         zero_price_tokens.append(TokenError(
                             chain=chain,
@@ -126,8 +140,7 @@ class WalletService:
                             error_type='no_price',
                             details=f'Token price is 0 (symbol: {token.get("symbol", "N/A")})'
                         ))
-                    
-                   
+
                 except Exception as e:
                     failed_tokens['parse_error'].append(TokenError(
                         chain=chain,
@@ -135,97 +148,120 @@ class WalletService:
                         error_type='parse_error',
                         details=f'Failed to parse balance or price: {str(e)}'
                     ))
-                
-                
-                # Update CoinPrices
-                logger.info(f'Updating prices for processed tokens')
-                for name, data in aggregated_data.items():
-                    try:
-                        result = WalletService.update_token(
-                            token_name=name,
-                            holdings=data['balance'],
-                            price=data['price']
-                        )
-
-                        if not result['success']:
-                            failed_tokens['update_error'].append(TokenError(
-                                chain='N/A',
-                                name=name,
-                                error_type='update_error',
-                                details=result['error']
-                            ))
-                        else:
-                            logger.info(f'Successfully updated token {name} with balance {data["balance"]} at price ${data["price"]}')
-                    except Exception as e:
-                        failed_tokens['update_error'].append(TokenError(
-                            chain='N/A',
-                            name=name,
-                            error_type='update_error',
-                            details=str(e)
-                        ))
 
-                
-                # Log summary of token processing
-                logger.info('\n=== Token Processing Summary ===')
-
-                # Log new token discoveries
-                if new_tokens:
-                    logger.info('\nNEW TOKENS DISCOVERED:')
-                    for token in new_tokens:
-                        if token.price > 0: # Only log tokens with prices as successful discoveries
-                                message = f'''
-                                    Chain: {token.chain}
-                                    Token: {token.name} ({token.symbol})
-                                    Price: ${token.price}
-                                    API ID: {token.api_id}
-                                '''
-                                logger.info(message)
-
-                # Log zero price tokens
-                if zero_price_tokens:
-                    logger.info('\nTOKENS WITH NO PRICE:')
-                    for token in zero_price_tokens:
-                        message= f'''
-                            Chain: {token.chain}
-                            Token: {token.name}
-                            {token.details}
-                        '''
-                        logger.warning(message)
-                # Log actual errors
-                if failed_tokens:
-                    logger.error('\nFAILED TOKENS:')
-                    for error_type, tokens in failed_tokens.items():
-                        error_message = f'\n {error_type.upper()} ({len(tokens)} tokens):'
-                        for token in tokens:
-                            error_message += f'''
-                                Chain: {token.chain}
-                                Token: {token.name}
-                                Details: {token.details}
-                            '''
-                        logger.error(error_message)
-                logger.info('\n=== End Token Processing Summary ===')
-
-                logger.info('Updated wallet holdings and prices across all chains')
-                return ResponseHandler.success('wallet and prices updated successfully')
-                        
-                    
-                
-                
-            
-        # Update database with aggregated data                
-        logger.info(f'Updating databse with aggregated data for {len(aggregated_data)} tokens')
-        for name, data in aggregated_data.items():
+        # Consolidate the quotes of every chain with the other sources' instead of taking the highest
+        job.stage('consolidate_prices')
+        consolidated = PriceAggregationService.consolidate(list(aggregated_data))
+        prices = consolidated['data']['prices'] if consolidated['success'] else {}
+
+        # Update CoinPrices
+        logger.info(f'Updating prices for processed tokens')
+        job.stage('update_tokens', total=len(aggregated_data))
+        for name, token_data in aggregated_data.items():
+            job.advance()
+            price = prices.get(name, token_data['price'])
             try:
-                WalletService.update_token(data['display_name'], data['balance'], data['price'])
-            except Exception as e:
-                failed_tokens['update_error'].append(
-                    TokenError(chain='N/A',
-                               name=name,
-                               error_type='update_error',
-                               details=f'Failed to update token: {str(e)}')
+                result = WalletService.update_token(
+                    token_name=name,
+                    holdings=float(token_data['balance']),
+                    price=price,
+                    update_coin_price=False
                 )
-        
+
+                if not result['success']:
+                    failed_tokens['update_error'].append(TokenError(
+                        chain='N/A',
+                        name=name,
+                        error_type='update_error',
+                        details=result['error']
+                    ))
+                else:
+                    logger.info(f'Successfully updated token {name} with balance {token_data["balance"]} at price ${price}')
+            except Exception as e:
+                failed_tokens['update_error'].append(TokenError(
+                    chain='N/A',
+                    name=name,
+                    error_type='update_error',
+                    details=str(e)
+                ))
+
+        # Log summary of token processing
+        logger.info('\n=== Token Processing Summary ===')
+
+        # Log new token discoveries
+        if new_tokens:
+            logger.info('\nNEW TOKENS DISCOVERED:')
+            for token in new_tokens:
+                if token.price > 0: # Only log tokens with prices as successful discoveries
+                        message = f'''
+                            Chain: {token.chain}
+                            Token: {token.name} ({token.symbol})
+                            Price: ${token.price}
+                            API ID: {token.api_id}
+                        '''
+                        logger.info(message)
+
+        # Log zero price tokens
+        if zero_price_tokens:
+            logger.info('\nTOKENS WITH NO PRICE:')
+            for token in zero_price_tokens:
+                message= f'''
+                    Chain: {token.chain}
+                    Token: {token.name}
+                    {token.details}
+                '''
+                logger.warning(message)
+        # Log actual errors
+        if failed_tokens:
+            logger.error('\nFAILED TOKENS:')
+            for error_type, tokens in failed_tokens.items():
+                error_message = f'\n {error_type.upper()} ({len(tokens)} tokens):'
+                for token in tokens:
+                    error_message += f'''
+                        Chain: {token.chain}
+                        Token: {token.name}
+                        Details: {token.details}
+                    '''
+                logger.error(error_message)
+        logger.info('\n=== End Token Processing Summary ===')
+
+        WalletService.record_decimals({name: token_data['decimals'] for name, token_data in aggregated_data.items()})
+        logger.info('Updated wallet holdings and prices across all chains')
+        job.add_report(tokens=len(aggregated_data), new_tokens=len(new_tokens),
+                       zero_price_tokens=len(zero_price_tokens),
+                       failed_tokens=sum(len(tokens) for tokens in failed_tokens.values()))
+        return ResponseHandler.success('wallet and prices updated successfully')
         
+    @staticmethod
+    def _parse_balance(token) -> FixedAmount:
+        """Exact balance from Moralis' raw integer balance and token decimals, falling back to balance_formatted"""
+        raw, decimals = token.get('balance'), token.get('decimals')
+        if raw not in (None, '') and decimals not in (None, ''):
+            return FixedAmount.from_raw(raw, decimals)
+        return FixedAmount.from_value(token.get('balance_formatted') or 0)
+
+    @classmethod
+    def record_decimals(cls, decimals: Dict[str, int]) -> int:
+        """
+        Store on-chain decimals per coin, keeping the largest seen across chains.
+
+        Args:
+            decimals: {coin name: decimals}; zero or missing decimals are skipped
+
+        Returns:
+            Number of coins written
+        """
+        return DatabaseService.execute_many('''
+            INSERT INTO CoinDecimals (coin_id, decimals) VALUES (?, ?)
+            ON CONFLICT(coin_id) DO UPDATE SET decimals = excluded.decimals
+            WHERE excluded.decimals > CoinDecimals.decimals
+        ''', [(name, int(value)) for name, value in decimals.items() if value])
+
+    @classmethod
+    def get_decimals(cls) -> Dict[str, int]:
+        """On-chain decimals of every coin seen in a wallet refresh"""
+        return dict(DatabaseService.execute_query('SELECT coin_id, decimals FROM CoinDecimals'))
+
     @staticmethod
     @log_function_call(logger)
     def find_coin_by_name(name):
@@ -241,7 +277,15 @@ class WalletService:
         return ResponseHandler.success('Coin found', data=result)
     @staticmethod
     @log_function_call(logger)
-    def update_token(token_name, holdings, price=None):
+    def update_token(token_name, holdings, price=None, update_coin_price=True):
+        """
+        Write a token's holdings and price to the Wallet table.
+
+        Args:
+            update_coin_price: Also write the price to CoinPrices. The wallet refresh
+                passes False, as PriceAggregationService.consolidate() has already
+                written the consolidated price.
+        """
         logger.info(f'Updating token: {token_name}')
         try:
             # Check if the token exists in CoinPrices
@@ -270,7 +314,7 @@ class WalletService:
             DatabaseService.execute_query(wallet_query, (display_name, price, holdings))
 
             # Update the price in CoinPrices table if the token exisits
-            if coin_result['success']:
+            if coin_result['success'] and update_coin_price:
                 coinprices_query = '''
                     UPDATE CoinPrices
                     SET CurrentPrice = ?
@@ -308,10 +352,12 @@ class WalletService:
                 w.price,
                 w.amount,
                 (w.amount * w.price) as value,
-                cp.Name
+                cp.Name,
+                cd.decimals
             FROM Wallet w
             JOIN Position p ON w.position_id = p.id
             LEFT JOIN CoinPrices cp ON w.coin_id = cp.Name
+            LEFT JOIN CoinDecimals cd ON w.coin_id = cd.coin_id
             WHERE p.position_type = 'wallet'
             ORDER BY {sort_by} {"DESC" if order == "desc" else "ASC"}
         '''
@@ -324,8 +370,8 @@ class WalletService:
                     token=row[0] or row[4], # Use DisplayName if available, otherwise use Name
                     price=row[1],
                     holdings=row[2],
-                    value=row[3],
-                    original_name=row[4]
+                    original_name=row[4],
+                    decimals=row[5]
                 )
                 wallet_items.append(wallet_item)
             logger.info(f'Retrieved {len(wallet_items)} wallet items')
@@ -338,12 +384,9 @@ class WalletService:
     
     @staticmethod
     def calculate_total_value():
-        query = 'SELECT COALESCE(SUM(VALUE), 0) FROM Wallet'
-        result = DatabaseService.execute_query(query)
-        return result[0][0] if result else 0
+        return ValuationService.get_valuation().by_type['wallet']
     
     @staticmethod
     def calculate_total_portfolio_value():
-        # will calc total portfolio value
-        # return wallet for now
-        return WalletService.calculate_total_value()
\ No newline at end of file
+        """Total value of every position across all tables, net of debt"""
+        return ValuationService.get_valuation().total
\ No newline at end of file
@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import patch
+import requests
+
+from config import Config
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
+from services.alert_service import AlertService
+from services.repricing_service import RepricingService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestAlerts(unittest.TestCase):
+    """Test cases for the price alert rule engine"""
+
+    def setUp(self):
+        """Set up test database with prices, a wallet position and a lending pool"""
+        setup_test_db()
+        AnalyticsService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE CollateralPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL, collateral_factor REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE BorrowPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10), ('USDC', 1)")
+        DatabaseService.execute_query("INSERT INTO Wallet VALUES ('w_btc', 'Bitcoin', 2, 100)")
+        DatabaseService.execute_query("INSERT INTO CollateralPosition VALUES ('c1', 'l1', 'Ethereum', 10, 10, 0.8)")
+        DatabaseService.execute_query("INSERT INTO BorrowPosition VALUES ('b1', 'l1', 'USDC', 50, 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        AnalyticsService.invalidate()
+        cleanup_test_db()
+
+    def set_price(self, coin, price):
+        DatabaseService.execute_query('UPDATE CoinPrices SET CurrentPrice = ? WHERE Name = ?', (price, coin), fetch=False)
+        # Positions are valued at their stored prices, repriced after every refresh
+        RepricingService.reprice_positions('test')
+
+    def fired_rules(self):
+        result = AlertService.check_alerts('test')
+        self.assertTrue(result['success'])
+        return sorted(event['rule_id'] for event in result['data']['fired'])
+
+    def test_price_thresholds_fire_on_crossing(self):
+        """Test that price rules fire once when their level is crossed"""
+        above = AlertService.add_rule('price_above', 'Bitcoin', 110)['data'].id
+        below = AlertService.add_rule('price_below', 'Bitcoin', 90, note='buy more')['data'].id
+        self.assertEqual(self.fired_rules(), [])
+
+        self.set_price('Bitcoin', 120)
+        self.assertEqual(self.fired_rules(), [above])
+        # Staying above the level doesn't fire again
+        self.set_price('Bitcoin', 125)
+        self.assertEqual(self.fired_rules(), [])
+
+        self.set_price('Bitcoin', 80)
+        result = AlertService.check_alerts()
+        self.assertEqual([event['rule_id'] for event in result['data']['fired']], [below])
+        self.assertEqual(result['data']['fired'][0]['message'], 'Bitcoin price fell below 90 (125 -> 80): buy more')
+
+        events = AlertService.get_events()['data']
+        self.assertEqual([event['rule_id'] for event in events], [below, above])
+        self.assertEqual({event['status'] for event in events}, {'logged'})
+
+    def test_price_move_reanchors(self):
+        """Test that percent-move rules measure from the price they last fired at"""
+        rule = AlertService.add_rule('price_move', 'Ethereum', 10)['data']
+        self.assertEqual(rule.reference_price, 10.0)
+
+        self.set_price('Ethereum', 10.5)
+        self.assertEqual(self.fired_rules(), [])
+        self.set_price('Ethereum', 11.5)
+        self.assertEqual(self.fired_rules(), [rule.id])
+        # The next band is 10% around 11.5
+        self.set_price('Ethereum', 11)
+        self.assertEqual(self.fired_rules(), [])
+        self.set_price('Ethereum', 10.3)
+        self.assertEqual(self.fired_rules(), [rule.id])
+
+        self.assertFalse(AlertService.add_rule('price_move', 'Dogecoin', 10)['success'])
+
+    def test_health_and_value_rules(self):
+        """Test health ratio floors and position value thresholds"""
+        # l1 health: 10 ETH * 10 * 0.8 / 50 = 1.6; w_btc value: 200
+        health = AlertService.add_rule('health_below', 'l1', 1.2)['data'].id
+        value = AlertService.add_rule('value_below', 'w_btc', 150)['data'].id
+        disabled = AlertService.add_rule('value_below', 'w_btc', 190)['data'].id
+        AlertService.set_enabled(disabled, False)
+
+        self.set_price('Ethereum', 7)
+        self.set_price('Bitcoin', 70)
+        self.assertEqual(self.fired_rules(), [health, value])
+
+    def test_only_crossed_bands_are_checked(self):
+        """Test thousands of rules where a move crosses only a few of them"""
+        DatabaseService.execute_many(
+            "INSERT INTO AlertRule (kind, target, threshold, created_at) VALUES ('price_above', ?, ?, 0)",
+            [('Bitcoin', 100 + i * 0.01) for i in range(1, 5001)]
+        )
+        rules = AlertService.get_rules()['data']
+        AlertService._write_levels(rules)
+        AlertService.check_alerts()
+
+        self.set_price('Bitcoin', 100.05)
+        self.assertEqual(len(self.fired_rules()), 5)
+        self.set_price('Bitcoin', 100.03)
+        self.assertEqual(self.fired_rules(), [])
+
+        plan = ' '.join(row[3] for row in DatabaseService.execute_query(
+            "EXPLAIN QUERY PLAN SELECT rule_id FROM AlertLevel "
+            "WHERE subject = 'price:Bitcoin' AND direction = 'up' AND level > 100 AND level <= 101"
+        ))
+        self.assertIn('level>? AND level<?', plan)
+
+    def test_webhook_outbox(self):
+        """Test that fired alerts are posted to the webhook and retried on failure"""
+        AlertService.add_rule('price_above', 'Bitcoin', 110)
+        self.set_price('Bitcoin', 120)
+        with patch.object(Config, 'ALERT_WEBHOOK_URL', 'http://localhost/hook'), \
+             patch('services.alert_service.requests.post', side_effect=requests.exceptions.ConnectionError('down')) as post:
+            AlertService.check_alerts()
+            self.assertEqual(post.call_count, 1)
+            self.assertEqual(AlertService.get_events(status='pending')['data'][0]['attempts'], 1)
+
+            post.side_effect = None
+            self.assertEqual(AlertService.deliver_outbox()['data'], {'sent': 1})
+            self.assertEqual(post.call_args.kwargs['json']['alerts'][0]['target'], 'Bitcoin')
+            self.assertEqual(AlertService.get_events(status='sent')['data'][0]['attempts'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
+from services.valuation_service import ValuationService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestAnalytics(unittest.TestCase):
+    """Test cases for vectorized portfolio analytics"""
+
+    def setUp(self):
+        """Set up test database with priced positions across protocols"""
+        setup_test_db()
+        AnalyticsService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('CREATE TABLE Protocol (name TEXT PRIMARY KEY, chain_id TEXT NOT NULL)')
+        DatabaseService.execute_query('CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                debt_a REAL NOT NULL, debt_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED,
+                debt_value_a REAL GENERATED ALWAYS AS (debt_a * price_a) STORED,
+                debt_value_b REAL GENERATED ALWAYS AS (debt_b * price_b) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10), ('USDC', 1)")
+        DatabaseService.execute_query("INSERT INTO Protocol VALUES ('metamask', 'ethereum'), ('raydium', 'solana')")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('w_btc', 'metamask'), ('lf1', 'raydium')")
+        DatabaseService.execute_query('''
+            INSERT INTO Wallet VALUES ('w_btc', 'Bitcoin', 2, 100), ('w_eth', 'Ethereum', 3, 10), ('w_new', 'Unlisted', 4, 5)
+        ''')
+        DatabaseService.execute_query("INSERT INTO LeveragedFarmingPool VALUES ('lf1', 'Ethereum', 'USDC', 10, 1, 3, 30, 1, 50)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        AnalyticsService.invalidate()
+        cleanup_test_db()
+
+    def test_breakdowns(self):
+        """Test values from the stored position values with debt netted, matching the valuation"""
+        data = AnalyticsService.get_summary(['coin', 'type', 'chain', 'position'])['data']
+        self.assertEqual(data['by_coin'], {'Bitcoin': 200.0, 'Ethereum': 50.0, 'USDC': -20.0, 'Unlisted': 20.0})
+        self.assertEqual(data['by_type'], {'wallet': 250.0, 'staking': 0.0, 'farming': 0.0, 'leveraged': 0.0, 'lending': 0.0})
+        self.assertEqual(data['by_chain'], {'ethereum': 200.0, 'solana': 0.0, 'unknown': 50.0})
+        self.assertEqual(data['total'], 250.0)
+        # Debt is the value owed, not netted against the same leg's holdings
+        self.assertEqual(data['debt_total'], 60.0)
+        self.assertEqual(data['weights']['position']['w_btc'], 80.0)
+        self.assertFalse(AnalyticsService.get_summary(['colour'])['success'])
+
+        valuation = ValuationService.get_valuation()
+        self.assertEqual(data['total'], valuation.total)
+        self.assertEqual(data['by_type'], valuation.by_type)
+        # Current prices reach positions through repricing, not directly
+        DatabaseService.execute_query("UPDATE CoinPrices SET CurrentPrice = 200 WHERE Name = 'Bitcoin'")
+        self.assertEqual(AnalyticsService.get_summary(['coin'])['data']['by_coin']['Bitcoin'], 200.0)
+
+    def test_matches_valuation_endpoint(self):
+        """Test that the analytics and valuation endpoints report the same totals when legs round differently"""
+        from flask import Flask
+        from routes.portfolio_routes import portfolio_routes
+        app = Flask(__name__)
+        app.register_blueprint(portfolio_routes)
+        # Each leg is worth 2.5 micro-dollars; rounded per leg the position would be worth 4, not 5
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('lf2', 'raydium')")
+        DatabaseService.execute_query(
+            "INSERT INTO LeveragedFarmingPool VALUES ('lf2', 'Ethereum', 'USDC', 0.0000025, 0.0000025, 1, 1, 0, 0)"
+        )
+
+        client = app.test_client()
+        analytics = client.get('/api/portfolio/analytics?by=position,type,protocol,chain').get_json()['data']
+        valuation = client.get('/api/portfolio/valuation?positions=1').get_json()['data']
+        for field in ('total', 'gross_total', 'debt_total', 'by_type', 'by_protocol', 'by_chain'):
+            self.assertEqual(analytics[field], valuation[field], field)
+        self.assertEqual(analytics['by_position'], {p['position_id']: p['value'] for p in valuation['positions']})
+        self.assertEqual(analytics['by_position']['lf2'], 0.000005)
+
+    def test_cached_per_data_version(self):
+        """Test that arrays are reloaded only after a tracked table changes"""
+        arrays = AnalyticsService.get_arrays()
+        self.assertIs(AnalyticsService.get_arrays(), arrays)
+        DatabaseService.execute_query("UPDATE Wallet SET price = 200 WHERE position_id = 'w_btc'")
+        self.assertEqual(AnalyticsService.get_arrays().breakdown('coin')['Bitcoin'], 400.0)
+
+        # A different price vector values the same arrays without reloading
+        shocked = arrays.prices * 0.5
+        self.assertEqual(arrays.breakdown('coin', arrays.values(shocked))['Ethereum'], 25.0)
+
+    def test_matches_loop_at_scale(self):
+        """Test vectorized breakdowns against a plain loop over thousands of legs"""
+        rng = np.random.default_rng(7)
+        amounts = rng.uniform(-5, 50, 5000)
+        rows = [
+            (f'p{i}', f'coin{i % 300}', 'wallet', f'proto{i % 40}', f'chain{i % 6}',
+             float(amounts[i]), float(i % 300 + 1), float(amounts[i] * (i % 300 + 1)), None)
+            for i in range(5000)
+        ]
+        arrays = AnalyticsService.build_arrays(1, rows)
+        expected = {}
+        for position, coin, _, protocol, chain, amount, price, _, _ in rows:
+            expected[protocol] = expected.get(protocol, 0.0) + amount * price
+        for protocol, value in arrays.breakdown('protocol').items():
+            self.assertAlmostEqual(value, expected[protocol], places=6)
+        self.assertEqual(AnalyticsService.percent_of_total([1, 3], 4), [25.0, 75.0])
+        self.assertEqual(AnalyticsService.percent_of_total([1, 3], 0), [0.0, 0.0])
+
+if __name__ == '__main__':
+    unittest.main()
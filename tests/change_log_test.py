@@ -0,0 +1,103 @@
+import unittest
+
+from services.database import DatabaseService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestChangeLog(unittest.TestCase):
+    """Test cases for trigger-maintained change tracking"""
+
+    def setUp(self):
+        """Set up test database with a tracked table"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE IF NOT EXISTS Wallet (
+                position_id TEXT PRIMARY KEY,
+                coin_id TEXT NOT NULL,
+                amount REAL NOT NULL,
+                price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        self.tracked = DatabaseService.install_change_tracking()
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def _insert(self, position_id, amount=1.0):
+        DatabaseService.execute_query(
+            'INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES (?, ?, ?, ?)',
+            (position_id, 'Bitcoin', amount, 100.0)
+        )
+
+    def test_only_existing_tables_tracked(self):
+        """Test that triggers are only installed on tables that exist"""
+        self.assertEqual(self.tracked, ['Wallet'])
+
+    def test_versions_increase_with_changes(self):
+        """Test that every change advances the data version"""
+        self.assertEqual(DatabaseService.data_version(), 0)
+        self._insert('wallet_btc')
+        first = DatabaseService.data_version()
+        DatabaseService.execute_query('UPDATE Wallet SET amount = 2 WHERE position_id = ?', ('wallet_btc',))
+        self.assertGreater(DatabaseService.data_version(), first)
+
+    def test_changes_since(self):
+        """Test that only rows changed after a version are reported"""
+        self._insert('wallet_btc')
+        version = DatabaseService.data_version()
+        self._insert('wallet_eth')
+        DatabaseService.execute_query('DELETE FROM Wallet WHERE position_id = ?', ('wallet_btc',))
+
+        changes = DatabaseService.changes_since(version)
+        self.assertEqual(
+            [(c.table_name, c.row_key, c.operation) for c in changes],
+            [('Wallet', 'wallet_eth', 'I'), ('Wallet', 'wallet_btc', 'D')]
+        )
+        self.assertEqual(DatabaseService.changes_since(version, tables=['CoinPrices']), [])
+
+    def test_composite_key(self):
+        """Test that rows sharing part of a composite key are logged separately"""
+        DatabaseService.execute_query('''
+            CREATE TABLE ProtocolCollateralConfig (
+                protocol_id TEXT NOT NULL, coin_id TEXT NOT NULL, collateral_factor REAL NOT NULL,
+                PRIMARY KEY (protocol_id, coin_id)
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query(
+            "INSERT INTO ProtocolCollateralConfig VALUES ('aave', 'Ethereum', 0.8), ('aave', 'USDC', 0.9)"
+        )
+        DatabaseService.execute_query("UPDATE ProtocolCollateralConfig SET coin_id = 'WETH' WHERE coin_id = 'Ethereum'")
+
+        changes = DatabaseService.changes_since(0, tables=['ProtocolCollateralConfig'])
+        self.assertEqual(
+            sorted((c.row_key, c.operation) for c in changes),
+            [('aave:Ethereum', 'D'), ('aave:USDC', 'I'), ('aave:WETH', 'U')]
+        )
+
+    def test_log_keeps_latest_change_per_row(self):
+        """Test that repeated updates to a row don't grow the log"""
+        self._insert('wallet_btc')
+        for amount in range(2, 10):
+            DatabaseService.execute_query(
+                'UPDATE Wallet SET amount = ? WHERE position_id = ?',
+                (amount, 'wallet_btc')
+            )
+
+        result = DatabaseService.execute_query('SELECT COUNT(*) FROM ChangeLog')
+        self.assertEqual(result[0][0], 1)
+        self.assertEqual(DatabaseService.changes_since(0)[0].operation, 'U')
+
+    def test_prune_keeps_version_counter(self):
+        """Test that pruning the log does not reset the data version"""
+        self._insert('wallet_btc')
+        version = DatabaseService.data_version()
+        DatabaseService.prune_change_log(version)
+
+        self.assertEqual(DatabaseService.changes_since(0), [])
+        self._insert('wallet_eth')
+        self.assertGreater(DatabaseService.data_version(), version)
+
+if __name__ == '__main__':
+    unittest.main()
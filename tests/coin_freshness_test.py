@@ -0,0 +1,92 @@
+import unittest
+import time
+from unittest.mock import patch
+
+from models.coin import Coin
+from services.database import DatabaseService
+from services.coin_price_service import CoinPriceService
+from utils.response import ResponseHandler
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestCoinFreshness(unittest.TestCase):
+    """Test cases for price freshness tracking and selective refresh"""
+
+    def setUp(self):
+        """Set up test database with a CoinPrices table from before LastUpdated existed"""
+        self.test_db = setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE CoinPrices (
+                Name TEXT PRIMARY KEY, CurrentPrice REAL, MarketCap REAL, MarketCapRank INTEGER,
+                TotalVolume REAL, High24h REAL, Low24h REAL, PriceChange24h REAL,
+                PriceChangePercentage24h REAL, MarketCapChange24h REAL, MarketCapChangePercentage24h REAL,
+                PriceChangePercentage1h REAL, DisplayName TEXT, ApiId TEXT, AlternateNames TEXT
+            )
+        ''')
+        DatabaseService.execute_query(
+            "INSERT INTO CoinPrices (Name, CurrentPrice, MarketCapRank, DisplayName, ApiId) VALUES ('Bitcoin', 100, 1, 'Bitcoin', 'bitcoin')"
+        )
+        DatabaseService.execute_query(
+            "INSERT INTO CoinPrices (Name, CurrentPrice, MarketCapRank, DisplayName, ApiId) VALUES ('Tiny', 1, 0, 'Tiny', 'tiny')"
+        )
+        # As on the first start after LastUpdated was added
+        DatabaseService.create_schema()
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def _set_age(self, name, age):
+        DatabaseService.execute_query('UPDATE CoinPrices SET LastUpdated = ? WHERE Name = ?', (time.time() - age, name))
+
+    def test_schema_adds_column(self):
+        """Test that LastUpdated is added once at startup and written on every price update"""
+        for replica in (False, True):
+            DatabaseService.cleanup()
+            DatabaseService.initialize(self.test_db, replica=replica)
+        columns = [row[1] for row in DatabaseService.execute_query('PRAGMA table_info(CoinPrices)')]
+        self.assertEqual(columns.count('LastUpdated'), 1)
+        with DatabaseService.replica_reads():
+            coin = CoinPriceService.get_all_coins()['data'][0]
+        self.assertIsNone(coin.LastUpdated)
+
+        coin.AlternateNames = []
+        CoinPriceService._update_coin_in_db(coin)
+        with DatabaseService.replica_reads():
+            coin = next(c for c in CoinPriceService.get_all_coins()['data'] if c.Name == coin.Name)
+        self.assertLess(coin.age(), 5)
+
+    def test_insert_or_update_coin_skips_fresh(self):
+        """Test that a coin fetched moments ago is not fetched again"""
+        self._set_age('Bitcoin', 10)
+        with patch('services.coin_price_service.CoinGeckoService.fetch_single_coin_price') as fetch:
+            fetch.return_value = ResponseHandler.error('offline')
+            result = CoinPriceService.insert_or_update_coin('bitcoin', max_age=60)
+            self.assertTrue(result['success'])
+            fetch.assert_not_called()
+
+            CoinPriceService.insert_or_update_coin('bitcoin', max_age=0)
+            fetch.assert_called_once_with('bitcoin')
+
+    def test_update_coin_prices_only_refreshes_stale(self):
+        """Test that the top 500 fetch and single fetches are skipped for fresh coins"""
+        self._set_age('Bitcoin', 10)
+        self._set_age('Tiny', 600)
+        with patch('services.coin_price_service.CoinGeckoService.fetch_coin_prices') as fetch_top, \
+             patch('services.coin_price_service.CoinGeckoService.fetch_single_coin_price') as fetch_single:
+            fetch_single.return_value = ResponseHandler.error('offline')
+            CoinPriceService.update_coin_prices(max_age=60)
+
+        fetch_top.assert_not_called()
+        fetch_single.assert_called_once_with('tiny')
+
+    def test_age_label(self):
+        """Test the human-readable price age"""
+        now = time.time()
+        coin = Coin('Bitcoin', 1, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 'Bitcoin', 'bitcoin')
+        self.assertEqual(coin.age_label(now), 'never')
+        for age, label in ((30, '30s'), (125, '2m'), (3 * 3600, '3h'), (2 * 86400 + 5, '2d')):
+            coin.LastUpdated = now - age
+            self.assertEqual(coin.age_label(now), label)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+
+from services.database import DatabaseService
+from services.exposure_service import ExposureService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestExposure(unittest.TestCase):
+    """Test cases for incremental coin and position exposure"""
+
+    def setUp(self):
+        """Set up test database with wallet, LP, leveraged and lending positions"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE FarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                debt_a REAL NOT NULL, debt_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED,
+                debt_value_a REAL GENERATED ALWAYS AS (debt_a * price_a) STORED,
+                debt_value_b REAL GENERATED ALWAYS AS (debt_b * price_b) STORED
+            )
+        ''')
+        for table in ('CollateralPosition', 'BorrowPosition'):
+            DatabaseService.execute_query(f'''
+                CREATE TABLE {table} (
+                    position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                    amount REAL NOT NULL, price REAL NOT NULL,
+                    value REAL GENERATED ALWAYS AS (amount * price) STORED
+                )
+            ''')
+        DatabaseService.install_change_tracking()
+
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w_eth', 'Ethereum', 2, 10)")
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w_btc', 'Bitcoin', 1.5, 100)")
+        DatabaseService.execute_query("INSERT INTO FarmingPool VALUES ('lp1', 'Ethereum', 'USDC', 10, 1, 1, 10)")
+        DatabaseService.execute_query("INSERT INTO LeveragedFarmingPool VALUES ('lf1', 'Ethereum', 'USDC', 10, 1, 3, 30, 1, 20)")
+        DatabaseService.execute_query("INSERT INTO CollateralPosition VALUES ('c1', 'l1', 'Ethereum', 5, 10)")
+        DatabaseService.execute_query("INSERT INTO BorrowPosition VALUES ('b1', 'l1', 'USDC', 25, 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def exposures(self):
+        return {exposure.token: exposure for exposure in ExposureService.get_coin_exposure()['data']}
+
+    def test_exposure_by_type(self):
+        """Test that LP legs, leveraged debt and borrows are all counted per coin"""
+        self.assertTrue(ExposureService.update_exposure()['success'])
+        exposures = self.exposures()
+
+        ethereum = exposures['Ethereum']
+        self.assertEqual(
+            (ethereum.wallet_value, ethereum.lp_value, ethereum.leverage_farm_value, ethereum.lending_borrowing_value),
+            (20.0, 10.0, 20.0, 50.0)
+        )
+        self.assertEqual(ethereum.total_value, 100.0)
+        usdc = exposures['USDC']
+        self.assertEqual((usdc.lp_value, usdc.leverage_farm_value, usdc.lending_borrowing_value), (10.0, 10.0, -25.0))
+        self.assertEqual(usdc.total_value, -5.0)
+        self.assertEqual([exposure.token for exposure in ExposureService.get_coin_exposure()['data']],
+                         ['Bitcoin', 'Ethereum', 'USDC'])
+
+        positions = {row['position_id']: row for row in ExposureService.get_position_exposure('Ethereum')['data']}
+        self.assertEqual(positions['c1']['position_percent'], 50.0)
+        self.assertEqual(positions['lp1']['type_percent'], 100.0)
+
+        groups = DatabaseService.execute_query('SELECT id FROM CoinGroup ORDER BY id')
+        self.assertEqual([row[0] for row in groups], ['Bitcoin', 'Ethereum', 'USDC'])
+
+    def test_incremental_update(self):
+        """Test that only coins held by changed positions are recomputed"""
+        ExposureService.update_exposure()
+        self.assertEqual(ExposureService.update_exposure()['data'], {'coins': 0, 'positions': 0})
+
+        DatabaseService.execute_query("UPDATE Wallet SET price = 120 WHERE position_id = 'w_btc'")
+        self.assertEqual(ExposureService.update_exposure()['data'], {'coins': 1, 'positions': 1})
+        self.assertEqual(self.exposures()['Bitcoin'].total_value, 180.0)
+
+        # Switching a position to another coin recomputes both coins and drops the old leg
+        DatabaseService.execute_query("UPDATE Wallet SET coin_id = 'Solana' WHERE position_id = 'w_eth'")
+        self.assertEqual(ExposureService.update_exposure()['data'], {'coins': 2, 'positions': 1})
+        exposures = self.exposures()
+        self.assertEqual(exposures['Solana'].wallet_value, 20.0)
+        self.assertEqual(exposures['Ethereum'].wallet_value, 0.0)
+        self.assertEqual(exposures['Ethereum'].total_value, 80.0)
+        self.assertEqual(
+            DatabaseService.execute_query("SELECT COUNT(*) FROM PositionExposure WHERE position_id = 'w_eth'")[0][0], 1
+        )
+
+        DatabaseService.execute_query("DELETE FROM Wallet WHERE position_id = 'w_btc'")
+        ExposureService.update_exposure()
+        self.assertNotIn('Bitcoin', self.exposures())
+
+        # The incremental result matches a full rebuild
+        incremental = {token: exposure.to_dict() for token, exposure in self.exposures().items()}
+        ExposureService.update_exposure(rebuild=True)
+        self.assertEqual({token: exposure.to_dict() for token, exposure in self.exposures().items()}, incremental)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+
+from services.database import DatabaseService
+from services.farming_analytics_service import FarmingAnalyticsService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestFarmingAnalytics(unittest.TestCase):
+    """Test cases for LP impermanent loss, yield and APR"""
+
+    def setUp(self):
+        """Set up test database with one LP and one leveraged farm"""
+        setup_test_db()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL, created_at TIMESTAMP)
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE FarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                deposited_a REAL NOT NULL, deposited_b REAL NOT NULL
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                debt_a REAL NOT NULL, debt_b REAL NOT NULL, deposited_a REAL NOT NULL, deposited_b REAL NOT NULL
+            )
+        ''')
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Ethereum', 400), ('USDC', 1)")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('f1', 'uniswap', datetime('now', '-73 days'))")
+        # Entered with 1 ETH + 100 USDC at ETH = 100; fees grew the position 10% beyond the fee-less 0.5 / 200
+        DatabaseService.execute_query(
+            "INSERT INTO FarmingPool VALUES ('f1', 'Ethereum', 'USDC', 100, 1, 0.55, 220, 1, 100)"
+        )
+        # 1 ETH of own funds plus 100 borrowed USDC, no fees earned
+        DatabaseService.execute_query(
+            "INSERT INTO LeveragedFarmingPool VALUES ('lf1', 'Ethereum', 'USDC', 100, 1, 0.5, 200, 0, 100, 1, 0)"
+        )
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_compute_against_hodl(self):
+        """Test impermanent loss and fee split for a 4x price move"""
+        metrics = FarmingAnalyticsService.compute(
+            np.array([400.0]), np.array([1.0]), np.array([0.55]), np.array([220.0]),
+            np.array([1.0]), np.array([100.0])
+        )
+        self.assertAlmostEqual(metrics['no_fee_value'][0], 400.0)
+        self.assertAlmostEqual(metrics['il_value'][0], -100.0)
+        self.assertAlmostEqual(metrics['il_percent'][0], -20.0)
+        self.assertAlmostEqual(metrics['fee_value'][0], 40.0)
+        self.assertAlmostEqual(metrics['fee_percent'][0], 10.0)
+        self.assertAlmostEqual(metrics['pnl_vs_hodl'][0], -60.0)
+        self.assertTrue(np.isnan(metrics['apr'][0]))
+
+    def test_update_analytics(self):
+        """Test the stored metrics of both position types, with APR from the position's age"""
+        result = FarmingAnalyticsService.update_analytics('test')
+        self.assertEqual(result['data'], {'positions': 2})
+
+        data = FarmingAnalyticsService.get_analytics()['data']
+        positions = {position['position_id']: position for position in data['positions']}
+        lp = positions['f1']
+        self.assertAlmostEqual(lp['fee_value'], 40.0)
+        self.assertAlmostEqual(lp['days_held'], 73.0, places=3)
+        self.assertAlmostEqual(lp['apr'], 40.0 / 500.0 * 5 * 100, places=2)
+
+        leveraged = positions['lf1']
+        self.assertAlmostEqual(leveraged['net_value'], 300.0)
+        self.assertAlmostEqual(leveraged['hodl_value'], 400.0)
+        self.assertAlmostEqual(leveraged['il_value'], -100.0)
+        self.assertAlmostEqual(leveraged['fee_value'], 0.0)
+        self.assertIsNone(leveraged['apr'])
+
+        self.assertAlmostEqual(data['totals']['il_value'], -200.0)
+        self.assertEqual(len(FarmingAnalyticsService.get_analytics('leveraged')['data']['positions']), 1)
+        self.assertFalse(FarmingAnalyticsService.get_analytics('staking')['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import numpy as np
+
+from models.amount import FixedAmount
+from models.valuation import PortfolioValuation, PositionValue
+from models.wallet import WalletItem
+from services.database import DatabaseService
+from services.wallet_service import WalletService
+from utils.fixed_point import (
+    VALUE_DECIMALS, rescale, sum_units, to_units, to_units_array, value_units_array
+)
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestFixedPoint(unittest.TestCase):
+    """Test cases for scaled-integer amounts"""
+
+    def test_scalar_conversion(self):
+        """Test exact, half-even conversion of numbers to units"""
+        self.assertEqual(to_units(0.1, 8), 10000000)
+        self.assertEqual(to_units('1.005', 2), 100)
+        self.assertEqual(to_units('1.015', 2), 102)
+        self.assertEqual(to_units(-2, 6), -2000000)
+        self.assertEqual(rescale(125, 2, 1), 12)
+        self.assertEqual(rescale(135, 2, 1), 14)
+        with self.assertRaises(ValueError):
+            to_units(float('nan'), 6)
+        with self.assertRaises(OverflowError):
+            to_units_array([1e12], 8)
+
+    def test_fixed_amount(self):
+        """Test that amounts at different scales add, compare and value exactly"""
+        # The same coin held on two chains with 6 and 18 token decimals
+        total = FixedAmount.from_raw('1500000', 6) + FixedAmount.from_raw(250000000000000001, 18)
+        self.assertEqual(str(total), '1.750000000000000001')
+        self.assertEqual(FixedAmount.from_value('1.50', 2), FixedAmount.from_value(1.5))
+        self.assertEqual(len({FixedAmount.from_value('1.50', 2), FixedAmount.from_value(1.5)}), 1)
+        self.assertLess(FixedAmount.from_value(0.1), FixedAmount.from_value('0.100000001', 9))
+
+        tenths = [FixedAmount.from_value(0.1)] * 10
+        self.assertNotEqual(sum([0.1] * 10), 1.0)
+        self.assertEqual(sum(tenths), 1)
+        self.assertEqual(FixedAmount.sum(tenths + [FixedAmount.from_raw(1, 18)]).units, 10 ** 18 + 1)
+
+        value = FixedAmount.from_value(3).value(0.1)
+        self.assertEqual((value.units, value.decimals), (300000, VALUE_DECIMALS))
+
+    def test_vectorized_units(self):
+        """Test int64 value units and exact grouped sums"""
+        amounts = to_units_array([0.1, 0.2, 1e6], 8)
+        prices = to_units_array([3.0, 3.0, 0.3], 10)
+        units = value_units_array(amounts, 8, prices)
+        self.assertEqual(units.dtype, np.int64)
+        self.assertEqual(units.tolist(), [300000, 600000, 300000000000])
+        self.assertEqual(sum_units(units), 300000900000)
+        # Sums beyond int64 fall back to Python integers rather than wrapping
+        large = np.iinfo(np.int64).max // 2
+        self.assertEqual(sum_units(np.full(4, large)), 4 * large)
+
+    def test_valuation_totals_are_exact(self):
+        """Test that valuation totals are exact sums of value units"""
+        values = [0.1] * 10 + [1e9, -1e9]
+        valuation = PortfolioValuation(data_version=0)
+        for i, value in enumerate(values):
+            valuation.add(PositionValue(f'p{i}', 'wallet', 'default', 'eth', max(value, 0), max(-value, 0)))
+        self.assertEqual(valuation.total, 1.0)
+        self.assertEqual(valuation.by_type['wallet'], 1.0)
+        self.assertEqual(valuation.debt_total, 1e9)
+
+        item = WalletItem(token='USDC', price=1.0, holdings=0.1, original_name='USDC', decimals=6)
+        self.assertEqual((item.value_units, item.value), (100000, 0.1))
+
+    def test_wallet_item_outside_64_bit_units(self):
+        """Test that huge balances and prices below PRICE_DECIMALS keep their value"""
+        item = WalletItem(token='x', price=1e-9, holdings=2e11, original_name='x', decimals=18)
+        self.assertEqual((item.value_units, item.value), (200000000, 200.0))
+
+        item = WalletItem(token='x', price=1e-12, holdings=5e11, original_name='x', decimals=18)
+        self.assertEqual(item.value, 0.5)
+
+class TestCoinDecimals(unittest.TestCase):
+    """Test cases for stored coin decimals and the wallet items that use them"""
+
+    def setUp(self):
+        """Set up test database with one wallet position"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL, DisplayName TEXT)
+        ''')
+        DatabaseService.execute_query('CREATE TABLE Position (id TEXT PRIMARY KEY, position_type TEXT)')
+        DatabaseService.execute_query('CREATE TABLE Wallet (position_id TEXT, coin_id TEXT, amount REAL, price REAL)')
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('USDC', 1, 'USD Coin')")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('w1', 'wallet')")
+        DatabaseService.execute_query("INSERT INTO Wallet VALUES ('w1', 'USDC', 2.0000004, 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_record_decimals(self):
+        """Test that the largest decimals seen are kept and set the scale of wallet amounts"""
+        self.assertEqual(WalletService._parse_balance({'balance': '2500000', 'decimals': 6}), FixedAmount.from_value(2.5))
+        self.assertEqual(WalletService._parse_balance({'balance_formatted': '0.5'}), FixedAmount.from_value(0.5))
+
+        WalletService.record_decimals({'USDC': 6, 'Unknown': 0})
+        WalletService.record_decimals({'USDC': 2})
+        self.assertEqual(WalletService.get_decimals(), {'USDC': 6})
+
+        item = WalletService.get_wallet_items()['data'][0]
+        self.assertEqual(item.token, 'USD Coin')
+        # USDC has 6 decimals, so the stored 2.0000004 holds 2.000000 units
+        self.assertEqual(item.value_units, 2000000)
+
+if __name__ == '__main__':
+    unittest.main()
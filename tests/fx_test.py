@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from services.fx_service import FxService
+from services.valuation_service import ValuationService
+from services.analytics_service import AnalyticsService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+# CoinGecko /exchange_rates quotes every currency per BTC
+EXCHANGE_RATES = {'rates': {
+    'btc': {'value': 1.0}, 'eth': {'value': 20.0}, 'usd': {'value': 50000.0},
+    'eur': {'value': 45000.0}, 'chf': {'value': 44000.0}, 'jpy': {'value': 7000000.0}
+}}
+
+class TestFx(unittest.TestCase):
+    """Test cases for exchange rates and multi-currency valuation"""
+
+    def setUp(self):
+        """Set up test database with two wallet positions"""
+        setup_test_db()
+        ValuationService.invalidate()
+        AnalyticsService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('CREATE TABLE Protocol (name TEXT PRIMARY KEY, chain_id TEXT NOT NULL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL, position_type TEXT)
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query("INSERT INTO Protocol VALUES ('default', 'eth')")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('w1', 'default', 'wallet'), ('w2', 'default', 'wallet')")
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w1', 'Bitcoin', 1, 50000)")
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w2', 'USDC', 10000, 1)")
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 50000), ('USDC', 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def refresh(self, **kwargs):
+        with patch('services.fx_service.CoinGeckoService.fetch_exchange_rates',
+                   return_value={'success': True, 'data': EXCHANGE_RATES}) as fetch:
+            result = FxService.refresh_rates('test', **kwargs)
+        self.assertTrue(result['success'], result.get('error'))
+        return result['data'], fetch.call_count
+
+    def test_refresh_rates(self):
+        """Test that one call fetches every currency and fresh rates aren't re-fetched"""
+        self.assertEqual(self.refresh(), ({'updated': 4, 'skipped': False}, 1))
+        rates = FxService.get_rates()
+        self.assertEqual(set(rates), {'usd', 'eur', 'chf', 'btc', 'eth'})
+        self.assertAlmostEqual(rates['eur'], 0.9)
+        self.assertAlmostEqual(rates['btc'], 1 / 50000)
+
+        self.assertEqual(self.refresh(), ({'updated': 0, 'skipped': True}, 0))
+        self.assertEqual(self.refresh(force=True)[1], 1)
+
+    def test_valuation_in_currency(self):
+        """Test converted totals, breakdowns and position values"""
+        with self.assertRaises(ValueError):
+            FxService.rate('eur')
+        self.refresh()
+
+        data = ValuationService.get_summary(include_positions=True, currency='EUR')['data']
+        self.assertEqual(data['currency'], 'eur')
+        self.assertAlmostEqual(data['total'], 60000 * 0.9)
+        self.assertAlmostEqual(data['by_chain']['eth'], 60000 * 0.9)
+        values = {position['position_id']: position['value'] for position in data['positions']}
+        self.assertAlmostEqual(values['w2'], 9000.0)
+        # The cached USD valuation is left unchanged
+        self.assertEqual(ValuationService.get_valuation().total, 60000.0)
+
+        analytics = AnalyticsService.get_summary(['coin'], currency='btc')['data']
+        self.assertAlmostEqual(analytics['total'], 1.2)
+        self.assertAlmostEqual(analytics['by_coin']['Bitcoin'], 1.0)
+        self.assertAlmostEqual(analytics['weights']['coin']['USDC'], 100 / 6)
+        self.assertFalse(AnalyticsService.get_summary(currency='jpy')['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import sqlite3
+import time
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from services.job_service import JobService
+from utils.response import ResponseHandler
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestJobService(unittest.TestCase):
+    """Test cases for persistent job tracking"""
+
+    def setUp(self):
+        setup_test_db()
+
+    def tearDown(self):
+        cleanup_test_db()
+
+    def test_create_job_coalesces_queued(self):
+        """Test that queueing a job twice returns the queued job"""
+        first = JobService.create_job('prices')
+        second = JobService.create_job('prices')
+
+        self.assertTrue(first['data']['created'])
+        self.assertFalse(second['data']['created'])
+        self.assertEqual(first['data']['job_id'], second['data']['job_id'])
+        self.assertTrue(JobService.create_job('wallet')['data']['created'])
+
+    def test_run_job_records_progress_and_report(self):
+        """Test that stages, progress and the report are persisted"""
+        job_id = JobService.create_job('prices')['data']['job_id']
+
+        def refresh():
+            job = JobService.current()
+            job.stage('fetch')
+            job.stage('update', total=3)
+            for _ in range(3):
+                job.advance()
+            self.assertEqual(JobService.get_job(job_id)['data']['status'], 'running')
+            job.add_report(updated=3)
+            return ResponseHandler.success('done')
+
+        result = JobService.run_job(job_id, 'prices', refresh)
+        self.assertTrue(result['success'])
+
+        job = JobService.get_job(job_id)['data']
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual([stage['name'] for stage in job['stages']], ['fetch', 'update'])
+        self.assertEqual(job['stages'][1]['done'], 3)
+        self.assertEqual(job['stages'][1]['total'], 3)
+        self.assertEqual(job['report']['updated'], 3)
+        self.assertEqual(job['report']['message'], 'done')
+        self.assertIsNotNone(job['finished_at'])
+
+    def test_progress_inside_unit_of_work(self):
+        """Test that progress reported inside a unit of work never waits on its write lock"""
+        job_id = JobService.create_job('prices')['data']['job_id']
+        DatabaseService.execute_query('CREATE TABLE Item (id INTEGER PRIMARY KEY)', fetch=False)
+
+        def persisted():
+            return tuple(DatabaseService.execute_detached('SELECT stage, progress_done FROM Job WHERE id = ?',
+                                                          (job_id,))[0])
+
+        def refresh():
+            job = JobService.current()
+            with DatabaseService.unit_of_work():
+                DatabaseService.execute_query('INSERT INTO Item DEFAULT VALUES', fetch=False)
+                started = time.perf_counter()
+                job.stage('update', total=3)
+                for _ in range(3):
+                    job.advance()
+                self.assertLess(time.perf_counter() - started, 1.0)
+                self.assertEqual(persisted(), (None, 0))
+            # Written once the unit of work has committed
+            self.assertEqual(persisted(), ('update', 3))
+            return ResponseHandler.success('done')
+
+        with patch('services.job_service.Config.JOB_PERSIST_INTERVAL', 0):
+            self.assertTrue(JobService.run_job(job_id, 'prices', refresh)['success'])
+        self.assertEqual(DatabaseService.execute_query('SELECT COUNT(*) FROM Item')[0][0], 1)
+
+    def test_failed_job(self):
+        """Test that errors and exceptions mark the job failed"""
+        job_id = JobService.create_job('prices')['data']['job_id']
+        JobService.run_job(job_id, 'prices', lambda: ResponseHandler.error('API down'))
+        job = JobService.get_job(job_id)['data']
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'API down')
+
+        def broken():
+            raise ValueError('boom')
+
+        job_id = JobService.create_job('prices')['data']['job_id']
+        with self.assertRaises(ValueError):
+            JobService.run_job(job_id, 'prices', broken)
+        self.assertEqual(JobService.get_job(job_id)['data']['error'], 'boom')
+
+    def test_same_name_never_runs_twice(self):
+        """Test that a job is skipped while another with the same name runs"""
+        running_id = JobService.create_job('prices')['data']['job_id']
+        calls = []
+
+        def outer():
+            queued_id = JobService.create_job('prices')['data']['job_id']
+            result = JobService.run_job(queued_id, 'prices', lambda: calls.append('inner'))
+            self.assertFalse(result['success'])
+            return ResponseHandler.success('done')
+
+        JobService.run_job(running_id, 'prices', outer)
+        self.assertEqual(calls, [])
+
+    def test_unknown_job(self):
+        """Test that looking up a missing job fails"""
+        self.assertFalse(JobService.get_job('missing')['success'])
+
+    def test_job_route_status(self):
+        """Test that the job route returns 404 only for missing jobs and 500 when the lookup fails"""
+        from flask import Flask
+        from routes.job_routes import job_routes
+        app = Flask(__name__)
+        app.register_blueprint(job_routes)
+        client = app.test_client()
+        job_id = JobService.create_job('prices')['data']['job_id']
+
+        self.assertEqual(client.get(f'/jobs/{job_id}').status_code, 200)
+        self.assertEqual(client.get('/jobs/missing').status_code, 404)
+        with patch('services.job_service.DatabaseService.execute_detached',
+                   side_effect=sqlite3.OperationalError('database is locked')):
+            response = client.get('/jobs/missing')
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('database is locked', response.get_json()['error'])
+
+    def test_current_outside_job(self):
+        """Test that progress calls outside a job are harmless"""
+        job = JobService.current()
+        job.stage('work', total=1)
+        job.advance()
+        self.assertIsNone(job.id)
+
+if __name__ == '__main__':
+    unittest.main()
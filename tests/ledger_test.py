@@ -0,0 +1,106 @@
+import unittest
+import io
+import json
+
+from services.database import DatabaseService
+from services.ledger_service import LedgerService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestLedger(unittest.TestCase):
+    """Test cases for the transaction ledger, importer and lot engine"""
+
+    def setUp(self):
+        """Set up test database with current prices"""
+        setup_test_db()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 250), ('Ethereum', 10)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def add(self, ts, side, amount, price, coin='Bitcoin', fee=0):
+        result = LedgerService.add_transaction(
+            {'timestamp': ts, 'coin': coin, 'side': side, 'amount': amount, 'price': price, 'fee': fee}
+        )
+        self.assertTrue(result['success'], result.get('error'))
+
+    def pnl(self, method):
+        return {coin['coin_id']: coin for coin in LedgerService.get_pnl(method)['data']['coins']}
+
+    def test_cost_basis_methods(self):
+        """Test realized and unrealized PnL under FIFO, LIFO and average cost"""
+        self.add(1, 'buy', 1, 100)
+        self.add(2, 'buy', 1, 200)
+        self.add(3, 'sell', 1, 300)
+
+        expected = {'fifo': (200, 50), 'lifo': (100, 150), 'average': (150, 100)}
+        for method, (realized, unrealized) in expected.items():
+            bitcoin = self.pnl(method)['Bitcoin']
+            self.assertAlmostEqual(bitcoin['realized_pnl'], realized, msg=method)
+            self.assertAlmostEqual(bitcoin['unrealized_pnl'], unrealized, msg=method)
+            self.assertAlmostEqual(bitcoin['quantity'], 1.0)
+
+        # Fees add to the cost of a buy and come off the proceeds of a sale
+        self.add(4, 'buy', 2, 10, coin='Ethereum', fee=2)
+        self.add(5, 'sell', 1, 20, coin='Ethereum', fee=1)
+        self.assertAlmostEqual(self.pnl('fifo')['Ethereum']['realized_pnl'], 19 - 11)
+        self.assertAlmostEqual(self.pnl('fifo')['Ethereum']['average_cost'], 11)
+
+    def test_incremental_updates(self):
+        """Test that new transactions apply on top of stored lots and backdated ones replay the coin"""
+        self.add(1, 'buy', 2, 100)
+        self.add(3, 'sell', 1, 150)
+        self.assertEqual(LedgerService.update_lots()['data']['fifo'], {'applied': 0, 'replayed': 0})
+
+        DatabaseService.execute_query(
+            "INSERT INTO LedgerTransaction (ts, coin_id, side, amount, price) VALUES (4, 'Bitcoin', 'sell', 1, 120)",
+            fetch=False
+        )
+        self.assertEqual(LedgerService.update_lots()['data']['fifo'], {'applied': 1, 'replayed': 0})
+        self.assertAlmostEqual(self.pnl('fifo')['Bitcoin']['realized_pnl'], 50 + 20)
+
+        # A buy dated before the first sale changes which lot later sales used
+        DatabaseService.execute_query(
+            "INSERT INTO LedgerTransaction (ts, coin_id, side, amount, price) VALUES (2, 'Bitcoin', 'buy', 1, 50)",
+            fetch=False
+        )
+        self.assertEqual(LedgerService.update_lots()['data']['lifo'], {'applied': 4, 'replayed': 1})
+        lifo = self.pnl('lifo')['Bitcoin']
+        # LIFO: sale at 3 takes the 50 lot, sale at 4 takes one of the 100 lots
+        self.assertAlmostEqual(lifo['realized_pnl'], (150 - 50) + (120 - 100))
+        self.assertAlmostEqual(lifo['cost_basis'], 100)
+        self.assertEqual(
+            DatabaseService.execute_query("SELECT COUNT(*) FROM CostLot WHERE method = 'lifo'")[0][0], 1
+        )
+
+    def test_csv_import(self):
+        """Test streaming CSV import with duplicates and invalid rows"""
+        lines = ['id,timestamp,coin,side,amount,price,fee']
+        lines += [f'tx{i},2024-01-01T00:00:{i % 60:02d},Ethereum,buy,1,{10 + i % 5},0' for i in range(12000)]
+        lines += ['tx0,2024-01-02T00:00:00,Ethereum,buy,1,10,0', 'tx-bad,2024-01-02,Ethereum,hold,1,10,0']
+        stream = io.BytesIO('\n'.join(lines).encode())
+
+        result = LedgerService.import_transactions(stream, 'csv', source='test.csv')
+        self.assertTrue(result['success'])
+        data = result['data']
+        self.assertEqual((data['read'], data['inserted'], data['duplicates'], data['invalid']), (12002, 12000, 1, 1))
+        self.assertIn('Record 12002', data['errors'][0])
+        self.assertEqual(data['lots']['fifo']['applied'], 12000)
+        self.assertAlmostEqual(self.pnl('average')['Ethereum']['quantity'], 12000)
+
+    def test_json_import(self):
+        """Test JSON arrays and JSON lines read in small chunks"""
+        records = [{'id': i, 'timestamp': i, 'coin': 'Bitcoin', 'side': 'buy', 'amount': 0.5, 'price': 100.25}
+                   for i in range(50)]
+        parsed = list(LedgerService._iter_json(io.StringIO(json.dumps(records)), chunk_size=7))
+        self.assertEqual(parsed, records)
+        lines = '\n'.join(json.dumps(record) for record in records)
+        self.assertEqual(list(LedgerService._iter_json(io.StringIO(lines), chunk_size=5)), records)
+
+        result = LedgerService.import_transactions(io.StringIO(json.dumps(records)), 'json')
+        self.assertEqual(result['data']['inserted'], 50)
+        self.assertFalse(LedgerService.import_transactions(io.StringIO('[{"id": 1,'), 'json')['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
+from services.lending_health_service import LendingHealthService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestLendingHealth(unittest.TestCase):
+    """Test cases for batch lending health and liquidation prices"""
+
+    def setUp(self):
+        """Set up test database with two lending pools"""
+        setup_test_db()
+        AnalyticsService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE ProtocolCollateralConfig (
+                protocol_id TEXT, coin_id TEXT, collateral_factor REAL NOT NULL, PRIMARY KEY (protocol_id, coin_id)
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LendingPool (
+                position_id TEXT PRIMARY KEY, health_ratio REAL, total_collateral_value REAL, total_borrow_value REAL
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE CollateralPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL, collateral_factor REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE BorrowPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10), ('USDC', 1)")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('l1', 'aave'), ('l2', 'compound')")
+        DatabaseService.execute_query("INSERT INTO ProtocolCollateralConfig VALUES ('aave', 'Ethereum', 0.8)")
+        DatabaseService.execute_query("INSERT INTO LendingPool (position_id) VALUES ('l1'), ('l2'), ('l3')")
+        DatabaseService.execute_query('''
+            INSERT INTO CollateralPosition VALUES
+                ('c1', 'l1', 'Ethereum', 10, 10, 0.5),
+                ('c2', 'l1', 'Bitcoin', 1, 100, 0.5),
+                ('c3', 'l2', 'Ethereum', 10, 10, 0.75)
+        ''')
+        DatabaseService.execute_query('''
+            INSERT INTO BorrowPosition VALUES ('b1', 'l1', 'USDC', 100, 1), ('b2', 'l2', 'Ethereum', 5, 10)
+        ''')
+
+    def tearDown(self):
+        """Clean up test database"""
+        AnalyticsService.invalidate()
+        cleanup_test_db()
+
+    def test_update_health(self):
+        """Test health ratios and totals written back to LendingPool"""
+        result = LendingHealthService.update_health('test')
+        self.assertEqual(result['data'], {'pools': 2, 'updated': 2})
+
+        rows = {row[0]: tuple(row[1:]) for row in DatabaseService.execute_query(
+            'SELECT position_id, health_ratio, total_collateral_value, total_borrow_value FROM LendingPool'
+        )}
+        # l1: Ethereum at aave's 0.8 (100 * 0.8) + Bitcoin at its own 0.5 (100 * 0.5), over 100 borrowed
+        self.assertEqual(rows['l1'], (1.3, 200.0, 100.0))
+        self.assertEqual(rows['l2'], (1.5, 100.0, 50.0))
+        self.assertEqual(rows['l3'], (None, None, None))
+
+        # Unchanged prices rewrite nothing
+        self.assertEqual(LendingHealthService.update_health()['data']['updated'], 0)
+
+    def test_liquidation_prices(self):
+        """Test per-coin liquidation prices, including a coin on both sides of a pool"""
+        LendingHealthService.update_health()
+        pools = {pool['position_id']: pool for pool in LendingHealthService.get_health()['data']}
+        self.assertEqual(list(pools), ['l1', 'l2', 'l3'])
+
+        l1 = {price['coin_id']: price for price in pools['l1']['liquidation_prices']}
+        # Ethereum: 8 * p + 50 = 100 -> p = 6.25; Bitcoin: 0.5 * p + 80 = 100 -> p = 40
+        self.assertAlmostEqual(l1['Ethereum']['liquidation_price'], 6.25)
+        self.assertAlmostEqual(l1['Ethereum']['distance_percent'], 37.5)
+        self.assertAlmostEqual(l1['Bitcoin']['liquidation_price'], 40.0)
+
+        # l2 borrows the coin it posts: 7.5 * p = 5 * p only at p = 0, so no liquidation price
+        self.assertIsNone(pools['l2']['liquidation_prices'][0]['liquidation_price'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from services.database import DatabaseService
+from services.portfolio_snapshot_service import PortfolioSnapshotService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestPortfolioSnapshot(unittest.TestCase):
+    """Test cases for portfolio value snapshots and downsampling"""
+
+    def setUp(self):
+        """Set up test database with wallet and staking positions"""
+        setup_test_db()
+        for table in ('Wallet', 'Staking'):
+            DatabaseService.execute_query(f'''
+                CREATE TABLE {table} (
+                    position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                    value REAL GENERATED ALWAYS AS (amount * price) STORED
+                )
+            ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LendingPool (
+                position_id TEXT PRIMARY KEY, health_ratio REAL,
+                total_collateral_value REAL NOT NULL, total_borrow_value REAL NOT NULL,
+                net_value REAL GENERATED ALWAYS AS (total_collateral_value - total_borrow_value) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w1', 'Bitcoin', 2, 50)")
+        DatabaseService.execute_query("INSERT INTO Staking (position_id, coin_id, amount, price) VALUES ('s1', 'Ethereum', 10, 3)")
+        DatabaseService.execute_query("INSERT INTO LendingPool (position_id, total_collateral_value, total_borrow_value) VALUES ('l1', 100, 40)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_take_snapshot(self):
+        """Test that a snapshot records per-type totals, with missing tables as zero"""
+        snapshot = PortfolioSnapshotService.take_snapshot('coin_prices', ts=1000)['data']
+        self.assertEqual(snapshot, {
+            'ts': 1000, 'total': 190.0, 'wallet': 100.0, 'staking': 30.0,
+            'farming': 0.0, 'leveraged': 0.0, 'lending': 60.0
+        })
+        series = PortfolioSnapshotService.get_series(0, 2000)['data']['points']
+        self.assertEqual(series, [snapshot])
+
+    def test_series_downsampling(self):
+        """Test that both methods return at most the requested number of points"""
+        for ts in range(300):
+            DatabaseService.execute_query('UPDATE Wallet SET amount = ?', (1 + (ts % 50 == 0) * 10,))
+            PortfolioSnapshotService.take_snapshot('test', ts=ts)
+
+        lttb = PortfolioSnapshotService.get_series(0, 299, points=30)['data']['points']
+        self.assertEqual(len(lttb), 30)
+        self.assertEqual((lttb[0]['ts'], lttb[-1]['ts']), (0, 299))
+        # Every spike is kept
+        self.assertEqual(sum(1 for point in lttb if point['wallet'] > 500), 6)
+
+        avg = PortfolioSnapshotService.get_series(0, 299, points=30, method='avg')['data']['points']
+        self.assertLessEqual(len(avg), 30)
+        self.assertAlmostEqual(sum(point['wallet'] for point in avg) / len(avg), 50 + 6 * 500 / 300, delta=5)
+
+        self.assertFalse(PortfolioSnapshotService.get_series(method='median')['success'])
+
+    def test_lttb_short_series(self):
+        """Test that series shorter than the threshold are returned unchanged"""
+        series = [{'ts': i, 'total': i} for i in range(5)]
+        self.assertEqual(PortfolioSnapshotService.lttb(series, 10), series)
+
+if __name__ == '__main__':
+    unittest.main()
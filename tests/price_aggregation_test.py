@@ -0,0 +1,86 @@
+import unittest
+import time
+import numpy as np
+
+from services.database import DatabaseService
+from services.price_aggregation_service import PriceAggregationService
+from services.price_history_service import PriceHistoryService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestPriceAggregation(unittest.TestCase):
+    """Test cases for consolidating price quotes from several sources"""
+
+    def setUp(self):
+        """Set up test database with current prices"""
+        setup_test_db()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_weighted_median(self):
+        """Test the median, outlier flags and staleness weighting"""
+        result = PriceAggregationService.compute(
+            coin_idx=np.array([0, 0, 0, 1, 1, 2]),
+            prices=np.array([100.0, 101.0, 500.0, 100.0, 110.0, 5.0]),
+            ages=np.array([0, 0, 0, 2 * 3600, 0, 2 * 86400], dtype=float),
+            base_weights=np.array([1.0, 0.8, 0.8, 1.0, 0.8, 1.0]),
+            coin_count=3
+        )
+        # One wild quote is outvoted and flagged
+        self.assertEqual(result['price'][0], 101.0)
+        self.assertEqual(result['outlier'].tolist(), [False, False, True, False, False, False])
+        self.assertAlmostEqual(result['spread_percent'][0], 1 / 101 * 100)
+        # A fresh quote outweighs a two hour old one from a preferred source
+        self.assertEqual(result['price'][1], 110.0)
+        # Only expired quotes: no price
+        self.assertTrue(np.isnan(result['price'][2]))
+
+    def test_source_weight_shared_between_chains(self):
+        """Test that a source quoting a coin on several chains doesn't outvote the others"""
+        args = dict(
+            coin_idx=np.array([0, 0, 0]),
+            prices=np.array([100.0, 102.0, 102.0]),
+            ages=np.zeros(3),
+            base_weights=np.array([1.0, 0.8, 0.8]),
+            coin_count=1
+        )
+        self.assertEqual(PriceAggregationService.compute(**args)['price'][0], 102.0)
+        self.assertEqual(PriceAggregationService.compute(**args, source_idx=np.array([0, 1, 1]))['price'][0], 100.0)
+
+    def test_consolidate(self):
+        """Test that consolidated prices are written to CoinPrices and quotes keep their flags"""
+        now = time.time()
+        PriceAggregationService.record_quote('Bitcoin', 'coingecko', 100, now)
+        PriceAggregationService.record_quote('Bitcoin', 'moralis:eth', 102, now)
+        PriceAggregationService.record_quote('Bitcoin', 'moralis:base', 3, now)
+        PriceAggregationService.record_quote('Ethereum', 'coingecko', 11, now)
+        PriceAggregationService.record_quote('Ethereum', 'moralis:eth', 0, now)
+
+        data = PriceAggregationService.consolidate(now=now)['data']
+        self.assertEqual((data['coins'], data['updated'], data['outliers']), (2, 1, 1))
+        self.assertEqual(data['prices'], {'Bitcoin': 100.0, 'Ethereum': 11.0})
+        prices = dict(DatabaseService.execute_query('SELECT Name, CurrentPrice FROM CoinPrices'))
+        self.assertEqual(prices, {'Bitcoin': 100.0, 'Ethereum': 11.0})
+        # Only the consolidated price changes are recorded in the history
+        def history(coin):
+            return PriceHistoryService.get_history(coin, now - 60, now + 60, resolution=0)['data']['points']
+        self.assertEqual(history('Bitcoin'), [])
+        self.assertEqual([point['price'] for point in history('Ethereum')], [11.0])
+
+        quotes = PriceAggregationService.get_quotes('Bitcoin')['data']
+        self.assertEqual(quotes['consensus']['quotes'], 3)
+        self.assertEqual({quote['source']: quote['outlier'] for quote in quotes['quotes']},
+                         {'coingecko': False, 'moralis:base': True, 'moralis:eth': False})
+
+        # An older quote doesn't replace a newer one, and nothing changes on a second run
+        PriceAggregationService.record_quote('Bitcoin', 'moralis:base', 4, now - 60)
+        self.assertEqual(PriceAggregationService.consolidate(['Bitcoin'], now=now)['data']['updated'], 0)
+        self.assertEqual(
+            DatabaseService.execute_query("SELECT price FROM PriceQuote WHERE source = 'moralis:base'")[0][0], 3
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from config import Config
+from services.database import DatabaseService
+from services.price_history_service import PriceHistoryService, HOUR, DAY
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestPriceHistory(unittest.TestCase):
+    """Test cases for the price history store and rollups"""
+
+    # Midnight UTC, so hourly and daily buckets line up with the samples below
+    START = 1_700_006_400
+
+    def setUp(self):
+        """Set up test database"""
+        setup_test_db()
+        PriceHistoryService._buffer = []
+        self.retention = Config.PRICE_HISTORY_RETENTION
+
+    def tearDown(self):
+        """Clean up test database"""
+        Config.PRICE_HISTORY_RETENTION = self.retention
+        PriceHistoryService._buffer = []
+        cleanup_test_db()
+
+    def _record_hours(self, name, prices_per_hour):
+        """Record 5-minute samples; each hour gets the given list of prices"""
+        for hour, prices in enumerate(prices_per_hour):
+            for i, price in enumerate(prices):
+                PriceHistoryService.record(name, price, self.START + hour * HOUR + i * 300)
+        return PriceHistoryService.flush()
+
+    def test_record_and_query_raw(self):
+        """Test that buffered samples are written in one flush and queried by range"""
+        PriceHistoryService.record('Bitcoin', 100, self.START)
+        PriceHistoryService.record('Bitcoin', 101, self.START + 300)
+        PriceHistoryService.record('Ethereum', 10, self.START)
+        self.assertEqual(PriceHistoryService.flush(), 3)
+        self.assertEqual(PriceHistoryService.flush(), 0)
+
+        result = PriceHistoryService.get_history('Bitcoin', self.START, self.START + 600, resolution=0)
+        self.assertEqual(result['data']['points'], [
+            {'ts': self.START, 'price': 100.0},
+            {'ts': self.START + 300, 'price': 101.0}
+        ])
+
+    def test_hourly_and_daily_rollup(self):
+        """Test OHLC buckets, including a partial bucket completed by a later rollup"""
+        self._record_hours('Bitcoin', [[10, 14, 9, 12], [12, 20]])
+        PriceHistoryService.rollup()
+        # Later samples in the same hour
+        PriceHistoryService.record('Bitcoin', 5, self.START + HOUR + 900)
+        PriceHistoryService.record('Bitcoin', 11, self.START + HOUR + 1200)
+        PriceHistoryService.flush()
+        PriceHistoryService.rollup()
+
+        hourly = PriceHistoryService.get_history('Bitcoin', self.START, self.START + DAY - 1, resolution=HOUR)
+        self.assertEqual(hourly['data']['points'], [
+            {'ts': self.START, 'open': 10.0, 'high': 14.0, 'low': 9.0, 'close': 12.0},
+            {'ts': self.START + HOUR, 'open': 12.0, 'high': 20.0, 'low': 5.0, 'close': 11.0},
+        ])
+
+        daily = PriceHistoryService.get_history('Bitcoin', self.START, self.START + DAY - 1, resolution=DAY)
+        self.assertEqual(daily['data']['points'], [
+            {'ts': self.START, 'open': 10.0, 'high': 20.0, 'low': 5.0, 'close': 11.0}
+        ])
+
+    def test_prune_keeps_unrolled_samples(self):
+        """Test that retention deletes old raw samples only once they are rolled up"""
+        Config.PRICE_HISTORY_RETENTION = {0: HOUR, HOUR: None, DAY: None}
+        self._record_hours('Bitcoin', [[1, 2], [3, 4], [5, 6]])
+        now = self.START + 10 * HOUR
+
+        PriceHistoryService.prune(now)
+        self.assertEqual(len(PriceHistoryService.get_history('Bitcoin', self.START, now, resolution=0)['data']['points']), 6)
+
+        PriceHistoryService.rollup()
+        PriceHistoryService.prune(now)
+        # Samples in the last rolled-up (possibly partial) hour are kept
+        raw = PriceHistoryService.get_history('Bitcoin', self.START, now, resolution=0)['data']['points']
+        self.assertEqual([point['price'] for point in raw], [5.0, 6.0])
+        hourly = PriceHistoryService.get_history('Bitcoin', self.START, now, resolution=HOUR)['data']['points']
+        self.assertEqual(len(hourly), 3)
+
+    def test_resolution_picked_from_range(self):
+        """Test that long ranges are served from rollups"""
+        self.assertEqual(PriceHistoryService.get_history('Bitcoin', 0, HOUR)['data']['resolution'], 0)
+        self.assertEqual(PriceHistoryService.get_history('Bitcoin', 0, 30 * DAY)['data']['resolution'], HOUR)
+        self.assertEqual(PriceHistoryService.get_history('Bitcoin', 0, 365 * DAY)['data']['resolution'], DAY)
+        self.assertFalse(PriceHistoryService.get_history('Bitcoin', 0, HOUR, resolution=60)['success'])
+
+if __name__ == '__main__':
+    unittest.main()
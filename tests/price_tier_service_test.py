@@ -0,0 +1,118 @@
+import unittest
+import time
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from services.price_tier_service import PriceTierService
+from services.price_aggregation_service import PriceAggregationService
+from utils.response import ResponseHandler
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestPriceTierService(unittest.TestCase):
+    """Test cases for the tiered price refresh"""
+
+    def setUp(self):
+        """Set up test database with coins and positions"""
+        setup_test_db()
+
+        DatabaseService.execute_query('''
+            CREATE TABLE CoinPrices (
+                Name TEXT PRIMARY KEY, CurrentPrice REAL, MarketCap REAL, MarketCapRank INTEGER,
+                TotalVolume REAL, High24h REAL, Low24h REAL, PriceChange24h REAL,
+                PriceChangePercentage24h REAL, MarketCapChange24h REAL, MarketCapChangePercentage24h REAL,
+                PriceChangePercentage1h REAL, DisplayName TEXT, ApiId TEXT, AlternateNames TEXT, LastUpdated REAL
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE FarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                deposited_a REAL NOT NULL, deposited_b REAL NOT NULL
+            )
+        ''')
+        coins = [
+            # name, price, 1h change, api id
+            ('Bitcoin', 60000, 0.2, 'bitcoin'),
+            ('Ethereum', 3000, 0.5, 'ethereum'),
+            ('USDC', 1, 0.0, 'usd-coin'),
+            ('Pepe', 0.00001, 9.0, 'pepe'),
+            ('Dogecoin', 0.1, 0.3, 'dogecoin'),
+            ('Manual', 1, 0.0, ''),
+        ]
+        for rank, (name, price, change_1h, api_id) in enumerate(coins, start=1):
+            DatabaseService.execute_query(
+                'INSERT INTO CoinPrices (Name, CurrentPrice, MarketCapRank, PriceChangePercentage1h, DisplayName, ApiId) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (name, price, rank, change_1h, name, api_id)
+            )
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w1', 'Bitcoin', 0.01, 60000)")
+        DatabaseService.execute_query('''
+            INSERT INTO FarmingPool (position_id, token_a_id, token_b_id, price_a, price_b, holdings_a, holdings_b, deposited_a, deposited_b)
+            VALUES ('f1', 'Ethereum', 'USDC', 3000, 1, 1, 3000, 1, 3000)
+        ''')
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_tiers(self):
+        """Test that held coins (including both LP legs) are tier 1 and volatile coins tier 2"""
+        tiers = {coin.name: coin.tier for coin in PriceTierService.get_coin_tiers()}
+        self.assertEqual(tiers, {'Bitcoin': 1, 'Ethereum': 1, 'USDC': 1, 'Pepe': 2, 'Dogecoin': 3})
+
+        # A held coin without a price is still tier 1
+        DatabaseService.execute_query("UPDATE CoinPrices SET CurrentPrice = NULL WHERE Name = 'Bitcoin'")
+        DatabaseService.execute_query("UPDATE CoinPrices SET CurrentPrice = 0 WHERE Name = 'USDC'")
+        tiers = {coin.name: coin for coin in PriceTierService.get_coin_tiers()}
+        self.assertEqual((tiers['Bitcoin'].tier, tiers['Bitcoin'].exposure), (1, 0))
+        self.assertEqual((tiers['USDC'].tier, tiers['USDC'].held), (1, 3000))
+
+    def test_plan_orders_by_tier_then_impact(self):
+        """Test that the plan spends the budget on the largest expected value change first"""
+        plan = [coin.name for coin in PriceTierService.plan_refresh(budget=10)]
+        # Ethereum: 3000 * 0.5% beats USDC: 3000 * 0.1% floor beats Bitcoin: 600 * 0.2%
+        self.assertEqual(plan, ['Ethereum', 'USDC', 'Bitcoin', 'Pepe', 'Dogecoin'])
+        self.assertEqual([coin.name for coin in PriceTierService.plan_refresh(budget=2)], ['Ethereum', 'USDC'])
+
+    def test_fresh_coins_are_skipped(self):
+        """Test that coins younger than their tier interval are not due"""
+        now = time.time()
+        for name, age in (('Ethereum', 60), ('Dogecoin', 30 * 60)):
+            DatabaseService.execute_query('UPDATE CoinPrices SET LastUpdated = ? WHERE Name = ?', (now - age, name))
+        plan = [coin.name for coin in PriceTierService.plan_refresh(budget=10, now=now)]
+        self.assertNotIn('Ethereum', plan)
+        self.assertNotIn('Dogecoin', plan)
+        self.assertIn('Bitcoin', plan)
+
+    def test_refresh_due_prices(self):
+        """Test that planned coins are fetched in one batch and written"""
+        def fetch(api_ids):
+            return ResponseHandler.success('Fetched', data=[{
+                'id': api_id, 'name': api_id.title(), 'current_price': 42.0, 'market_cap': 1,
+                'market_cap_rank': 1, 'total_volume': 1, 'high_24h': 1, 'low_24h': 1,
+                'price_change_24h': 0, 'price_change_percentage_24h': 0, 'market_cap_change_24h': 0,
+                'market_cap_change_percentage_24h': 0, 'price_change_percentage_1h_in_currency': 0
+            } for api_id in api_ids])
+
+        with patch('services.price_tier_service.CoinGeckoService.fetch_coins_by_ids', side_effect=fetch) as fetch_mock:
+            result = PriceTierService.refresh_due_prices(budget=2)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(fetch_mock.call_count, 1)
+        self.assertEqual(result['data']['updated'], 2)
+        # Fetched prices are quotes until consolidated
+        price_query = "SELECT CurrentPrice FROM CoinPrices WHERE Name = 'Ethereum'"
+        self.assertNotEqual(DatabaseService.execute_query(price_query)[0][0], 42.0)
+        PriceAggregationService.consolidate()
+        self.assertEqual(DatabaseService.execute_query(price_query)[0][0], 42.0)
+        # Refreshed coins are no longer due
+        self.assertNotIn('Ethereum', [coin.name for coin in PriceTierService.plan_refresh(budget=10)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import os
+import threading
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestReadReplica(unittest.TestCase):
+    """Test cases for the in-memory read replica"""
+
+    def setUp(self):
+        """Set up test database with replica mode enabled"""
+        self.test_db = setup_test_db(replica=True)
+        DatabaseService.execute_query('''
+            CREATE TABLE IF NOT EXISTS test_table (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                value REAL
+            )
+        ''')
+        DatabaseService.execute_query(
+            'INSERT INTO test_table (name, value) VALUES (?, ?)',
+            ('test', 1.0)
+        )
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_reads_served_from_replica(self):
+        """Test that reads in a replica block do not touch the database file"""
+        with DatabaseService.replica_reads():
+            os.rename(self.test_db, self.test_db + '.moved')
+            try:
+                result = DatabaseService.execute_query('SELECT name FROM test_table')
+            finally:
+                os.rename(self.test_db + '.moved', self.test_db)
+
+        self.assertEqual([row['name'] for row in result], ['test'])
+
+    def test_replica_refreshed_after_commit(self):
+        """Test that committed writes are visible in the next replica block"""
+        with DatabaseService.unit_of_work():
+            DatabaseService.execute_query(
+                'UPDATE test_table SET value = ? WHERE name = ?',
+                (2.0, 'test'),
+                fetch=False
+            )
+
+        with DatabaseService.replica_reads():
+            result = DatabaseService.execute_query('SELECT value FROM test_table')
+        self.assertEqual(result[0]['value'], 2.0)
+
+    def test_replica_refreshed_after_schema_change(self):
+        """Test that tables created without changing any rows reach the replica"""
+        DatabaseService.execute_query('CREATE TABLE plain (id INTEGER)', fetch=False)
+        with DatabaseService.unit_of_work():
+            DatabaseService.execute_query('CREATE TABLE in_unit (id INTEGER)', fetch=False)
+
+        with DatabaseService.replica_reads():
+            for table in ('plain', 'in_unit'):
+                self.assertEqual(DatabaseService.execute_query(f'SELECT COUNT(*) FROM {table}')[0][0], 0)
+
+        # Reads that change nothing don't rebuild it
+        with patch.object(DatabaseService._replica, 'refresh') as refresh:
+            DatabaseService.execute_query('SELECT COUNT(*) FROM test_table')
+            with DatabaseService.unit_of_work():
+                DatabaseService.execute_query('SELECT COUNT(*) FROM plain')
+        refresh.assert_not_called()
+
+    def test_replica_block_keeps_its_snapshot(self):
+        """Test that a replica block does not see writes committed after it started"""
+        with DatabaseService.replica_reads():
+            DatabaseService.execute_query(
+                'UPDATE test_table SET value = ? WHERE name = ?',
+                (3.0, 'test'),
+                fetch=False
+            )
+            pinned = DatabaseService.execute_query('SELECT value FROM test_table')
+
+        self.assertEqual(pinned[0]['value'], 1.0)
+        result = DatabaseService.execute_query('SELECT value FROM test_table')
+        self.assertEqual(result[0]['value'], 3.0)
+
+    def test_write_batch_refreshes_once(self):
+        """Test that commits inside a write batch rebuild the replica once, when it ends"""
+        with patch.object(DatabaseService._replica, 'refresh', wraps=DatabaseService._replica.refresh) as refresh:
+            with DatabaseService.write_batch():
+                for value in (4.0, 5.0, 6.0):
+                    DatabaseService.execute_query('UPDATE test_table SET value = ?', (value,), fetch=False)
+                with DatabaseService.replica_reads():
+                    self.assertEqual(DatabaseService.execute_query('SELECT value FROM test_table')[0]['value'], 1.0)
+                self.assertEqual(refresh.call_count, 0)
+            self.assertEqual(refresh.call_count, 1)
+
+        with DatabaseService.replica_reads():
+            self.assertEqual(DatabaseService.execute_query('SELECT value FROM test_table')[0]['value'], 6.0)
+
+    def test_thread_connections(self):
+        """Test that each thread reads the snapshot through its own connection"""
+        snapshot = DatabaseService._replica.current()
+        connections = []
+
+        def read():
+            connections.append(snapshot.connection())
+            self.assertEqual(snapshot.execute('SELECT name FROM test_table')[0]['name'], 'test')
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        read()
+        self.assertEqual(len({id(conn) for conn in connections}), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import threading
+import time
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from services.refresh_scheduler import RefreshScheduler
+from utils.response import ResponseHandler
+from utils.test_helpers import setup_test_db, cleanup_test_db
+from config import Config
+
+class TestRefreshScheduler(unittest.TestCase):
+    """Test cases for the background refresh scheduler"""
+
+    def setUp(self):
+        # Every run is recorded as a job, so the scheduler needs a database
+        setup_test_db()
+        RefreshScheduler.reset()
+        self.active = 0
+        self.max_active = 0
+        self.runs = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        RefreshScheduler.reset()
+        cleanup_test_db()
+
+    def _task(self, name, block=False):
+        def run():
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            if block:
+                self.release.wait(5)
+            time.sleep(0.01)
+            with self.lock:
+                self.active -= 1
+                self.runs.append(name)
+            return ResponseHandler.success(f'{name} done')
+        return run
+
+    def _wait_for_runs(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.runs) >= count:
+                    return
+            time.sleep(0.01)
+        self.fail(f'Expected {count} runs, got {self.runs}')
+
+    def test_trigger_returns_immediately(self):
+        """Test that triggering queues the run without waiting for it"""
+        RefreshScheduler.register('prices', self._task('prices', block=True))
+
+        start = time.monotonic()
+        result = RefreshScheduler.trigger('prices')
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertTrue(result['success'])
+
+        self.release.set()
+        self._wait_for_runs(1)
+
+    def test_unknown_task(self):
+        """Test that triggering an unregistered task fails"""
+        result = RefreshScheduler.trigger('missing')
+        self.assertFalse(result['success'])
+
+    def test_runs_never_overlap(self):
+        """Test that tasks run one at a time and repeated triggers coalesce"""
+        RefreshScheduler.register('prices', self._task('prices', block=True))
+        RefreshScheduler.register('wallet', self._task('wallet'))
+
+        RefreshScheduler.trigger('prices')
+        time.sleep(0.05)
+        RefreshScheduler.trigger('wallet')
+        # Outside the coalescing window a trigger queues one more run
+        with patch.object(Config, 'REFRESH_COALESCE_WINDOW', 0):
+            RefreshScheduler.trigger('prices')
+            self.assertIn('already queued', RefreshScheduler.trigger('prices')['message'])
+
+        self.release.set()
+        self._wait_for_runs(3)
+        time.sleep(0.05)
+
+        self.assertEqual(self.max_active, 1)
+        self.assertEqual(sorted(self.runs), ['prices', 'prices', 'wallet'])
+
+    def test_trigger_joins_running_run(self):
+        """Test that triggers right after a run started share that run and its job"""
+        RefreshScheduler.register('prices', self._task('prices', block=True))
+
+        job_id = RefreshScheduler.trigger('prices')['data']['job_id']
+        deadline = time.monotonic() + 5
+        while not RefreshScheduler.status()['prices']['running'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        joined = [RefreshScheduler.trigger('prices') for _ in range(3)]
+        self.assertTrue(all(result['data'] == {'job_id': job_id, 'joined': True} for result in joined))
+
+        self.release.set()
+        self._wait_for_runs(1)
+        time.sleep(0.05)
+        self.assertEqual(self.runs, ['prices'])
+
+    def test_interval_runs(self):
+        """Test that tasks with an interval run on their own after the jitter"""
+        RefreshScheduler.register('prices', self._task('prices'), interval=0.05)
+        RefreshScheduler.start(jitter=0.05)
+
+        self._wait_for_runs(2)
+        RefreshScheduler.stop()
+        status = RefreshScheduler.status()['prices']
+        self.assertEqual(status['last_result']['message'], 'prices done')
+
+    def test_lazy_start_uses_configured_jitter(self):
+        """Test that a trigger starting the worker still spreads the interval tasks' first runs"""
+        RefreshScheduler.register('prices', self._task('prices'), interval=3600)
+        RefreshScheduler.register('wallet', self._task('wallet'))
+        with patch.object(Config, 'REFRESH_JITTER', 600), \
+                patch('services.refresh_scheduler.random.uniform', side_effect=lambda low, high: high):
+            RefreshScheduler.trigger('wallet')
+        self.assertGreater(RefreshScheduler._tasks['prices'].next_run - time.monotonic(), 500)
+        self._wait_for_runs(1)
+        self.assertEqual(self.runs, ['wallet'])
+
+    def test_started_by_first_request(self):
+        """Test that an app without the reloader starts the worker when it serves a request"""
+        from flask import Flask
+        app = Flask(__name__)
+        app.add_url_rule('/', 'index', lambda: 'ok')
+        RefreshScheduler.init_app(app)
+        self.assertIsNone(RefreshScheduler._thread)
+        app.test_client().get('/')
+        self.assertTrue(RefreshScheduler._thread.is_alive())
+
+    def test_after_refresh_hooks(self):
+        """Test that hooks run after successful runs of the tasks they are registered for"""
+        hooked = []
+        RefreshScheduler.register('prices', self._task('prices'))
+        RefreshScheduler.register('fails', lambda: ResponseHandler.error('API down'))
+        RefreshScheduler.register('other', self._task('other'))
+        RefreshScheduler.after_refresh(lambda name: hooked.append(name), tasks=['prices', 'fails'])
+
+        for name in ('prices', 'fails', 'other'):
+            RefreshScheduler.trigger(name)
+        self._wait_for_runs(2)
+        RefreshScheduler.stop(timeout=5)
+
+        self.assertEqual(hooked, ['prices'])
+
+if __name__ == '__main__':
+    unittest.main()
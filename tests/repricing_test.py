@@ -0,0 +1,71 @@
+import unittest
+
+from services.database import DatabaseService
+from services.repricing_service import RepricingService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestRepricing(unittest.TestCase):
+    """Test cases for set-based repricing of position tables"""
+
+    def setUp(self):
+        """Set up test database with prices and positions"""
+        setup_test_db()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                debt_a REAL NOT NULL, debt_b REAL NOT NULL, deposited_a REAL NOT NULL, deposited_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED,
+                debt_value_a REAL GENERATED ALWAYS AS (debt_a * price_a) STORED,
+                debt_value_b REAL GENERATED ALWAYS AS (debt_b * price_b) STORED,
+                net_value REAL GENERATED ALWAYS AS (value_a + value_b - debt_value_a - debt_value_b) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        for name, price in (('Bitcoin', 100), ('Ethereum', 10), ('USDC', 1), ('Unpriced', None)):
+            DatabaseService.execute_query('INSERT INTO CoinPrices VALUES (?, ?)', (name, price))
+        for position_id, coin_id, price in (('w_btc', 'Bitcoin', 100), ('w_eth', 'Ethereum', 10), ('w_none', 'Unpriced', 5)):
+            DatabaseService.execute_query(
+                'INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES (?, ?, 2, ?)',
+                (position_id, coin_id, price)
+            )
+        DatabaseService.execute_query('''
+            INSERT INTO LeveragedFarmingPool VALUES ('lf1', 'Ethereum', 'USDC', 10, 1, 3, 30, 1, 10, 2, 20)
+        ''')
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_only_changed_positions_are_repriced(self):
+        """Test that only positions whose coin price changed are written"""
+        DatabaseService.execute_query("UPDATE CoinPrices SET CurrentPrice = 12 WHERE Name = 'Ethereum'")
+        version = DatabaseService.data_version()
+
+        result = RepricingService.reprice_positions('test')
+        self.assertEqual(result['data'], {'Wallet': 1, 'LeveragedFarmingPool': 1})
+
+        changed = {(change.table_name, change.row_key) for change in DatabaseService.changes_since(version)}
+        self.assertEqual(changed, {('Wallet', 'w_eth'), ('LeveragedFarmingPool', 'lf1')})
+
+        values = dict(DatabaseService.execute_query('SELECT position_id, value FROM Wallet'))
+        self.assertEqual(values, {'w_btc': 200.0, 'w_eth': 24.0, 'w_none': 10.0})
+        net_value = DatabaseService.execute_query('SELECT net_value FROM LeveragedFarmingPool')[0][0]
+        self.assertEqual(net_value, 3 * 12 + 30 - 1 * 12 - 10)
+
+    def test_repricing_is_idempotent(self):
+        """Test that a second run with unchanged prices writes nothing"""
+        DatabaseService.execute_query("UPDATE CoinPrices SET CurrentPrice = 1.01 WHERE Name = 'USDC'")
+        RepricingService.reprice_positions()
+        self.assertEqual(sum(RepricingService.reprice_positions()['data'].values()), 0)
+
+if __name__ == '__main__':
+    unittest.main()
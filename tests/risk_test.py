@@ -0,0 +1,120 @@
+import unittest
+import time
+import numpy as np
+
+from models.analytics import ReturnArrays
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
+from services.price_history_service import PriceHistoryService, HOUR
+from services.risk_service import RiskService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestReturnArrays(unittest.TestCase):
+    """Test cases for vectorized return statistics"""
+
+    def test_statistics_match_numpy(self):
+        """Test volatility and correlation against NumPy on complete data"""
+        rng = np.random.default_rng(7)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (500, 4)), axis=0))
+        returns = ReturnArrays.from_prices(['a', 'b', 'c', 'd'], np.arange(500) * HOUR, prices)
+        log_returns = np.diff(np.log(prices), axis=0)
+
+        np.testing.assert_allclose(returns.correlation(), np.corrcoef(log_returns.T))
+        np.testing.assert_allclose(returns.volatility(8760), log_returns.std(axis=0, ddof=1) * np.sqrt(8760))
+
+    def test_gaps_use_pairwise_common_returns(self):
+        """Test that a coin with a short history only shortens its own pairs"""
+        rng = np.random.default_rng(11)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 3)), axis=0))
+        prices[:200, 2] = np.nan
+        returns = ReturnArrays.from_prices(['a', 'b', 'c'], np.arange(300), prices)
+        self.assertEqual(returns.observations.tolist(), [299, 299, 99])
+
+        correlation = returns.correlation()
+        log_returns = np.diff(np.log(prices), axis=0)
+        self.assertAlmostEqual(correlation[0, 1], np.corrcoef(log_returns[:, 0], log_returns[:, 1])[0, 1])
+        self.assertAlmostEqual(correlation[0, 2], np.corrcoef(log_returns[200:, 0], log_returns[200:, 2])[0, 1])
+        self.assertTrue(np.isnan(returns.correlation(min_periods=100)[0, 2]))
+
+    def test_large_correlation_speed(self):
+        """Test a 200 x 200 correlation over a year of hourly returns"""
+        rng = np.random.default_rng(3)
+        values = rng.normal(0, 0.01, (8760, 200))
+        values[rng.random(values.shape) < 0.02] = np.nan
+        returns = ReturnArrays(coins=[f'coin{i}' for i in range(200)], buckets=np.arange(8760), returns=values)
+
+        started = time.perf_counter()
+        correlation = returns.correlation()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(correlation.shape, (200, 200))
+        np.testing.assert_allclose(np.diag(correlation), 1.0)
+        self.assertLess(elapsed, 0.5)
+
+class TestRiskService(unittest.TestCase):
+    """Test cases for risk analytics over stored price history"""
+
+    def setUp(self):
+        """Set up test database with two held coins and hourly closes"""
+        setup_test_db()
+        AnalyticsService.invalidate()
+        RiskService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10)")
+        DatabaseService.execute_query("INSERT INTO Wallet VALUES ('w1', 'Bitcoin', 1, 100), ('w2', 'Ethereum', 10, 10)")
+
+        rng = np.random.default_rng(5)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (48, 2)), axis=0))
+        start = (int(time.time()) // HOUR - 48) * HOUR
+        DatabaseService.execute_query("INSERT INTO PriceHistoryCoin (id, name) VALUES (1, 'Bitcoin'), (2, 'Ethereum')")
+        DatabaseService.execute_many(
+            'INSERT INTO PriceHistoryRollup VALUES (?, ?, ?, ?, ?, ?, ?, 1)',
+            [(coin + 1, HOUR, start + t * HOUR, price, price, price, price)
+             for t in range(48) for coin, price in enumerate(self.prices[t])]
+        )
+
+    def tearDown(self):
+        """Clean up test database"""
+        AnalyticsService.invalidate()
+        RiskService.invalidate()
+        cleanup_test_db()
+
+    def test_historical_var(self):
+        """Test VaR and expected shortfall of the current exposures over past returns"""
+        result = RiskService.get_risk(days=7, confidence=[90])
+        self.assertTrue(result['success'])
+        data = result['data']
+        self.assertEqual(data['coins'], ['Bitcoin', 'Ethereum'])
+        self.assertEqual(data['observations'], {'Bitcoin': 47, 'Ethereum': 47})
+
+        pnl = np.expm1(np.diff(np.log(self.prices), axis=0)) @ np.array([100.0, 100.0])
+        cutoff = np.percentile(pnl, 10)
+        self.assertAlmostEqual(data['var']['90']['var'], -cutoff)
+        self.assertAlmostEqual(data['var']['90']['expected_shortfall'], -pnl[pnl <= cutoff].mean())
+        self.assertEqual(len(data['correlation']), 2)
+        self.assertEqual(data['correlation'][0][0], 1.0)
+
+    def test_cached_per_data_version(self):
+        """Test that results are reused until the data changes"""
+        first = RiskService.get_risk()['data']
+        self.assertIs(RiskService.get_risk()['data'], first)
+
+        DatabaseService.execute_query("UPDATE Wallet SET amount = 2 WHERE position_id = 'w1'", fetch=False)
+        second = RiskService.get_risk()['data']
+        self.assertIsNot(second, first)
+        self.assertEqual(second['exposures']['Bitcoin'], 200.0)
+
+    def test_invalid_arguments(self):
+        """Test that unsupported parameters are rejected"""
+        self.assertFalse(RiskService.get_risk(resolution=60)['success'])
+        self.assertFalse(RiskService.get_risk(confidence=[100])['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import time
+
+from services.database import DatabaseService
+from services.analytics_service import AnalyticsService
+from services.scenario_service import ScenarioService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestScenarios(unittest.TestCase):
+    """Test cases for price-shock scenarios"""
+
+    def setUp(self):
+        """Set up test database with a wallet, a leveraged farm and a lending pool"""
+        setup_test_db()
+        AnalyticsService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, CurrentPrice REAL)')
+        DatabaseService.execute_query('CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE ProtocolCollateralConfig (
+                protocol_id TEXT, coin_id TEXT, collateral_factor REAL NOT NULL, PRIMARY KEY (protocol_id, coin_id)
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL,
+                price_a REAL NOT NULL, price_b REAL NOT NULL, holdings_a REAL NOT NULL, holdings_b REAL NOT NULL,
+                debt_a REAL NOT NULL, debt_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED,
+                debt_value_a REAL GENERATED ALWAYS AS (debt_a * price_a) STORED,
+                debt_value_b REAL GENERATED ALWAYS AS (debt_b * price_b) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE CollateralPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL, collateral_factor REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE BorrowPosition (
+                position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, coin_id TEXT NOT NULL,
+                amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.install_change_tracking()
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Bitcoin', 100), ('Ethereum', 10), ('USDC', 1)")
+        DatabaseService.execute_query("INSERT INTO Position VALUES ('l1', 'aave')")
+        DatabaseService.execute_query("INSERT INTO ProtocolCollateralConfig VALUES ('aave', 'Ethereum', 0.8)")
+        DatabaseService.execute_query("INSERT INTO Wallet VALUES ('w_btc', 'Bitcoin', 1, 100)")
+        DatabaseService.execute_query("INSERT INTO LeveragedFarmingPool VALUES ('lf1', 'Ethereum', 'USDC', 10, 1, 3, 30, 1, 20)")
+        # Collateral factor 0.5 on the position is overridden by aave's 0.8 for Ethereum
+        DatabaseService.execute_query("INSERT INTO CollateralPosition VALUES ('c1', 'l1', 'Ethereum', 10, 10, 0.5)")
+        DatabaseService.execute_query("INSERT INTO BorrowPosition VALUES ('b1', 'l1', 'USDC', 40, 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        AnalyticsService.invalidate()
+        cleanup_test_db()
+
+    def test_eth_shock(self):
+        """Test values, PnL, health and leveraged net value under an ETH drop"""
+        result = ScenarioService.run_scenarios([
+            {'name': 'ETH -50%', 'shocks': {'Ethereum': -50, 'Dogecoin': 10}},
+            {'name': 'all -100%', 'shocks': {'*': -100, 'USDC': 0}}
+        ])
+        self.assertTrue(result['success'])
+        data = result['data']
+        # wallet 100 + farm (30 + 30 - 10 - 20) + lending (100 - 40)
+        self.assertEqual(data['base_total'], 190.0)
+        self.assertEqual(data['unknown_coins'], ['Dogecoin'])
+
+        eth = data['scenarios'][0]
+        self.assertEqual(eth['total'], 100 + (2 * 5 + 10) + (50 - 40))
+        self.assertEqual(eth['positions']['l1']['pnl'], -50.0)
+        self.assertEqual(eth['lending']['l1']['base_health_ratio'], 80 / 40)
+        self.assertEqual(eth['lending']['l1']['health_ratio'], 40 / 40)
+        self.assertEqual(eth['leveraged'], {'lf1': 20.0})
+        self.assertEqual(eth['liquidatable_pools'], 0)
+
+        wipeout = data['scenarios'][1]
+        self.assertEqual(wipeout['min_health_ratio'], 0.0)
+        self.assertEqual(wipeout['liquidatable_pools'], 1)
+        self.assertEqual(wipeout['total'], 30.0 - 20.0 - 40.0)
+
+    def test_invalid_scenarios(self):
+        """Test that malformed scenario lists are rejected"""
+        self.assertFalse(ScenarioService.run_scenarios([])['success'])
+        self.assertFalse(ScenarioService.run_scenarios([{'shocks': {'Ethereum': 'down'}}])['success'])
+
+    def test_scenario_grid_speed(self):
+        """Test that a grid of 1000 scenarios over a few thousand legs is fast"""
+        DatabaseService.execute_many(
+            'INSERT INTO Wallet VALUES (?, ?, ?, ?)',
+            [(f'w{i}', f'coin{i % 200}', 1.0 + i % 7, 2.0) for i in range(3000)]
+        )
+        grid = [{'name': f'{i}', 'shocks': {'Ethereum': -i / 10, 'coin1': i / 20}} for i in range(1000)]
+        AnalyticsService.get_arrays()
+
+        started = time.perf_counter()
+        result = ScenarioService.run_scenarios(grid, detail=False)
+        elapsed = time.perf_counter() - started
+
+        self.assertTrue(result['success'])
+        self.assertEqual(len(result['data']['scenarios']), 1000)
+        self.assertLess(elapsed, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
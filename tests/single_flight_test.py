@@ -0,0 +1,80 @@
+import unittest
+import threading
+import time
+from unittest.mock import patch
+
+from services.coin_price_service import CoinPriceService
+from utils.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for coalescing concurrent calls"""
+
+    def run_concurrently(self, func, count=5):
+        results = [None] * count
+        def call(i):
+            results[i] = func()
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers with the same key share a result and different keys run separately"""
+        group = SingleFlight()
+        calls = []
+        def work(key):
+            calls.append(key)
+            time.sleep(0.1)
+            return object()
+
+        results = self.run_concurrently(lambda: group.do('prices', work, 'prices'))
+        self.assertEqual(calls, ['prices'])
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertFalse(group.in_flight('prices'))
+
+        # Once finished, the next call runs again
+        group.do('prices', work, 'prices')
+        group.do('wallet', work, 'wallet')
+        self.assertEqual(calls, ['prices', 'prices', 'wallet'])
+
+    def test_errors_are_shared(self):
+        """Test that every waiting caller sees the exception of the shared execution"""
+        group = SingleFlight()
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('API down')
+
+        def call():
+            try:
+                group.do('prices', fail)
+            except ValueError as e:
+                return str(e)
+        self.assertEqual(self.run_concurrently(call, 3), ['API down'] * 3)
+
+    def test_insert_or_update_coin(self):
+        """Test that concurrent adds of the same coin make one API call"""
+        def fetch(api_id):
+            time.sleep(0.1)
+            return {'success': False, 'error': f'{api_id} not found'}
+
+        with patch('services.coin_price_service.CoinGeckoService.fetch_single_coin_price', side_effect=fetch) as fetch_mock:
+            results = self.run_concurrently(lambda: CoinPriceService.insert_or_update_coin('bitcoin', max_age=0))
+        self.assertEqual(fetch_mock.call_count, 1)
+        self.assertTrue(all(result == {'success': False, 'error': 'Failed to fetch coin data'} for result in results))
+
+    def test_forced_fetch_not_coalesced_with_skippable(self):
+        """Test that a forced fetch doesn't share a call that may skip a fresh coin"""
+        def fetch(api_id):
+            time.sleep(0.1)
+            return {'success': False, 'error': f'{api_id} not found'}
+
+        ages = iter([60, 0])
+        with patch('services.coin_price_service.CoinGeckoService.fetch_single_coin_price', side_effect=fetch) as fetch_mock, \
+                patch('services.coin_price_service.DatabaseService.execute_query', return_value=[]):
+            self.run_concurrently(lambda: CoinPriceService.insert_or_update_coin('bitcoin', max_age=next(ages)), count=2)
+        self.assertEqual(fetch_mock.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
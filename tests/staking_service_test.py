@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from services.database import DatabaseService
+from services.position_metadata_service import PositionMetadataService
+from services.staking_service import StakingService
+from utils.response import ResponseHandler
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestStakingService(unittest.TestCase):
+    """Test cases for adding staked positions with their metadata"""
+
+    def setUp(self):
+        """Set up test database with a priced coin"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE CoinPrices (
+                Name TEXT PRIMARY KEY, CurrentPrice REAL, DisplayName TEXT, ApiId TEXT, AlternateNames TEXT
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE Position (
+                id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL,
+                position_type TEXT CHECK(position_type IN ('wallet', 'staking', 'farming', 'leveraged', 'lending', 'borrowing')),
+                total_value REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE Staking (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED,
+                deposited_amount REAL NOT NULL
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE PositionMetadata (
+                id INTEGER PRIMARY KEY, position_type TEXT NOT NULL, position_id TEXT NOT NULL,
+                protocol TEXT, chain TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (position_type, position_id)
+            )
+        ''')
+        DatabaseService.execute_query(
+            "INSERT INTO CoinPrices VALUES ('Ethereum', 3000, 'ETH', 'ethereum', '[]')"
+        )
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def _counts(self):
+        return tuple(
+            DatabaseService.execute_query(f'SELECT COUNT(*) FROM {table}')[0][0]
+            for table in ('Position', 'Staking', 'PositionMetadata')
+        )
+
+    def test_add_staked_position(self):
+        """Test that the position, its staking row and its metadata are written together"""
+        result = StakingService.add_staked_position('lido-eth', 'Ethereum', 2, 2, 'lido', 'eth')
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertEqual(self._counts(), (1, 1, 1))
+        self.assertEqual(
+            tuple(DatabaseService.execute_query('SELECT position_id, coin_id, value, deposited_amount FROM Staking')[0]),
+            ('staking_lido-eth', 'Ethereum', 6000.0, 2.0)
+        )
+        self.assertEqual(
+            tuple(DatabaseService.execute_query('SELECT protocol_id, position_type, total_value FROM Position')[0]),
+            ('lido', 'staking', 6000.0)
+        )
+
+    def test_metadata_failure_rolls_back_position(self):
+        """Test that a metadata failure after both writes rolls back the position and the metadata row"""
+        create = PositionMetadataService.create_or_update_metadata
+
+        def write_then_fail(**kwargs):
+            create(**kwargs)
+            return ResponseHandler.error('metadata rejected')
+
+        with patch('services.staking_service.PositionMetadataService.create_or_update_metadata',
+                   side_effect=write_then_fail):
+            result = StakingService.add_staked_position('lido-eth', 'Ethereum', 2, 2, 'lido', 'eth')
+        self.assertFalse(result['success'])
+        self.assertEqual(self._counts(), (0, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
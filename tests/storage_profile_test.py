@@ -0,0 +1,49 @@
+import unittest
+import os
+from pathlib import Path
+
+from services.database import DatabaseService, STORAGE_PROFILES
+
+class TestStorageProfiles(unittest.TestCase):
+    """Test cases for SQLite storage profiles"""
+
+    def setUp(self):
+        self.test_db = str(Path('test_database.db').absolute())
+        DatabaseService.cleanup()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def tearDown(self):
+        DatabaseService.cleanup()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.test_db + suffix):
+                os.remove(self.test_db + suffix)
+
+    def _pragma(self, name):
+        return DatabaseService.execute_query(f'PRAGMA {name}')[0][0]
+
+    def test_profiles_applied(self):
+        """Test that each profile's pragmas are set on new connections"""
+        for name, profile in STORAGE_PROFILES.items():
+            with self.subTest(profile=name):
+                DatabaseService.cleanup()
+                DatabaseService.initialize(self.test_db, profile=name)
+
+                self.assertEqual(self._pragma('journal_mode').upper(), profile.journal_mode)
+                self.assertEqual(self._pragma('page_size'), profile.page_size)
+                self.assertEqual(self._pragma('cache_size'), profile.cache_size)
+                self.assertEqual(self._pragma('mmap_size'), profile.mmap_size)
+
+    def test_no_profile(self):
+        """Test that an explicit None leaves SQLite defaults instead of the configured profile"""
+        DatabaseService.initialize(self.test_db, profile=None)
+        self.assertEqual(self._pragma('journal_mode').upper(), 'DELETE')
+        self.assertEqual(self._pragma('mmap_size'), 0)
+
+    def test_unknown_profile(self):
+        """Test that an unknown profile fails initialization"""
+        with self.assertRaises(RuntimeError):
+            DatabaseService.initialize(self.test_db, profile='missing')
+
+if __name__ == '__main__':
+    unittest.main()
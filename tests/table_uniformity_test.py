@@ -0,0 +1,48 @@
+import unittest
+import sqlite3
+
+from services.database import DatabaseService
+from services.table_uniformity_manager import TableUniformityManager
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestTableUniformity(unittest.TestCase):
+    """Test cases for renaming a coin's display name across position tables"""
+
+    def setUp(self):
+        """Set up test database with the position tables"""
+        setup_test_db()
+        DatabaseService.execute_query('CREATE TABLE CoinPrices (Name TEXT PRIMARY KEY, DisplayName TEXT)')
+        for table in ('Wallet', 'Staking', 'CollateralPosition', 'BorrowPosition'):
+            DatabaseService.execute_query(f'CREATE TABLE {table} (position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL)')
+        for table in ('FarmingPool', 'LeveragedFarmingPool'):
+            DatabaseService.execute_query(
+                f'CREATE TABLE {table} (position_id TEXT PRIMARY KEY, token_a_id TEXT NOT NULL, token_b_id TEXT NOT NULL)'
+            )
+        DatabaseService.execute_query("INSERT INTO CoinPrices VALUES ('Ethereum', 'Ether'), ('Grail', 'Grail')")
+        DatabaseService.execute_query("INSERT INTO Wallet VALUES ('w1', 'Ether'), ('w2', 'Ethereum'), ('w3', 'Grail')")
+        DatabaseService.execute_query("INSERT INTO FarmingPool VALUES ('f1', 'Grail', 'Ether')")
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_renames_coin_columns(self):
+        """Test that display names are renamed and coin keys are left alone"""
+        TableUniformityManager.update_coin_display_name('Ether', 'ETH')
+        TableUniformityManager.update_coin_display_name('Grail', 'GRAIL')
+
+        self.assertEqual(
+            [tuple(row) for row in DatabaseService.execute_query('SELECT * FROM Wallet ORDER BY position_id')],
+            [('w1', 'ETH'), ('w2', 'Ethereum'), ('w3', 'Grail')]
+        )
+        self.assertEqual(tuple(DatabaseService.execute_query('SELECT * FROM FarmingPool')[0]), ('f1', 'Grail', 'ETH'))
+
+    def test_schema_errors_roll_back(self):
+        """Test that a missing table fails the rename instead of skipping it"""
+        DatabaseService.execute_query('DROP TABLE BorrowPosition')
+        with self.assertRaises(sqlite3.Error):
+            TableUniformityManager.update_coin_display_name('Ether', 'ETH')
+        self.assertEqual(DatabaseService.execute_query("SELECT coin_id FROM Wallet WHERE position_id = 'w1'")[0][0], 'Ether')
+
+if __name__ == '__main__':
+    unittest.main()
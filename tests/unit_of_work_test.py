@@ -0,0 +1,157 @@
+import unittest
+import sqlite3
+from flask import Flask
+
+from services.database import DatabaseService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestUnitOfWork(unittest.TestCase):
+    """Test cases for the request-scoped unit of work"""
+
+    def setUp(self):
+        """Set up test database"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE IF NOT EXISTS test_table (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                value REAL
+            )
+        ''')
+
+        self.app = Flask(__name__)
+        DatabaseService.init_app(self.app)
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def test_app_context_shares_connection(self):
+        """Test that every query in an app context uses the same unit of work"""
+        with self.app.app_context():
+            first = DatabaseService.current_unit_of_work()
+            DatabaseService.execute_query('SELECT 1')
+            second = DatabaseService.current_unit_of_work()
+            self.assertIsNotNone(first)
+            self.assertIs(first, second)
+
+        with self.app.app_context():
+            self.assertIsNot(DatabaseService.current_unit_of_work(), first)
+
+    def test_app_context_commits_on_teardown(self):
+        """Test that writes are committed once when the app context ends"""
+        with self.app.app_context():
+            DatabaseService.execute_query(
+                'INSERT INTO test_table (name, value) VALUES (?, ?)',
+                ('test', 1.0),
+                fetch=False
+            )
+            self.assertTrue(DatabaseService.current_unit_of_work().conn.in_transaction)
+
+        result = DatabaseService.execute_query('SELECT COUNT(*) FROM test_table')
+        self.assertEqual(result[0][0], 1)
+
+    def test_app_context_rolls_back_on_error(self):
+        """Test that an unhandled error discards the request's writes"""
+        with self.assertRaises(ValueError):
+            with self.app.app_context():
+                DatabaseService.execute_query(
+                    'INSERT INTO test_table (name, value) VALUES (?, ?)',
+                    ('test', 1.0),
+                    fetch=False
+                )
+                raise ValueError('request failed')
+
+        result = DatabaseService.execute_query('SELECT COUNT(*) FROM test_table')
+        self.assertEqual(result[0][0], 0)
+
+    def test_nested_unit_of_work_joins_outer(self):
+        """Test that a nested unit of work reuses the outer one"""
+        with DatabaseService.unit_of_work() as outer:
+            with DatabaseService.unit_of_work() as inner:
+                self.assertIs(outer, inner)
+                DatabaseService.execute_query(
+                    'INSERT INTO test_table (name, value) VALUES (?, ?)',
+                    ('test', 1.0),
+                    fetch=False
+                )
+            self.assertTrue(outer.conn.in_transaction)
+
+        self.assertIsNone(DatabaseService.current_unit_of_work())
+        result = DatabaseService.execute_query('SELECT COUNT(*) FROM test_table')
+        self.assertEqual(result[0][0], 1)
+
+class TestNestedTransactions(unittest.TestCase):
+    """Test cases for savepoint-based nested transactions"""
+
+    def setUp(self):
+        """Set up test database"""
+        setup_test_db()
+        DatabaseService.execute_query('''
+            CREATE TABLE IF NOT EXISTS test_table (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE,
+                value REAL
+            )
+        ''')
+
+    def tearDown(self):
+        """Clean up test database"""
+        cleanup_test_db()
+
+    def _insert(self, name):
+        DatabaseService.execute_query(
+            'INSERT INTO test_table (name, value) VALUES (?, ?)',
+            (name, 1.0),
+            fetch=False
+        )
+
+    def _names(self):
+        result = DatabaseService.execute_query('SELECT name FROM test_table ORDER BY name')
+        return [row['name'] for row in result]
+
+    def test_inner_failure_only_rolls_back_inner(self):
+        """Test that a failed item is isolated from the rest of the batch"""
+        with DatabaseService.transaction():
+            for name in ['a', 'b', 'a', 'c']:
+                try:
+                    with DatabaseService.transaction():
+                        self._insert(name)
+                except sqlite3.IntegrityError:
+                    pass
+
+        self.assertEqual(self._names(), ['a', 'b', 'c'])
+
+    def test_inner_failure_rolls_back_all_inner_writes(self):
+        """Test that every write in a failed savepoint is undone"""
+        with DatabaseService.transaction():
+            self._insert('a')
+            with self.assertRaises(sqlite3.IntegrityError):
+                with DatabaseService.transaction():
+                    self._insert('b')
+                    self._insert('a')
+
+        self.assertEqual(self._names(), ['a'])
+
+    def test_outer_failure_rolls_back_everything(self):
+        """Test that an outer failure discards released savepoints"""
+        with self.assertRaises(ValueError):
+            with DatabaseService.transaction():
+                with DatabaseService.transaction():
+                    self._insert('a')
+                raise ValueError('outer failed')
+
+        self.assertEqual(self._names(), [])
+
+    def test_execute_transaction_is_atomic(self):
+        """Test that execute_transaction rolls back a partially failed batch"""
+        result = DatabaseService.execute_transaction([
+            {'query': 'INSERT INTO test_table (name, value) VALUES (?, ?)', 'params': ('a', 1)},
+            {'query': 'INSERT INTO invalid_table (name) VALUES (?)', 'params': ('b',)}
+        ])
+
+        self.assertFalse(result)
+        self.assertEqual(self._names(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+
+from services.database import DatabaseService
+from services.valuation_service import ValuationService
+from utils.test_helpers import setup_test_db, cleanup_test_db
+
+class TestValuation(unittest.TestCase):
+    """Test cases for the unified portfolio valuation"""
+
+    def setUp(self):
+        """Set up test database with positions of every type"""
+        setup_test_db()
+        ValuationService.invalidate()
+        DatabaseService.execute_query('CREATE TABLE Protocol (name TEXT PRIMARY KEY, chain_id TEXT NOT NULL)')
+        DatabaseService.execute_query('CREATE TABLE Position (id TEXT PRIMARY KEY, protocol_id TEXT NOT NULL)')
+        DatabaseService.execute_query('''
+            CREATE TABLE Wallet (
+                position_id TEXT PRIMARY KEY, coin_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                value REAL GENERATED ALWAYS AS (amount * price) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LeveragedFarmingPool (
+                position_id TEXT PRIMARY KEY, price_a REAL NOT NULL, price_b REAL NOT NULL,
+                holdings_a REAL NOT NULL, holdings_b REAL NOT NULL, debt_a REAL NOT NULL, debt_b REAL NOT NULL,
+                value_a REAL GENERATED ALWAYS AS (holdings_a * price_a) STORED,
+                value_b REAL GENERATED ALWAYS AS (holdings_b * price_b) STORED,
+                debt_value_a REAL GENERATED ALWAYS AS (debt_a * price_a) STORED,
+                debt_value_b REAL GENERATED ALWAYS AS (debt_b * price_b) STORED
+            )
+        ''')
+        DatabaseService.execute_query('''
+            CREATE TABLE LendingPool (
+                position_id TEXT PRIMARY KEY, total_collateral_value REAL, total_borrow_value REAL
+            )
+        ''')
+        for table in ('CollateralPosition', 'BorrowPosition'):
+            DatabaseService.execute_query(f'''
+                CREATE TABLE {table} (
+                    position_id TEXT PRIMARY KEY, lending_pool_id TEXT NOT NULL, amount REAL NOT NULL, price REAL NOT NULL,
+                    value REAL GENERATED ALWAYS AS (amount * price) STORED
+                )
+            ''')
+        DatabaseService.install_change_tracking()
+
+        DatabaseService.execute_query("INSERT INTO Protocol VALUES ('metamask', 'ethereum'), ('aave', 'ethereum'), ('raydium', 'solana')")
+        DatabaseService.execute_query('''
+            INSERT INTO Position VALUES ('w1', 'metamask'), ('lf1', 'raydium'), ('l1', 'aave'), ('l2', 'aave')
+        ''')
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w1', 'Bitcoin', 2, 50)")
+        DatabaseService.execute_query("INSERT INTO Wallet (position_id, coin_id, amount, price) VALUES ('w2', 'Ethereum', 1, 10)")
+        DatabaseService.execute_query("INSERT INTO LeveragedFarmingPool VALUES ('lf1', 10, 1, 3, 30, 1, 10)")
+        # l1 is valued from its positions, l2 from its stored totals
+        DatabaseService.execute_query("INSERT INTO LendingPool VALUES ('l1', 999, 999), ('l2', 50, 20)")
+        DatabaseService.execute_query("INSERT INTO CollateralPosition VALUES ('c1', 'l1', 2, 40), ('c2', 'l1', 1, 20)")
+        DatabaseService.execute_query("INSERT INTO BorrowPosition VALUES ('b1', 'l1', 30, 1)")
+
+    def tearDown(self):
+        """Clean up test database"""
+        ValuationService.invalidate()
+        cleanup_test_db()
+
+    def test_totals(self):
+        """Test per-type, chain and protocol totals net of debt"""
+        valuation = ValuationService.get_valuation()
+        self.assertEqual(valuation.by_type, {
+            'wallet': 110.0, 'staking': 0.0, 'farming': 0.0, 'leveraged': 40.0, 'lending': 100.0 - 30.0 + 30.0
+        })
+        self.assertEqual(valuation.total, 250.0)
+        self.assertEqual(valuation.debt_total, 20.0 + 30.0 + 20.0)
+        self.assertEqual(valuation.by_chain, {'ethereum': 200.0, 'solana': 40.0, 'unknown': 10.0})
+        self.assertEqual(valuation.by_protocol, {'metamask': 100.0, 'raydium': 40.0, 'aave': 100.0, 'unknown': 10.0})
+        self.assertAlmostEqual(valuation.percent_of_total(100.0), 40.0)
+
+    def test_cached_per_data_version(self):
+        """Test that the valuation is reused until a tracked table changes"""
+        first = ValuationService.get_valuation()
+        self.assertIs(ValuationService.get_valuation(), first)
+
+        DatabaseService.execute_query("UPDATE Wallet SET price = 60 WHERE position_id = 'w1'")
+        second = ValuationService.get_valuation()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.by_type['wallet'], 130.0)
+
+        DatabaseService.execute_query("UPDATE Protocol SET chain_id = 'arbitrum' WHERE name = 'metamask'")
+        self.assertEqual(ValuationService.get_valuation().by_chain['arbitrum'], 120.0)
+
+    def test_rolled_back_version_not_cached(self):
+        """Test that a valuation of uncommitted writes isn't served after they roll back"""
+        version = DatabaseService.data_version()
+        with self.assertRaises(RuntimeError):
+            with DatabaseService.transaction():
+                DatabaseService.execute_query("UPDATE Wallet SET amount = 100 WHERE position_id = 'w1'")
+                self.assertEqual(ValuationService.get_valuation().total, 5150.0)
+                raise RuntimeError('rolled back')
+        self.assertEqual(DatabaseService.data_version(), version)
+
+        # A different commit takes the rolled back version
+        DatabaseService.execute_query("UPDATE Wallet SET amount = 3 WHERE position_id = 'w1'")
+        self.assertEqual(DatabaseService.data_version(), version + 1)
+        self.assertEqual(ValuationService.get_valuation().total, 300.0)
+
+    def test_summary(self):
+        """Test the summary response with and without positions"""
+        result = ValuationService.get_summary()
+        self.assertTrue(result['success'])
+        self.assertNotIn('positions', result['data'])
+        positions = ValuationService.get_summary(include_positions=True)['data']['positions']
+        self.assertEqual(len(positions), 5)
+
+if __name__ == '__main__':
+    unittest.main()
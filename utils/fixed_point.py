@@ -0,0 +1,144 @@
+"""
+Scaled-integer (fixed-point) amounts.
+
+A quantity with d decimals is stored as the integer round(quantity * 10**d).
+Coin amounts use the coin's own decimals capped at MAX_AMOUNT_DECIMALS, prices
+use PRICE_DECIMALS and USD values VALUE_DECIMALS (micro-dollars). Every scale
+keeps realistic portfolio numbers inside SQLite's and NumPy's 64-bit
+integers, so sums of units are exact in SQL, in Python and in vectorized code.
+
+Scalar conversions go through the shortest decimal representation of the
+input, so to_units(0.1, 8) is exactly 10000000 and never 9999999. Rounding is
+half-even throughout.
+"""
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Union
+import numpy as np
+
+# Decimals of prices (USD per coin) and values (USD)
+PRICE_DECIMALS = 10
+VALUE_DECIMALS = 6
+VALUE_SCALE = 10 ** VALUE_DECIMALS
+# Amounts keep at most this many decimals so holdings up to ~9.2e10 coins fit in 64 bits
+MAX_AMOUNT_DECIMALS = 8
+DEFAULT_AMOUNT_DECIMALS = 8
+
+INT64_MAX = np.iinfo(np.int64).max
+
+Number = Union[int, float, str, Decimal]
+
+
+def amount_decimals(coin_decimals: int = None) -> int:
+    """Storage decimals for a coin with the given on-chain decimals"""
+    if coin_decimals is None:
+        return DEFAULT_AMOUNT_DECIMALS
+    return max(0, min(int(coin_decimals), MAX_AMOUNT_DECIMALS))
+
+
+def to_units(value: Number, decimals: int) -> int:
+    """
+    Scale a number to an integer with the given decimals.
+
+    Raises:
+        OverflowError: if the result doesn't fit in a signed 64-bit integer
+        ValueError: for NaN or infinite input
+    """
+    if isinstance(value, int):
+        units = value * 10 ** decimals
+    else:
+        units = int(_to_decimal(value).scaleb(decimals).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+    if abs(units) > INT64_MAX:
+        raise OverflowError(f'{value} with {decimals} decimals exceeds 64-bit units')
+    return units
+
+
+def from_units(units: int, decimals: int) -> Decimal:
+    """Exact decimal value of units"""
+    return Decimal(int(units)).scaleb(-decimals)
+
+
+def rescale(units: int, decimals: int, new_decimals: int) -> int:
+    """Change the decimals of units, rounding half-even when dropping digits"""
+    if new_decimals >= decimals:
+        return units * 10 ** (new_decimals - decimals)
+    return _divide(units, 10 ** (decimals - new_decimals))
+
+
+def mul_units(a: int, a_decimals: int, b: int, b_decimals: int, out_decimals: int = VALUE_DECIMALS) -> int:
+    """Exact product of two fixed-point numbers, rounded once to out_decimals"""
+    return rescale(a * b, a_decimals + b_decimals, out_decimals)
+
+
+def value_units(amount: Number, price: Number, amount_decimals_: int = DEFAULT_AMOUNT_DECIMALS) -> int:
+    """
+    USD value units (VALUE_DECIMALS) of an amount at a price, as an unbounded Python int.
+
+    The amount is rounded to its decimals and the product once to VALUE_DECIMALS.
+    Unlike to_units() nothing is limited to 64 bits and the price isn't rounded
+    to PRICE_DECIMALS, so huge holdings of dust tokens keep their value.
+
+    Raises:
+        ValueError: for NaN or infinite input
+    """
+    exact_amount = _to_decimal(amount).scaleb(amount_decimals_).to_integral_value(ROUND_HALF_EVEN).scaleb(-amount_decimals_)
+    return int((exact_amount * _to_decimal(price)).scaleb(VALUE_DECIMALS).to_integral_value(ROUND_HALF_EVEN))
+
+
+def _to_decimal(value: Number) -> Decimal:
+    exact = value if isinstance(value, Decimal) else Decimal(str(value))
+    if not exact.is_finite():
+        raise ValueError(f'Cannot scale {value!r} to fixed point')
+    return exact
+
+
+def _divide(numerator: int, denominator: int) -> int:
+    """Integer division rounding half-even"""
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def to_units_array(values, decimals) -> np.ndarray:
+    """
+    Scale an array of numbers to int64 units.
+
+    Args:
+        values: Array of floats; NaN becomes 0
+        decimals: Scalar or per-element decimals
+
+    Raises:
+        OverflowError: if any element doesn't fit in 64 bits
+    """
+    scaled = np.rint(np.nan_to_num(np.asarray(values, dtype=float)) * np.power(10.0, decimals))
+    if scaled.size and np.abs(scaled).max() > INT64_MAX:
+        raise OverflowError('Values exceed 64-bit units')
+    return scaled.astype(np.int64)
+
+
+def from_units_array(units, decimals) -> np.ndarray:
+    """Float values of int64 units"""
+    return np.asarray(units, dtype=np.int64) / np.power(10.0, decimals)
+
+
+def value_units_array(amount_units, amount_decimals_, price_units, price_decimals: int = PRICE_DECIMALS) -> np.ndarray:
+    """
+    USD value units (VALUE_DECIMALS) of amounts times prices, element-wise.
+
+    Each product is formed in float64 (relative error ~1e-16) and rounded once
+    to integer micro-dollars; any sum of the results is then exact.
+    """
+    amounts = np.asarray(amount_units, dtype=np.int64) / np.power(10.0, amount_decimals_)
+    prices = np.asarray(price_units, dtype=np.int64) / np.power(10.0, price_decimals)
+    return to_units_array(amounts * prices, VALUE_DECIMALS)
+
+
+def sum_units(units) -> int:
+    """Exact sum of units as a Python int"""
+    units = np.asarray(units, dtype=np.int64)
+    total = int(units.sum(dtype=np.int64))
+    # int64 sums wrap silently; recheck in Python ints when the result could have overflowed
+    if units.size and np.abs(units).max() > INT64_MAX // max(units.size, 1):
+        total = sum(int(unit) for unit in units.tolist())
+    return total
@@ -1,5 +1,14 @@
+import math
+from typing import Optional
 from flask import jsonify
 
+
+def finite_or_none(value) -> Optional[float]:
+    """A float, or None for NaN/inf so the result stays valid JSON"""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
 class ResponseHandler:
     @staticmethod
     def success(message, data=None):
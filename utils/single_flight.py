@@ -0,0 +1,78 @@
+"""
+Single-flight call coalescing.
+
+Concurrent calls with the same key share one execution: the first caller
+runs the function, later callers block until it finishes and receive the
+same result (or exception). Once it finishes, the next call runs again, so
+nothing is cached beyond the in-flight call.
+"""
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """A group of in-flight calls, one per key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call func(*args, **kwargs), or wait for the in-flight call with this key.
+
+        Raises:
+            Whatever the shared execution raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+def single_flight(key: Callable[..., Hashable]):
+    """
+    Decorator coalescing concurrent calls that map to the same key.
+
+    Args:
+        key: Callable taking the function's arguments and returning the key
+    """
+    def decorator(func):
+        group = SingleFlight()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return group.do(key(*args, **kwargs), func, *args, **kwargs)
+        wrapper.flights = group
+        return wrapper
+    return decorator
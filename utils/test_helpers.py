@@ -2,18 +2,24 @@ from pathlib import Path
 import os
 from services.database import DatabaseService
 
-def setup_test_db():
-    """Set up test database tables"""
+def setup_test_db(**kwargs):
+    """
+    Set up a fresh test database
+
+    Args:
+        kwargs: Passed to DatabaseService.initialize (e.g. replica=True, profile)
+    """
     
     # Creat test database path
     test_db = str(Path('test_database.db').absolute())
 
-    # Remove existing test database if exists
+    # Close any database a previous test left open, then remove the file
+    DatabaseService.cleanup()
     if os.path.exists(test_db):
         os.remove(test_db)
     
     # init db service with test db
-    DatabaseService.initialize(test_db)
+    DatabaseService.initialize(test_db, **kwargs)
 
     # Verify initialization succeeded
     if not DatabaseService._initialized or not DatabaseService._pool: